@@ -0,0 +1,128 @@
+"""In-process caches for hot read paths.
+
+Entries are JSON-compatible values with a TTL and optional tags. Writers
+invalidate by tag (e.g. "feed", "post:42"), so they do not need to know which
+cache keys a change affects. CacheBackend is the interface a shared store
+(Redis, memcached, ...) has to implement to replace LocalCache.
+"""
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional
+
+class CacheBackend(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value or None on a miss"""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, tags: Iterable[str] = ()) -> None:
+        """Store a JSON-compatible value"""
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Drop a single entry"""
+
+    @abstractmethod
+    def invalidate_tags(self, *tags: str) -> None:
+        """Drop every entry stored with any of the given tags"""
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Drop everything"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss/eviction counters"""
+
+class LocalCache(CacheBackend):
+    """Bounded LRU cache with per-entry TTL, safe to share between threads"""
+
+    def __init__(self, max_entries: int = 1024, default_ttl: float = 15.0):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._remove(key)
+                self._counters["expirations"] += 1
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None, tags=()):
+        expires_at = time.monotonic() + (self.default_ttl if ttl is None else ttl)
+        tags = frozenset(tags)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (expires_at, value, tags)
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._counters["evictions"] += 1
+
+    def delete(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tags(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+                    self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self._entries), max_entries=self.max_entries)
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+# Anonymous views of the feed's first pages and of single posts
+feed_cache: CacheBackend = LocalCache(
+    max_entries=int(os.getenv("FEED_CACHE_SIZE", "1024")),
+    default_ttl=float(os.getenv("FEED_CACHE_TTL", "15")),
+)
+
+# Snapshots of authenticated users keyed by token subject (email)
+user_cache: CacheBackend = LocalCache(
+    max_entries=int(os.getenv("AUTH_CACHE_SIZE", "10000")),
+    default_ttl=float(os.getenv("AUTH_CACHE_TTL", "60")),
+)
+
+FEED_TAG = "feed"
+
+def post_tag(post_id: int) -> str:
+    return f"post:{post_id}"
+
+def user_tag(user_id: int) -> str:
+    return f"user:{user_id}"
@@ -0,0 +1,64 @@
+"""Conditional GET support: strong ETags, Last-Modified and 304 responses.
+
+An ETag is a hash of the version of everything a response is built from
+(ids, updated_at of posts and authors, the denormalized counters), not of
+the serialized body, so a route can settle If-None-Match from a cheap
+version lookup (or a cached entry) before loading and enriching anything.
+Responses that include is_liked add the liked post ids to their ETag.
+
+Likes and comments move the counters without touching updated_at, so
+Last-Modified is only informational for posts and the 304 decision is made
+on If-None-Match alone.
+"""
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Iterable, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+# Responses carry is_liked for the caller
+VARY = "Authorization"
+
+class Validators(NamedTuple):
+    etag: str
+    last_modified: Optional[str] = None
+
+def make_etag(*parts) -> str:
+    """Strong ETag over the repr of parts (ids, datetimes, counters, other ETags)"""
+    return '"' + hashlib.sha1(repr(parts).encode()).hexdigest() + '"'
+
+def http_date(*moments: Optional[datetime]) -> Optional[str]:
+    """Latest of the given naive UTC datetimes as an HTTP date"""
+    latest = max((moment for moment in moments if moment is not None), default=None)
+    if latest is None:
+        return None
+    return format_datetime(latest.replace(tzinfo=timezone.utc), usegmt=True)
+
+def for_user(validators: Validators, liked_post_ids: Iterable[int]) -> Validators:
+    """Validators of the caller's view of a response whose anonymous view has validators"""
+    liked = sorted(liked_post_ids)
+    if not liked:
+        return validators
+    return validators._replace(etag=make_etag(validators.etag, liked))
+
+def is_not_modified(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names etag (weak comparison, as RFC 9110 asks for GETs)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in {tag.strip().removeprefix("W/") for tag in header.split(",")}
+
+def _headers(validators: Validators) -> dict:
+    headers = {"ETag": validators.etag, "Vary": VARY}
+    if validators.last_modified:
+        headers["Last-Modified"] = validators.last_modified
+    return headers
+
+def not_modified(validators: Validators) -> Response:
+    return Response(status_code=304, headers=_headers(validators))
+
+def set_validators(response: Response, validators: Validators):
+    response.headers.update(_headers(validators))
@@ -0,0 +1,198 @@
+"""In-process pub/sub for live post updates, streamed to clients as SSE.
+
+Writers publish a small dict per topic ("post:42" for like and comment
+counts, "feed" for new posts). Each subscriber keeps at most one pending
+event per topic: a newer event is merged into the pending one, so a burst of
+likes reaches a slow client as a single delta with the latest counts. A
+subscriber is dropped as a slow consumer (its stream ends with an
+"overflow" event and the client reconnects) when it has more than
+max_pending topics waiting, or has not taken its pending events for
+max_lag seconds, e.g. because its socket is not being read.
+
+EventBroker/Subscription are the interface a shared backend (Redis pub/sub,
+Postgres LISTEN/NOTIFY, ...) has to implement to replace LocalBroker, which
+only reaches clients connected to the same process.
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Tuple
+
+class SlowConsumer(Exception):
+    """Raised by Subscription.next_events once the subscriber has been dropped"""
+
+class Subscription(ABC):
+    @abstractmethod
+    async def next_events(self, timeout: float) -> List[Tuple[str, dict]]:
+        """Coalesced (topic, data) events since the last call; [] if none arrive within timeout"""
+
+    @abstractmethod
+    def close(self) -> None:
+        """Stop receiving events"""
+
+class EventBroker(ABC):
+    @abstractmethod
+    def publish(self, topic: str, data: dict) -> None:
+        """Deliver data to the subscribers of topic (safe to call from any thread)"""
+
+    @abstractmethod
+    def subscribe(self, topics: Iterable[str]) -> Subscription:
+        """Start receiving the events of topics"""
+
+    @abstractmethod
+    def stats(self) -> Dict[str, int]:
+        """Subscriber and event counters"""
+
+class LocalSubscription(Subscription):
+    def __init__(self, broker: "LocalBroker", topics: Tuple[str, ...]):
+        self.broker = broker
+        self.topics = topics
+        self._pending: "OrderedDict[str, dict]" = OrderedDict()
+        self._pending_since = 0.0
+        self._dropped = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _push(self, topic: str, data: dict) -> str:
+        """Queue an event (caller holds the broker lock); returns what happened to it"""
+        if self._dropped:
+            return "ignored"
+        now = time.monotonic()
+        lagging = self._pending and now - self._pending_since > self.broker.max_lag
+        if lagging or (topic not in self._pending and len(self._pending) >= self.broker.max_pending):
+            self._pending.clear()
+            self._dropped = True
+            outcome = "dropped"
+        elif topic in self._pending:
+            self._pending[topic].update(data)
+            outcome = "coalesced"
+        else:
+            if not self._pending:
+                self._pending_since = now
+            self._pending[topic] = dict(data)
+            outcome = "queued"
+        if self._waiter is not None:
+            self._loop.call_soon_threadsafe(_wake, self._waiter)
+            self._waiter = None
+        return outcome
+
+    def _take(self) -> List[Tuple[str, dict]]:
+        if self._dropped:
+            raise SlowConsumer()
+        events = list(self._pending.items())
+        self._pending.clear()
+        self.broker._counters["delivered"] += len(events)
+        return events
+
+    async def next_events(self, timeout):
+        with self.broker._lock:
+            if self._pending or self._dropped:
+                return self._take()
+            self._loop = asyncio.get_running_loop()
+            self._waiter = waiter = self._loop.create_future()
+        try:
+            await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            pass
+        with self.broker._lock:
+            self._waiter = None
+            return self._take()
+
+    def close(self):
+        self.broker._unsubscribe(self)
+
+def _wake(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+class LocalBroker(EventBroker):
+    """Topic fan-out to the subscribers of this process, safe to share between threads"""
+
+    def __init__(self, max_pending: int = 256, max_lag: float = 30.0):
+        self.max_pending = max_pending
+        self.max_lag = max_lag
+        self._subscribers: Dict[str, set] = {}
+        self._lock = threading.Lock()
+        self._counters = {"published": 0, "delivered": 0, "coalesced": 0, "dropped": 0}
+
+    def publish(self, topic, data):
+        with self._lock:
+            self._counters["published"] += 1
+            for subscription in list(self._subscribers.get(topic, ())):
+                outcome = subscription._push(topic, data)
+                if outcome == "dropped":
+                    self._remove(subscription)
+                if outcome in ("coalesced", "dropped"):
+                    self._counters[outcome] += 1
+
+    def subscribe(self, topics):
+        subscription = LocalSubscription(self, tuple(dict.fromkeys(topics)))
+        with self._lock:
+            for topic in subscription.topics:
+                self._subscribers.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: LocalSubscription):
+        with self._lock:
+            self._remove(subscription)
+
+    def _remove(self, subscription: LocalSubscription):
+        for topic in subscription.topics:
+            subscribers = self._subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[topic]
+
+    def stats(self):
+        with self._lock:
+            subscribers = len({s for subscribers in self._subscribers.values() for s in subscribers})
+            return dict(self._counters, subscribers=subscribers, topics=len(self._subscribers))
+
+# Limits per client before it is dropped as a slow consumer
+event_broker: EventBroker = LocalBroker(
+    max_pending=int(os.getenv("EVENT_MAX_PENDING", "256")),
+    max_lag=float(os.getenv("EVENT_MAX_LAG_SECONDS", "30")),
+)
+
+FEED_TOPIC = "feed"
+
+def post_topic(post_id: int) -> str:
+    return f"post:{post_id}"
+
+# A comment line every SSE_HEARTBEAT_SECONDS keeps proxies from closing idle
+# streams; streams end after SSE_MAX_STREAM_SECONDS and the client reconnects
+# (after SSE_RETRY_MS), which spreads long-lived clients over the workers
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_MAX_STREAM_SECONDS = float(os.getenv("SSE_MAX_STREAM_SECONDS", "600"))
+SSE_RETRY_MS = int(os.getenv("SSE_RETRY_MS", "3000"))
+
+def sse_frame(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+async def event_stream(topics: List[str], broker: Optional[EventBroker] = None) -> AsyncIterator[str]:
+    """SSE frames with the events of topics, named after the topic prefix ("post", "feed").
+
+    Subscribes when the stream starts and unsubscribes when it ends, including
+    when the client disconnects and the generator is closed.
+    """
+    subscription = (broker or event_broker).subscribe(topics)
+    deadline = time.monotonic() + SSE_MAX_STREAM_SECONDS
+    try:
+        yield f"retry: {SSE_RETRY_MS}\n\n"
+        while (remaining := deadline - time.monotonic()) > 0:
+            try:
+                events = await subscription.next_events(min(SSE_HEARTBEAT_SECONDS, remaining))
+            except SlowConsumer:
+                yield sse_frame("overflow", {})
+                return
+            if not events:
+                yield ": ping\n\n"
+            for topic, data in events:
+                yield sse_frame(topic.split(":", 1)[0], data)
+    finally:
+        subscription.close()
@@ -0,0 +1,38 @@
+"""Password hashing, run in a dedicated process pool.
+
+Imports stay light on purpose: pool workers are spawned and import only
+this module.
+"""
+import os
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+from app.pools import BoundedProcessPool
+
+# Hashes made with fewer rounds than the current setting are upgraded on login
+PASSWORD_HASH_ROUNDS = int(os.getenv("PASSWORD_HASH_ROUNDS", "29000"))
+
+pwd_context = CryptContext(
+    schemes=["pbkdf2_sha256"],
+    deprecated="auto",
+    pbkdf2_sha256__default_rounds=PASSWORD_HASH_ROUNDS,
+    pbkdf2_sha256__min_rounds=PASSWORD_HASH_ROUNDS,
+)
+
+def verify_password(plain_password, hashed_password):
+    return pwd_context.verify(plain_password, hashed_password)
+
+def get_password_hash(password):
+    return pwd_context.hash(password)
+
+def verify_and_update(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password; on success also return a new hash if the stored
+    one uses outdated parameters (pwd_context.needs_update)"""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+password_pool = BoundedProcessPool(
+    "password_hashing",
+    max_workers=int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+)
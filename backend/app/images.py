@@ -0,0 +1,139 @@
+"""Image processing for uploads.
+
+An upload is decoded once, center-cropped to a square and encoded into a set
+of renditions (sizes x formats), so clients can fetch a thumbnail that fits
+instead of the full 1080px image.
+
+Renditions are stored under a content hash of the main JPEG, so the same
+image uploaded twice is stored once and its URLs never change content.
+"""
+import hashlib
+import io
+import os
+import re
+from typing import Dict, Tuple, Union
+
+from PIL import Image
+
+from app.pools import BoundedProcessPool
+
+# Hard limits for uploads: encoded size and decoded pixel count (decompression bombs)
+MAX_UPLOAD_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(20 * 1024 * 1024)))
+MAX_IMAGE_PIXELS = int(os.getenv("UPLOAD_MAX_PIXELS", str(40_000_000)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Pillow's own guard: warns above the limit, refuses to decode above twice of it
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+# Largest first: each smaller rendition is resized from the previous one
+RENDITION_SIZES = (1080, 640, 320)
+MAIN_SIZE = RENDITION_SIZES[0]
+
+# format name -> (Pillow format, file extension, save options)
+RENDITION_FORMATS = {
+    "jpeg": ("JPEG", ".jpg", {"quality": 85, "optimize": True}),
+    "webp": ("WEBP", ".webp", {"quality": 80, "method": 4}),
+}
+
+# Content-addressed file names: <key>.jpg for the main rendition, <key>_<size>.<ext> for the rest
+CONTENT_KEY_RE = re.compile(r"^(?P<key>[0-9a-f]{32})(?:_\d+)?\.(?:jpg|webp)$")
+
+class ImageTooLarge(ValueError):
+    """The image has more pixels than allowed"""
+
+def process_image(source: Union[bytes, str], use_draft: bool = True, max_pixels: int = MAX_IMAGE_PIXELS) -> Dict[int, Dict[str, bytes]]:
+    """Decode an image (bytes or a file path) once and encode every rendition.
+
+    The pixel count is checked from the header, before anything is decoded.
+    Returns {size: {format name: encoded bytes}}.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    # Closes the file (or buffer) once the square crop, a copy, has been made
+    with Image.open(source) as image:
+        if max_pixels and image.width * image.height > max_pixels:
+            raise ImageTooLarge(f"Image has {image.width * image.height} pixels, the limit is {max_pixels}")
+        if use_draft:
+            # JPEG only: let the decoder scale down by 1/2, 1/4 or 1/8 while decoding,
+            # keeping both sides >= MAIN_SIZE so the square crop still covers it
+            image.draft("RGB", (MAIN_SIZE, MAIN_SIZE))
+
+        # Convert to RGB if necessary (for JPEG)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+
+        # Instagram-like square crop (1:1 aspect ratio), centered
+        width, height = image.size
+        size = min(width, height)
+        left = (width - size) // 2
+        top = (height - size) // 2
+        square = image.crop((left, top, left + size, top + size))
+
+    renditions = {}
+    for rendition_size in RENDITION_SIZES:
+        square = square.resize((rendition_size, rendition_size), Image.Resampling.LANCZOS)
+        encoded = {}
+        for name, (pil_format, _, options) in RENDITION_FORMATS.items():
+            buffer = io.BytesIO()
+            square.save(buffer, pil_format, **options)
+            encoded[name] = buffer.getvalue()
+        renditions[rendition_size] = encoded
+    return renditions
+
+def rendition_filename(stem: str, size: int, name: str) -> str:
+    """File name of a rendition; the main JPEG keeps the plain stem"""
+    extension = RENDITION_FORMATS[name][1]
+    if size == MAIN_SIZE and name == "jpeg":
+        return f"{stem}{extension}"
+    return f"{stem}_{size}{extension}"
+
+def content_key(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:32]
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def store_renditions(renditions: Dict[int, Dict[str, bytes]], directory: str) -> Tuple[Dict[int, Dict[str, str]], bool]:
+    """Write renditions under their content key unless they are already stored.
+
+    Returns ({size: {format name: file name}}, whether it was a duplicate).
+    The main JPEG is written last, so its presence means the set is complete;
+    a duplicate's files get a fresh mtime, as if they had just been written.
+    """
+    key = content_key(renditions[MAIN_SIZE]["jpeg"])
+    filenames = {
+        size: {name: rendition_filename(key, size, name) for name in encoded}
+        for size, encoded in renditions.items()
+    }
+    main_filename = filenames[MAIN_SIZE]["jpeg"]
+    if os.path.exists(os.path.join(directory, main_filename)):
+        try:
+            # Restart gc_uploads' grace period: the new post referencing them is not saved yet
+            for formats in filenames.values():
+                for filename in formats.values():
+                    if filename != main_filename:
+                        os.utime(os.path.join(directory, filename))
+            os.utime(os.path.join(directory, main_filename))
+            return filenames, True
+        except FileNotFoundError:
+            pass  # collected in the meantime, store the set again
+
+    for size, encoded in renditions.items():
+        for name, data in encoded.items():
+            if filenames[size][name] != main_filename:
+                _write_atomic(os.path.join(directory, filenames[size][name]), data)
+    _write_atomic(os.path.join(directory, main_filename), renditions[MAIN_SIZE]["jpeg"])
+    return filenames, False
+
+def process_upload(path: str, directory: str, max_pixels: int = MAX_IMAGE_PIXELS) -> Tuple[Dict[int, Dict[str, str]], bool]:
+    """Pool job: render an uploaded file into directory, see store_renditions"""
+    return store_renditions(process_image(path, max_pixels=max_pixels), directory)
+
+image_pool = BoundedProcessPool(
+    "image_processing",
+    max_workers=int(os.getenv("IMAGE_WORKERS", str(min(2, os.cpu_count() or 1)))),
+    max_pending=int(os.getenv("IMAGE_MAX_PENDING", "16")),
+)
@@ -0,0 +1,221 @@
+"""Durable background jobs, stored in the jobs table and run by worker.py.
+
+Write handlers enqueue side effects with enqueue() inside their own
+transaction, so a job exists exactly when the write it belongs to was
+committed, and respond without waiting for them. Workers claim due jobs
+with a conditional UPDATE (plus FOR UPDATE SKIP LOCKED on Postgres), so any
+number of them can share the table, and run each job's handler in its own
+transaction together with marking the job done.
+
+- retries: a failing job is retried after JOB_RETRY_BASE_SECONDS, doubling
+  per attempt, and marked failed after its max_attempts
+- leases: a claimed job that is not finished within JOB_LEASE_SECONDS (the
+  worker died) is claimed again
+- idempotency keys: enqueueing a key that is already in the table is a
+  no-op; finished jobs, and with them their keys, are kept for
+  JOB_RETENTION_SECONDS, failed ones until removed by hand
+- debouncing: enqueue_debounced folds the jobs for one key within a time
+  window into a single job that runs once the window closes
+
+Handlers are registered with @job_handler(kind) and called with a Session
+and the job's payload as keyword arguments. Periodic maintenance is enqueued
+by the workers themselves, once per period thanks to the idempotency key
+(see schedule_periodic).
+"""
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.models import Job
+from app.utils import dialect_insert
+
+logger = logging.getLogger(__name__)
+
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_RETENTION_SECONDS = float(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+# Finished jobs the latency quantiles of queue_stats are taken over
+JOB_LATENCY_SAMPLE = 1000
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+JOB_STATUSES = (QUEUED, RUNNING, DONE, FAILED)
+
+_handlers: Dict[str, Callable] = {}
+
+def job_handler(kind: str):
+    """Register the decorated function as the handler of jobs of kind"""
+    def register(fn: Callable) -> Callable:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+def enqueue(
+    db: Session,
+    kind: str,
+    payload: Optional[dict] = None,
+    idempotency_key: Optional[str] = None,
+    delay: float = 0,
+    max_attempts: int = JOB_MAX_ATTEMPTS,
+    run_after: Optional[datetime] = None,
+) -> Optional[int]:
+    """Add a job, due after delay seconds or at run_after, inside the caller's transaction; returns its id
+    (None if the key was already used)"""
+    now = datetime.utcnow()
+    return db.execute(
+        dialect_insert(db)(Job)
+        .values(
+            kind=kind, payload=payload or {}, idempotency_key=idempotency_key, status=QUEUED, attempts=0,
+            max_attempts=max_attempts, run_after=run_after or now + timedelta(seconds=delay), created_at=now,
+        )
+        .on_conflict_do_nothing(index_elements=[Job.idempotency_key])
+        .returning(Job.id)
+    ).scalar()
+
+def _slot(seconds: float, now: Optional[datetime]) -> Tuple[int, datetime]:
+    """Number of the seconds-long time slot now falls in, and when it ends"""
+    slot = int((now or datetime.utcnow()).timestamp() // seconds)
+    return slot, datetime.fromtimestamp((slot + 1) * seconds)
+
+def enqueue_debounced(
+    db: Session, kind: str, payload: dict, key: str, window: float, now: Optional[datetime] = None,
+) -> Optional[int]:
+    """Enqueue at most one job per key and window seconds, run when the window closes so it
+    covers every write made during it (inside the caller's transaction); window 0 enqueues right away"""
+    if window <= 0:
+        return enqueue(db, kind, payload)
+    slot, slot_end = _slot(window, now)
+    return enqueue(db, kind, payload, idempotency_key=f"{key}@{slot}", run_after=slot_end)
+
+def schedule_periodic(db: Session, periods: Dict[str, float], now: Optional[datetime] = None) -> int:
+    """Enqueue each job kind of periods (kind -> seconds) once per period, however many workers call this"""
+    scheduled = 0
+    for kind, seconds in periods.items():
+        slot, _ = _slot(seconds, now)
+        if enqueue(db, kind, idempotency_key=f"{kind}@{slot}") is not None:
+            scheduled += 1
+    db.commit()
+    return scheduled
+
+def _claimable(now: datetime):
+    return or_(
+        and_(Job.status == QUEUED, Job.run_after <= now),
+        and_(Job.status == RUNNING, Job.locked_until < now),
+    )
+
+def claim_job(db: Session) -> Optional[Job]:
+    """Lock the next due job for this worker (committed); None if there is none"""
+    while True:
+        now = datetime.utcnow()
+        candidate = db.execute(
+            select(Job.id).where(_claimable(now)).order_by(Job.run_after, Job.id).limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if candidate is None:
+            db.commit()
+            return None
+        # Conditional, so two workers that picked the same candidate cannot both take it
+        claimed = db.execute(
+            update(Job)
+            .where(Job.id == candidate, _claimable(now))
+            .values(status=RUNNING, attempts=Job.attempts + 1, started_at=now,
+                    locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS))
+            .returning(Job.id)
+            .execution_options(synchronize_session=False)
+        ).scalar()
+        db.commit()
+        if claimed is not None:
+            return db.get(Job, claimed, populate_existing=True)
+
+def _finish(db: Session, job_id: int, **values):
+    db.execute(
+        update(Job).where(Job.id == job_id).values(locked_until=None, **values)
+        .execution_options(synchronize_session=False)
+    )
+
+def run_job(db: Session, job: Job) -> bool:
+    """Run a claimed job; returns whether it succeeded (failures are retried or marked failed)"""
+    job_id, kind, payload, attempts, max_attempts = job.id, job.kind, job.payload, job.attempts, job.max_attempts
+    handler = _handlers.get(kind)
+    try:
+        if handler is None:
+            raise LookupError(f"no handler for job kind {kind!r}")
+        if attempts > max_attempts:
+            raise RuntimeError("lease expired on the last attempt")
+        handler(db, **payload)
+        _finish(db, job_id, status=DONE, finished_at=datetime.utcnow(), last_error=None)
+        db.commit()
+        return True
+    except Exception as e:
+        db.rollback()
+        error = f"{type(e).__name__}: {e}"
+        if handler is None or attempts >= max_attempts:
+            logger.error("Job %s (%s) failed for good after %s attempts: %s", job_id, kind, attempts, error)
+            _finish(db, job_id, status=FAILED, finished_at=datetime.utcnow(), last_error=error)
+        else:
+            delay = JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+            logger.warning("Job %s (%s) failed, retrying in %.0f s: %s", job_id, kind, delay, error)
+            _finish(db, job_id, status=QUEUED, last_error=error,
+                    run_after=datetime.utcnow() + timedelta(seconds=delay))
+        db.commit()
+        return False
+
+def run_pending(db: Session, limit: Optional[int] = None) -> int:
+    """Claim and run due jobs until there are none left (or limit ran); returns how many ran"""
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_job(db)
+        if job is None:
+            break
+        run_job(db, job)
+        ran += 1
+    return ran
+
+@job_handler("jobs.prune")
+def prune_jobs(db: Session, now: Optional[datetime] = None) -> int:
+    """Delete jobs that finished more than JOB_RETENTION_SECONDS ago (inside the caller's transaction); returns how many"""
+    cutoff = (now or datetime.utcnow()) - timedelta(seconds=JOB_RETENTION_SECONDS)
+    return db.execute(delete(Job).where(Job.status == DONE, Job.finished_at < cutoff)).rowcount
+
+def _quantile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def queue_stats(db: Session) -> Dict[str, dict]:
+    """Per job kind: jobs by status, age of the oldest due job and due-to-finish latency quantiles,
+    sum and count over the last JOB_LATENCY_SAMPLE finished jobs (from run_after, so the debounce delay of a job is not counted as latency)"""
+    now = datetime.utcnow()
+    stats: Dict[str, dict] = {}
+
+    def kind_stats(kind: str) -> dict:
+        return stats.setdefault(kind, {
+            "jobs": dict.fromkeys(JOB_STATUSES, 0), "oldest_due_seconds": 0.0,
+            "latency_seconds": {}, "latency_sum_seconds": 0.0, "latency_count": 0,
+        })
+
+    for kind, status, count in db.execute(select(Job.kind, Job.status, func.count()).group_by(Job.kind, Job.status)):
+        kind_stats(kind)["jobs"][status] = count
+    oldest = select(Job.kind, func.min(Job.run_after)).where(Job.status == QUEUED, Job.run_after <= now).group_by(Job.kind)
+    for kind, run_after in db.execute(oldest):
+        kind_stats(kind)["oldest_due_seconds"] = (now - run_after).total_seconds()
+
+    finished = db.execute(
+        select(Job.kind, Job.run_after, Job.finished_at)
+        .where(Job.status == DONE)
+        .order_by(Job.finished_at.desc())
+        .limit(JOB_LATENCY_SAMPLE)
+    )
+    latencies: Dict[str, List[float]] = {}
+    for kind, run_after, finished_at in finished:
+        latencies.setdefault(kind, []).append((finished_at - run_after).total_seconds())
+    for kind, values in latencies.items():
+        values.sort()
+        kind_stats(kind).update(
+            latency_seconds={q: _quantile(values, q) for q in (0.5, 0.95, 0.99)},
+            latency_sum_seconds=sum(values), latency_count=len(values),
+        )
+    db.commit()
+    return stats
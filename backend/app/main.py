@@ -1,9 +1,18 @@
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 import os
 
-from app.database import create_tables
+from app import database
+from app.cache import feed_cache, user_cache
+from app.database import DBSession, get_read_session, run_db
+from app.events import event_broker
+from app.hashing import password_pool
+from app.jobs import queue_stats
+from app.images import CONTENT_KEY_RE, MAX_UPLOAD_BYTES, image_pool
+from app.metrics import MetricsMiddleware, instrument_engine, render_metrics
+from app.middleware import BodySizeLimitMiddleware
 from app.routes import auth, posts, users
 
 app = FastAPI(
@@ -12,7 +21,15 @@ app = FastAPI(
     version="1.0.0"
 )
 
-# CORS middleware
+# Cut off oversized uploads before the multipart parser spools them
+# (64 KiB of slack for the multipart envelope)
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    max_body_size=MAX_UPLOAD_BYTES + 64 * 1024,
+    paths=["/api/posts/upload"],
+)
+
+# CORS middleware (added after the body limit so it also wraps its responses)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -34,16 +51,45 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Разрешает все методы (GET, POST, и т.д.)
     allow_headers=["*"],  # Разрешает все заголовки
+    expose_headers=["X-Next-Cursor"],  # Cursor for the next page of feed listings
 )
 
+# Outermost, so the latency includes every middleware above
+app.add_middleware(MetricsMiddleware)
+
+# Engines whose statements are counted per request and whose pools /api/metrics reports
+DB_ENGINES = {"primary": database.engine}
+if database.replica_engine is not database.engine:
+    DB_ENGINES["replica"] = database.replica_engine
+if database.async_engine is not None:
+    DB_ENGINES["primary_async"] = database.async_engine.sync_engine
+if database.async_replica_engine is not database.async_engine:
+    DB_ENGINES["replica_async"] = database.async_replica_engine.sync_engine
+for db_engine in DB_ENGINES.values():
+    instrument_engine(db_engine)
+
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(posts.router, prefix="/api/posts", tags=["Posts"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 
+class UploadStaticFiles(StaticFiles):
+    """Content-addressed uploads never change, so clients may cache them forever"""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200):
+        response = super().file_response(full_path, stat_result, scope, status_code)
+        if CONTENT_KEY_RE.match(os.path.basename(full_path)):
+            response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
 # Mount static files for uploads
 if os.path.exists("uploads"):
-    app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+    app.mount("/uploads", UploadStaticFiles(directory="uploads"), name="uploads")
+
+@app.on_event("shutdown")
+def shutdown_pools():
+    password_pool.shutdown()
+    image_pool.shutdown()
 
 # Health check endpoint
 @app.get("/")
@@ -53,3 +99,26 @@ def read_root():
 @app.get("/api/health")
 def health_check():
     return {"status": "healthy", "message": "API is working correctly"}
+
+@app.get("/api/cache/stats")
+def cache_stats():
+    return {"feed": feed_cache.stats()}
+
+@app.get("/api/pools/stats")
+def pool_stats():
+    return {"password_hashing": password_pool.stats(), "image_processing": image_pool.stats()}
+
+@app.get("/api/metrics", response_class=PlainTextResponse)
+async def metrics(db: DBSession = Depends(get_read_session)):
+    """Prometheus scrape endpoint"""
+    job_stats = await run_db(db, queue_stats)
+    return PlainTextResponse(
+        render_metrics(
+            DB_ENGINES,
+            caches={"feed": feed_cache, "user": user_cache},
+            worker_pools={"password_hashing": password_pool, "image_processing": image_pool},
+            brokers={"posts": event_broker},
+            job_stats=job_stats,
+        ),
+        media_type="text/plain; version=0.0.4",
+    )
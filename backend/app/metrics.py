@@ -0,0 +1,303 @@
+"""Request metrics in the Prometheus text format.
+
+MetricsMiddleware times every HTTP request and, through SQLAlchemy engine
+events, counts the statements it ran and the time spent in them. Histograms
+are labelled by route template (/api/posts/{post_id}), never by raw path, so
+the number of series stays bounded. render_metrics() adds point-in-time
+gauges (DB connection pools, caches, worker pools, background job queue)
+for /api/metrics.
+
+Set SLOW_REQUEST_MS to log every request slower than that, along with the
+statements it issued (parameters are left out, they may hold secrets).
+"""
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+# Cap on statements kept per request for the slow-request log
+SLOW_REQUEST_MAX_STATEMENTS = 100
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SQL_TIME_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+UNMATCHED_ROUTE = "unmatched"
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: Iterable[Tuple[str, str]]) -> str:
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels)
+    return f"{{{pairs}}}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative histogram per label set, safe to share between threads"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[tuple, list] = {}  # label values -> [bucket counts, sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, labelvalues: Sequence[str], value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(tuple(labelvalues))
+            if series is None:
+                series = self._series[tuple(labelvalues)] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, [list(s[0]), s[1], s[2]]) for labels, s in self._series.items())
+        for labelvalues, (counts, total, count) in series:
+            labels = list(zip(self.labelnames, labelvalues))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+def _gauge(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_format_labels(labels.items())} {_format_value(value)}")
+    return lines
+
+def _summary(
+    name: str, documentation: str, series: Iterable[Tuple[Dict[str, str], Dict[float, float], float, int]],
+) -> List[str]:
+    """Summary per label set, from its quantiles, sum and count"""
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} summary"]
+    for labels, quantiles, total, count in series:
+        for q, value in quantiles.items():
+            quantile_labels = list(labels.items()) + [("quantile", str(q))]
+            lines.append(f"{name}{_format_labels(quantile_labels)} {_format_value(value)}")
+        lines.append(f"{name}_sum{_format_labels(labels.items())} {_format_value(total)}")
+        lines.append(f"{name}_count{_format_labels(labels.items())} {count}")
+    return lines
+
+request_latency = Histogram(
+    "aiverse_http_request_duration_seconds", "HTTP request latency",
+    ("method", "route", "status"), LATENCY_BUCKETS,
+)
+request_sql_statements = Histogram(
+    "aiverse_http_request_sql_statements", "SQL statements executed per HTTP request",
+    ("method", "route"), SQL_COUNT_BUCKETS,
+)
+request_sql_seconds = Histogram(
+    "aiverse_http_request_sql_seconds", "Time spent in SQL statements per HTTP request",
+    ("method", "route"), SQL_TIME_BUCKETS,
+)
+
+class RequestStats:
+    """SQL work done on behalf of the current request"""
+
+    __slots__ = ("statements", "sql_seconds", "log")
+
+    def __init__(self, keep_statements: bool):
+        self.statements = 0
+        self.sql_seconds = 0.0
+        self.log: Optional[List[Tuple[float, str]]] = [] if keep_statements else None
+
+# Set by MetricsMiddleware; copied into threadpool workers and run_sync greenlets with the context
+_current_request: ContextVar[Optional[RequestStats]] = ContextVar("aiverse_request_stats", default=None)
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("aiverse_query_started", []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["aiverse_query_started"].pop()
+    stats = _current_request.get()
+    if stats is None:
+        return
+    elapsed = time.perf_counter() - started
+    stats.statements += 1
+    stats.sql_seconds += elapsed
+    if stats.log is not None and len(stats.log) < SLOW_REQUEST_MAX_STATEMENTS:
+        stats.log.append((elapsed, statement))
+
+def _handle_error(exception_context):
+    # after_cursor_execute does not run for failed statements
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("aiverse_query_started"):
+        connection.info["aiverse_query_started"].pop()
+
+def instrument_engine(target):
+    """Count statements run through target (an Engine, or the Engine class for all of them)"""
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+def uninstrument_engine(target):
+    event.remove(target, "before_cursor_execute", _before_cursor_execute)
+    event.remove(target, "after_cursor_execute", _after_cursor_execute)
+    event.remove(target, "handle_error", _handle_error)
+
+def _route_templates(app) -> Dict[object, str]:
+    """endpoint -> path template, for labelling requests after routing"""
+    templates = {}
+    for route in getattr(app, "routes", ()):
+        endpoint = getattr(route, "endpoint", None) or getattr(route, "app", None)
+        if endpoint is not None and hasattr(route, "path"):
+            templates.setdefault(endpoint, route.path if hasattr(route, "endpoint") else f"{route.path}/{{path}}")
+    return templates
+
+class MetricsMiddleware:
+    """Record latency and SQL work of every HTTP request, labelled by route template"""
+
+    def __init__(self, app, slow_request_ms: Optional[float] = None):
+        self.app = app
+        self._slow_request_ms = slow_request_ms
+        self._templates: Optional[Dict[object, str]] = None
+
+    @property
+    def slow_request_ms(self) -> float:
+        """Threshold for the slow-request log, SLOW_REQUEST_MS unless given; 0 turns it off"""
+        return SLOW_REQUEST_MS if self._slow_request_ms is None else self._slow_request_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        slow_request_ms = self.slow_request_ms
+        stats = RequestStats(keep_statements=slow_request_ms > 0)
+        token = _current_request.set(stats)
+        status = 500
+        started = time.perf_counter()
+
+        async def recording_send(message):
+            nonlocal status, slow_request_ms
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Event streams are open for minutes by design
+                headers = dict(message.get("headers", ()))
+                if headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    slow_request_ms = 0
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recording_send)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current_request.reset(token)
+            self._record(scope, status, elapsed, stats, slow_request_ms)
+
+    def _route(self, scope) -> str:
+        # The router stores the matched endpoint in the (shared) scope
+        if self._templates is None and "app" in scope:
+            self._templates = _route_templates(scope["app"])
+        return (self._templates or {}).get(scope.get("endpoint"), UNMATCHED_ROUTE)
+
+    def _record(self, scope, status: int, elapsed: float, stats: RequestStats, slow_request_ms: float):
+        method, route = scope["method"], self._route(scope)
+        request_latency.observe((method, route, str(status)), elapsed)
+        request_sql_statements.observe((method, route), stats.statements)
+        request_sql_seconds.observe((method, route), stats.sql_seconds)
+
+        if slow_request_ms and elapsed * 1000 >= slow_request_ms:
+            lines = [
+                f"Slow request: {method} {scope['path']} ({route}) -> {status} in {elapsed * 1000:.1f} ms, "
+                f"{stats.statements} SQL statements in {stats.sql_seconds * 1000:.1f} ms"
+            ]
+            lines.extend(f"  [{duration * 1000:.1f} ms] {statement}" for duration, statement in stats.log)
+            if stats.statements > len(stats.log):
+                lines.append(f"  ... {stats.statements - len(stats.log)} more")
+            logger.warning("\n".join(lines))
+
+def _db_pool_samples(engines: Dict[str, object]) -> Dict[str, List[Tuple[Dict[str, str], float]]]:
+    samples = {"size": [], "checked_out": [], "checked_in": [], "overflow": []}
+    for name, engine in engines.items():
+        pool = engine.pool
+        # NullPool / StaticPool (PgBouncer mode, SQLite) have no sizing to report
+        if not hasattr(pool, "checkedout"):
+            continue
+        labels = {"engine": name}
+        samples["size"].append((labels, pool.size()))
+        samples["checked_out"].append((labels, pool.checkedout()))
+        samples["checked_in"].append((labels, pool.checkedin()))
+        samples["overflow"].append((labels, pool.overflow()))
+    return samples
+
+def render_metrics(
+    engines: Dict[str, object],
+    caches: Dict[str, object],
+    worker_pools: Dict[str, object],
+    brokers: Optional[Dict[str, object]] = None,
+    job_stats: Optional[Dict[str, dict]] = None,
+) -> str:
+    """Prometheus text exposition of the request histograms plus current gauges"""
+    lines = request_latency.render() + request_sql_statements.render() + request_sql_seconds.render()
+
+    pool_samples = _db_pool_samples(engines)
+    lines += _gauge("aiverse_db_pool_size", "Configured connections in the DB pool", pool_samples["size"])
+    lines += _gauge("aiverse_db_pool_checked_out", "DB connections in use", pool_samples["checked_out"])
+    lines += _gauge("aiverse_db_pool_checked_in", "Idle DB connections in the pool", pool_samples["checked_in"])
+    lines += _gauge("aiverse_db_pool_overflow", "DB connections above pool_size", pool_samples["overflow"])
+
+    cache_stats = {name: cache.stats() for name, cache in caches.items()}
+    for key in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines += _gauge(
+            f"aiverse_cache_{key}_total", f"Cache {key}",
+            [({"cache": name}, stats[key]) for name, stats in cache_stats.items()], kind="counter",
+        )
+    lines += _gauge("aiverse_cache_entries", "Entries held by the cache",
+                    [({"cache": name}, stats["entries"]) for name, stats in cache_stats.items()])
+
+    pool_stats = {name: pool.stats() for name, pool in worker_pools.items()}
+    for key in ("submitted", "completed", "failed", "rejected"):
+        lines += _gauge(
+            f"aiverse_worker_pool_{key}_total", f"Worker pool jobs {key}",
+            [({"pool": name}, stats[key]) for name, stats in pool_stats.items()], kind="counter",
+        )
+    for key, documentation in (("in_flight", "Jobs submitted and not finished"), ("queue_depth", "Jobs waiting for a worker")):
+        lines += _gauge(f"aiverse_worker_pool_{key}", documentation,
+                        [({"pool": name}, stats[key]) for name, stats in pool_stats.items()])
+
+    broker_stats = {name: broker.stats() for name, broker in (brokers or {}).items()}
+    for key in ("published", "delivered", "coalesced", "dropped"):
+        lines += _gauge(
+            f"aiverse_events_{key}_total", f"Live update events {key}",
+            [({"broker": name}, stats[key]) for name, stats in broker_stats.items()], kind="counter",
+        )
+    lines += _gauge("aiverse_events_subscribers", "Connected live update subscribers",
+                    [({"broker": name}, stats["subscribers"]) for name, stats in broker_stats.items()])
+
+    # Per job kind, from app.jobs.queue_stats
+    job_stats = job_stats or {}
+    lines += _gauge("aiverse_jobs", "Background jobs by status", [
+        ({"kind": kind, "status": status}, count)
+        for kind, stats in job_stats.items() for status, count in stats["jobs"].items()
+    ])
+    lines += _gauge("aiverse_jobs_oldest_due_seconds", "Age of the oldest background job waiting for a worker",
+                    [({"kind": kind}, stats["oldest_due_seconds"]) for kind, stats in job_stats.items()])
+    lines += _summary("aiverse_job_latency_seconds", "Due-to-finish latency of recently finished background jobs", [
+        ({"kind": kind}, stats["latency_seconds"], stats["latency_sum_seconds"], stats["latency_count"])
+        for kind, stats in job_stats.items() if stats["latency_count"]
+    ])
+    return "\n".join(lines) + "\n"
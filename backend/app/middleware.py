@@ -0,0 +1,60 @@
+from typing import Iterable
+
+from starlette.responses import JSONResponse
+
+class BodySizeLimitMiddleware:
+    """Reject request bodies above max_body_size on the given paths.
+
+    Checked against Content-Length up front and counted while the body is
+    received, so oversized (or chunked) uploads are cut off before the
+    multipart parser spools them. In the latter case the 413 is sent from
+    here and the app sees the client disconnect, because body parsing
+    errors raised through the app would come back as a 400.
+    """
+
+    def __init__(self, app, max_body_size: int, paths: Iterable[str]):
+        self.app = app
+        self.max_body_size = max_body_size
+        self.paths = set(paths)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        content_length = headers.get(b"content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_body_size:
+            await self._reject(scope, receive, send)
+            return
+
+        received = 0
+        response_started = False
+        rejected = False
+
+        async def limited_receive():
+            nonlocal received, rejected
+            if rejected:
+                return {"type": "http.disconnect"}
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_body_size and not response_started:
+                    rejected = True
+                    await self._reject(scope, receive, send)
+                    return {"type": "http.disconnect"}
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if rejected:
+                return
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        await self.app(scope, limited_receive, tracking_send)
+
+    async def _reject(self, scope, receive, send):
+        response = JSONResponse({"detail": "Request body too large"}, status_code=413)
+        await response(scope, receive, send)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, Boolean, Float, ForeignKey, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
@@ -16,7 +16,11 @@ class User(Base):
     bio = Column(Text)
     avatar_url = Column(String)
     is_active = Column(Boolean, default=True)
+    # Denormalized follow counters, maintained by the follow routes
+    followers_count = Column(Integer, default=0, server_default="0", nullable=False)
+    following_count = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     posts = relationship("Post", back_populates="author")
@@ -32,6 +36,10 @@ class Post(Base):
     image_url = Column(String)
     video_url = Column(String)
     author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Denormalized counters, maintained by the like/comment routes
+    # (repair drift with reconcile_counters.py)
+    likes_count = Column(Integer, default=0, server_default="0", nullable=False)
+    comments_count = Column(Integer, default=0, server_default="0", nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -39,6 +47,12 @@ class Post(Base):
     author = relationship("User", back_populates="posts")
     likes = relationship("Like", back_populates="post")
     comments = relationship("Comment", back_populates="post")
+    
+    # Keep in sync with the migrations (migrations/versions/0003_feed_indexes.py)
+    __table_args__ = (
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        Index("ix_posts_author_id_created_at_id", "author_id", "created_at", "id"),
+    )
 
 class Like(Base):
     __tablename__ = "likes"
@@ -51,6 +65,11 @@ class Like(Base):
     # Relationships
     user = relationship("User", back_populates="likes")
     post = relationship("Post", back_populates="likes")
+    
+    __table_args__ = (
+        Index("ix_likes_post_id", "post_id"),
+        Index("uq_likes_user_id_post_id", "user_id", "post_id", unique=True),
+    )
 
 class Comment(Base):
     __tablename__ = "comments"
@@ -64,4 +83,74 @@ class Comment(Base):
     # Relationships
     user = relationship("User", back_populates="comments")
     post = relationship("Post", back_populates="comments")
+    
+    __table_args__ = (
+        Index("ix_comments_post_id_created_at_id", "post_id", "created_at", "id"),
+    )
+
+
+class Follow(Base):
+    __tablename__ = "follows"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    follower_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    followee_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        # "Whom do I follow" (and one follow per pair); "who follows me" for fan-out
+        Index("uq_follows_follower_id_followee_id", "follower_id", "followee_id", unique=True),
+        Index("ix_follows_followee_id", "followee_id"),
+    )
 
+class TimelineEntry(Base):
+    """A post in a user's materialized home timeline (see app/timeline.py)"""
+    __tablename__ = "timeline_entries"
+    
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    author_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    # Copy of the post's created_at, so pages are read from this table alone
+    created_at = Column(DateTime, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_timeline_entries_user_id_created_at_post_id", "user_id", "created_at", "post_id"),
+    )
+
+class TrendingScore(Base):
+    """Hotness of a recently liked or commented post (see app/trending.py)"""
+    __tablename__ = "trending_scores"
+    
+    post_id = Column(Integer, ForeignKey("posts.id"), primary_key=True)
+    score = Column(Float, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_trending_scores_score_post_id", "score", "post_id"),
+    )
+
+class Job(Base):
+    """A background job (see app/jobs.py)"""
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    # Enqueueing a key that is already taken is a no-op
+    idempotency_key = Column(String)
+    status = Column(String, nullable=False)
+    attempts = Column(Integer, default=0, server_default="0", nullable=False)
+    max_attempts = Column(Integer, nullable=False)
+    run_after = Column(DateTime, nullable=False)
+    # Lease of the worker running the job; expired leases are claimed again
+    locked_until = Column(DateTime)
+    last_error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    __table_args__ = (
+        Index("uq_jobs_idempotency_key", "idempotency_key", unique=True),
+        # Claiming the next due job; pruning and latency stats of finished ones
+        Index("ix_jobs_status_run_after_id", "status", "run_after", "id"),
+        Index("ix_jobs_status_finished_at", "status", "finished_at"),
+    )
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def clamp_limit(limit: int) -> int:
+    """Keep client supplied page sizes within the server-side cap"""
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode(cursor: str) -> list:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    return json.loads(raw)
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    return _encode([created_at.isoformat(), item_id])
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        created_at, item_id = _decode(cursor)
+        return datetime.fromisoformat(created_at), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def encode_score_cursor(score: float, item_id: int) -> str:
+    """Cursor for listings ordered by a score (relevance, hotness), then id"""
+    return _encode([score, item_id])
+
+def decode_score_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        score, item_id = _decode(cursor)
+        return float(score), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def paginate_newest_first(query, model, limit: int, skip: int = 0, cursor: Optional[str] = None):
+    """Page a query by (created_at, id) descending.
+
+    With a cursor the page starts right after the item the cursor points at
+    (keyset pagination); without one the legacy skip/limit form is used.
+    Returns the rows and the cursor for the next page (None on the last page).
+    """
+    return _paginate(query, model, limit, skip, cursor, descending=True)
+
+def paginate_oldest_first(query, model, limit: int, skip: int = 0, cursor: Optional[str] = None):
+    """Same as paginate_newest_first, ordered by (created_at, id) ascending"""
+    return _paginate(query, model, limit, skip, cursor, descending=False)
+
+def _paginate(query, model, limit: int, skip: int, cursor: Optional[str], descending: bool):
+    limit = clamp_limit(limit)
+    if descending:
+        query = query.order_by(model.created_at.desc(), model.id.desc())
+    else:
+        query = query.order_by(model.created_at.asc(), model.id.asc())
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        if descending:
+            after_cursor = or_(
+                model.created_at < created_at,
+                and_(model.created_at == created_at, model.id < item_id)
+            )
+        else:
+            after_cursor = or_(
+                model.created_at > created_at,
+                and_(model.created_at == created_at, model.id > item_id)
+            )
+        query = query.filter(after_cursor)
+    elif skip:
+        query = query.offset(skip)
+
+    # Fetch one extra row to find out whether there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return rows, next_cursor
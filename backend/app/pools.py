@@ -0,0 +1,80 @@
+"""Bounded process pools for CPU-bound work (password hashing, image processing).
+
+Work is submitted from async handlers so the event loop never runs it. Each
+pool caps how many jobs may be queued or running; beyond that callers get
+PoolSaturated right away instead of piling up behind the workers.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional
+
+from starlette.concurrency import run_in_threadpool
+
+class PoolSaturated(Exception):
+    """Raised when a pool already has max_pending jobs queued or running"""
+
+class BoundedProcessPool:
+    def __init__(self, name: str, max_workers: int, max_pending: int):
+        """max_workers=0 runs jobs in the threadpool instead of worker processes"""
+        self.name = name
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers, 1)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._counters = {"submitted": 0, "completed": 0, "failed": 0, "rejected": 0}
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn: workers import only the job's module, not a copy of the server
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in a worker and await its result"""
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self._counters["rejected"] += 1
+                raise PoolSaturated(f"{self.name} pool is saturated")
+            self._pending += 1
+            self._counters["submitted"] += 1
+        try:
+            if self.max_workers == 0:
+                result = await run_in_threadpool(fn, *args)
+            else:
+                loop = asyncio.get_running_loop()
+                result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        except Exception:
+            with self._lock:
+                self._counters["failed"] += 1
+            raise
+        else:
+            with self._lock:
+                self._counters["completed"] += 1
+            return result
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            running = min(self._pending, self.max_workers) if self.max_workers else self._pending
+            return dict(
+                self._counters,
+                in_flight=self._pending,
+                queue_depth=self._pending - running,
+                max_workers=self.max_workers,
+                max_pending=self.max_pending,
+            )
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -1,30 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from passlib.context import CryptContext
 from datetime import datetime, timedelta
 import jwt
 import os
 from typing import List, Optional
+from sqlalchemy import event, inspect
 from sqlalchemy.orm import Session
 
 from app.models import User, Post, Like, Comment
 from app.schemas import UserCreate, UserLogin, UserResponse, UserUpdate, Token
-from app.database import get_db
+from app.database import DBSession, get_session, run_db
+from app.cache import feed_cache, user_cache, user_tag
+from app.hashing import get_password_hash, password_pool, verify_and_update
+from app.pools import PoolSaturated
 
 router = APIRouter()
 security = HTTPBearer()
-pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
+security_optional = HTTPBearer(auto_error=False)
 
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
-
-def get_password_hash(password):
-    return pwd_context.hash(password)
-
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -35,7 +32,52 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)):
+async def _run_password_job(fn, *args):
+    """Run a hashing job in the password pool, shedding load once it is full"""
+    try:
+        return await password_pool.run(fn, *args)
+    except PoolSaturated:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many concurrent authentication requests, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+
+def _get_user_by_email(db: Session, email: str) -> Optional[User]:
+    return db.query(User).filter(User.email == email).first()
+
+async def _resolve_user(db: DBSession, email: str) -> Optional[UserResponse]:
+    """Snapshot of the user behind a token subject, served from user_cache when possible"""
+    cached = user_cache.get(email)
+    if cached is not None:
+        return UserResponse.model_validate(cached)
+    
+    user = await run_db(db, _get_user_by_email, email)
+    if user is None:
+        return None
+    snapshot = UserResponse.model_validate(user)
+    user_cache.set(email, snapshot.model_dump(mode="json"))
+    return snapshot
+
+@event.listens_for(User, "after_update")
+def _collect_changed_user(mapper, connection, target):
+    # Remember old and new email of updated users (profile edits, is_active
+    # changes) so their cached snapshots are dropped once the change commits
+    state = inspect(target)
+    changed = state.session.info.setdefault("changed_user_emails", set())
+    changed.add(target.email)
+    changed.update(state.attrs.email.history.deleted)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for email in session.info.pop("changed_user_emails", ()):
+        user_cache.delete(email)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_emails", None)
+
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: DBSession = Depends(get_session)) -> UserResponse:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -49,12 +91,12 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     except jwt.PyJWTError:
         raise credentials_exception
     
-    user = db.query(User).filter(User.email == email).first()
+    user = await _resolve_user(db, email)
     if user is None:
         raise credentials_exception
     return user
 
-def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = None, db: Session = Depends(get_db)):
+async def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials] = Depends(security_optional), db: DBSession = Depends(get_session)) -> Optional[UserResponse]:
     """Optional authentication - returns user if token is valid, None otherwise"""
     if not credentials:
         return None
@@ -67,11 +109,9 @@ def get_current_user_optional(credentials: Optional[HTTPAuthorizationCredentials
     except jwt.PyJWTError:
         return None
     
-    user = db.query(User).filter(User.email == email).first()
-    return user
+    return await _resolve_user(db, email)
 
-@router.post("/register", response_model=UserResponse)
-def register(user: UserCreate, db: Session = Depends(get_db)):
+def _check_user_available(db: Session, user: UserCreate):
     # Check if user already exists
     db_user = db.query(User).filter(
         (User.email == user.email) | (User.username == user.username)
@@ -81,9 +121,8 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             status_code=400,
             detail="Email or username already registered"
         )
-    
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+
+def _create_user(db: Session, user: UserCreate, hashed_password: str):
     db_user = User(
         username=user.username,
         email=user.email,
@@ -94,31 +133,9 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_user
-
-@router.post("/login", response_model=Token)
-def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == user_credentials.email).first()
-    if not user or not verify_password(user_credentials.password, user.hashed_password):
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Incorrect email or password",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-    
-    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
+    return UserResponse.model_validate(db_user)
 
-@router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
-    return current_user
-
-@router.patch("/me", response_model=UserResponse)
-def update_users_me(user_update: UserUpdate, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
-    """Update current user profile"""
+def _update_user(db: Session, user_update: UserUpdate, current_user: UserResponse):
     # Check if username or email already exists (but not for current user)
     if user_update.username:
         existing_user = db.query(User).filter(
@@ -137,10 +154,58 @@ def update_users_me(user_update: UserUpdate, current_user: User = Depends(get_cu
             raise HTTPException(status_code=400, detail="Email already taken")
     
     # Update only provided fields
+    db_user = db.get(User, current_user.id)
     update_data = user_update.dict(exclude_unset=True)
     for field, value in update_data.items():
-        setattr(current_user, field, value)
+        setattr(db_user, field, value)
     
     db.commit()
-    db.refresh(current_user)
+    db.refresh(db_user)
+    return UserResponse.model_validate(db_user)
+
+def _store_password_hash(db: Session, user: User, hashed_password: str):
+    user.hashed_password = hashed_password
+    db.commit()
+
+@router.post("/register", response_model=UserResponse)
+async def register(user: UserCreate, db: DBSession = Depends(get_session)):
+    await run_db(db, _check_user_available, user)
+    
+    # Hashing is CPU-bound, keep it off the event loop and the request threads
+    hashed_password = await _run_password_job(get_password_hash, user.password)
+    return await run_db(db, _create_user, user, hashed_password)
+
+@router.post("/login", response_model=Token)
+async def login(user_credentials: UserLogin, db: DBSession = Depends(get_session)):
+    user = await run_db(db, _get_user_by_email, user_credentials.email)
+    valid, new_hash = False, None
+    if user:
+        valid, new_hash = await _run_password_job(verify_and_update, user_credentials.password, user.hashed_password)
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    # Transparently upgrade hashes made with outdated parameters
+    if new_hash:
+        await run_db(db, _store_password_hash, user, new_hash)
+    
+    access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = create_access_token(
+        data={"sub": user.email}, expires_delta=access_token_expires
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
+
+@router.get("/me", response_model=UserResponse)
+async def read_users_me(current_user: UserResponse = Depends(get_current_user)):
     return current_user
+
+@router.patch("/me", response_model=UserResponse)
+async def update_users_me(user_update: UserUpdate, current_user: UserResponse = Depends(get_current_user), db: DBSession = Depends(get_session)):
+    """Update current user profile"""
+    updated = await run_db(db, _update_user, user_update, current_user)
+    # Cached posts embed the author profile
+    feed_cache.invalidate_tags(user_tag(current_user.id))
+    return updated
@@ -1,41 +1,109 @@
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy import DateTime, Integer, delete, literal, select
+from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, UploadFile, File, Response
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from datetime import datetime
 from typing import List, Optional
 import os
 import shutil
-from datetime import datetime
-from PIL import Image
-import io
+import tempfile
+from PIL import Image, UnidentifiedImageError
+from starlette.concurrency import run_in_threadpool
 
 from app.models import User, Post, Like, Comment
-from app.schemas import PostCreate, PostResponse, CommentCreate, CommentResponse 
-from app.database import get_db
+from app.schemas import PostBatchResponse, PostCreate, PostResponse, CommentCreate, CommentResponse, UserResponse
+from app.database import DBSession, get_read_session, get_session, run_db
 from app.routes.auth import get_current_user, get_current_user_optional
-from app.utils import get_posts_with_details
+from app.utils import (
+    dialect_insert, get_liked_post_ids, get_posts_with_details, increment_post_counter, overlay_is_liked, parse_id_list,
+)
+from app.serialization import PostListResponse, serialize_posts
+from app.conditional import Validators, for_user, http_date, is_not_modified, make_etag, not_modified, set_validators
+from app.search import search_post_ids
+from app.timeline import fan_out_post, timeline_page
+from app.trending import schedule_rescore, trending_page
+from app.jobs import enqueue
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, clamp_limit, paginate_newest_first, paginate_oldest_first
+from app.cache import FEED_TAG, feed_cache, post_tag, user_tag
+from app.events import FEED_TOPIC, event_broker, event_stream, post_topic
+from app.images import (
+    MAIN_SIZE, MAX_IMAGE_PIXELS, MAX_UPLOAD_BYTES, UPLOAD_CHUNK_SIZE, ImageTooLarge, image_pool, process_upload
+)
+from app.pools import PoolSaturated
 
 router = APIRouter()
 
 UPLOAD_DIR = "uploads"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-@router.get("/", response_model=List[PostResponse])
-def get_posts(
-    skip: int = 0,
-    limit: int = 20,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional)
-):
-    posts = db.query(Post).order_by(Post.created_at.desc()).offset(skip).limit(limit).all()
+# Query helpers below take a sync Session and are run through run_db, so the
+# same code serves both the threadpool and the AsyncSession configuration.
+
+# Everything a post response is built from apart from is_liked: ETags hash
+# these, whether they come from loaded posts or from a version-only query
+_VERSION_COLUMNS = (Post.id, Post.created_at, Post.updated_at, Post.likes_count, Post.comments_count, User.updated_at)
+
+def _post_version(post: Post) -> tuple:
+    return (post.id, post.created_at, post.updated_at, post.likes_count, post.comments_count, post.author.updated_at)
+
+def _validators(versions: List[tuple]) -> Validators:
+    last_modified = http_date(*(moment for version in versions for moment in (version[2], version[5])))
+    return Validators(make_etag(*versions), last_modified)
+
+def _list_posts(db: Session, limit: int, skip: int = 0, cursor: Optional[str] = None, current_user: Optional[UserResponse] = None):
+    query = db.query(Post).options(joinedload(Post.author))
+    posts, next_cursor = paginate_newest_first(query, Post, limit, skip, cursor)
+    items = serialize_posts(get_posts_with_details(posts, db, current_user))
+    tags = [FEED_TAG] + [post_tag(p.id) for p in posts] + [user_tag(p.author_id) for p in posts]
+    return items, next_cursor, tags, _validators([_post_version(p) for p in posts])
+
+def _feed_validators(db: Session, limit: int, skip: int, cursor: Optional[str], current_user: Optional[UserResponse]):
+    query = db.query(*_VERSION_COLUMNS).join(Post.author)
+    rows, _ = paginate_newest_first(query, Post, limit, skip, cursor)
+    liked_post_ids = get_liked_post_ids(db, current_user, [row.id for row in rows])
+    return for_user(_validators([tuple(row) for row in rows]), liked_post_ids)
+
+def _load_post(db: Session, post_id: int):
+    post = db.query(Post).options(joinedload(Post.author)).filter(Post.id == post_id).first()
+    if not post:
+        raise HTTPException(status_code=404, detail="Post not found")
     
-    posts_with_details = get_posts_with_details(posts, db, current_user)
-    return [PostResponse(**p) for p in posts_with_details]
+    item = PostResponse(**get_posts_with_details([post], db)[0]).model_dump(mode="json")
+    return item, [post_tag(post.id), user_tag(post.author_id)], _validators([_post_version(post)])
 
-@router.post("/", response_model=PostResponse)
-def create_post(
-    post: PostCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+def _post_validators(db: Session, post_id: int, current_user: Optional[UserResponse]):
+    row = db.query(*_VERSION_COLUMNS).join(Post.author).filter(Post.id == post_id).first()
+    if not row:
+        raise HTTPException(status_code=404, detail="Post not found")
+    return for_user(_validators([tuple(row)]), get_liked_post_ids(db, current_user, [post_id]))
+
+def _load_posts_in_order(db: Session, post_ids: List[int]) -> List[Post]:
+    """Posts (with authors) for post_ids in one IN-query, in the order of post_ids; missing ids are skipped"""
+    posts = db.query(Post).options(joinedload(Post.author)).filter(Post.id.in_(post_ids)).all() if post_ids else []
+    by_id = {post.id: post for post in posts}
+    return [by_id[post_id] for post_id in post_ids if post_id in by_id]
+
+def _search_posts(db: Session, q: str, limit: int, cursor: Optional[str], current_user: Optional[UserResponse]):
+    post_ids, next_cursor = search_post_ids(db, q, limit, cursor)
+    ranked = _load_posts_in_order(db, post_ids)
+    return serialize_posts(get_posts_with_details(ranked, db, current_user)), next_cursor
+
+def _batch_posts(db: Session, post_ids: List[int], current_user: Optional[UserResponse]):
+    posts = _load_posts_in_order(db, post_ids)
+    items = {item["id"]: item for item in serialize_posts(get_posts_with_details(posts, db, current_user))}
+    return {"posts": [items.get(post_id) for post_id in post_ids], "missing": [i for i in post_ids if i not in items]}
+
+def _home_timeline(db: Session, limit: int, cursor: Optional[str], current_user: UserResponse):
+    post_ids, next_cursor = timeline_page(db, current_user.id, limit, cursor)
+    ordered = _load_posts_in_order(db, post_ids)
+    return serialize_posts(get_posts_with_details(ordered, db, current_user)), next_cursor
+
+def _trending_posts(db: Session, limit: int, cursor: Optional[str], current_user: Optional[UserResponse]):
+    post_ids, next_cursor = trending_page(db, limit, cursor)
+    ranked = _load_posts_in_order(db, post_ids)
+    return serialize_posts(get_posts_with_details(ranked, db, current_user)), next_cursor
+
+def _create_post(db: Session, post: PostCreate, current_user: UserResponse):
     db_post = Post(
         title=post.title,
         content=post.content,
@@ -44,6 +112,10 @@ def create_post(
         author_id=current_user.id
     )
     db.add(db_post)
+    db.flush()
+    # The author sees the post right away, followers once the job ran
+    fan_out_post(db, db_post.id, db_post.author_id, db_post.created_at, followers=False)
+    enqueue(db, "timeline.fan_out", {"post_id": db_post.id}, idempotency_key=f"timeline.fan_out:{db_post.id}")
     db.commit()
     db.refresh(db_post)
     
@@ -57,61 +129,54 @@ def create_post(
         "author_id": db_post.author_id,
         "created_at": db_post.created_at,
         "updated_at": db_post.updated_at,
-        "author": db_post.author,
+        "author": current_user,
         "likes_count": 0,
         "comments_count": 0,
         "is_liked": False
     }
     return PostResponse(**post_dict)
 
-@router.get("/{post_id}", response_model=PostResponse)
-def get_post(
-    post_id: int,
-    db: Session = Depends(get_db),
-    current_user: Optional[User] = Depends(get_current_user_optional)
-):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    post_with_details = get_posts_with_details([post], db, current_user)[0]
-    return PostResponse(**post_with_details)
+def _toggle_like(db: Session, post_id: int, current_user: UserResponse):
+    """Flip the current user's like without a read-then-write race.
 
-@router.post("/{post_id}/like")
-def toggle_like(
-    post_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    # Check if already liked
-    existing_like = db.query(Like).filter(
-        Like.post_id == post_id,
-        Like.user_id == current_user.id
+    DELETE ... RETURNING both unlikes and tells whether there was a like; if
+    there was none the like is inserted with ON CONFLICT DO NOTHING, so two
+    concurrent taps can never store a second row. The insert selects from
+    posts, which doubles as the existence check for the post.
+    """
+    deleted = db.execute(
+        delete(Like).where(Like.post_id == post_id, Like.user_id == current_user.id).returning(Like.id)
     ).first()
-    
-    if existing_like:
-        # Unlike
-        db.delete(existing_like)
-        db.commit()
-        return {"message": "Post unliked", "liked": False}
+    if deleted:
+        liked = False
+        likes_count = increment_post_counter(db, post_id, Post.likes_count, -1)
     else:
-        # Like
-        new_like = Like(post_id=post_id, user_id=current_user.id)
-        db.add(new_like)
-        db.commit()
-        return {"message": "Post liked", "liked": True}
+        insert = dialect_insert(db)
+        inserted = db.execute(
+            insert(Like)
+            .from_select(
+                ["user_id", "post_id", "created_at"],
+                select(literal(current_user.id, Integer), Post.id, literal(datetime.utcnow(), DateTime))
+                .where(Post.id == post_id)
+            )
+            .on_conflict_do_nothing(index_elements=[Like.user_id, Like.post_id])
+            .returning(Like.id)
+        ).first()
+        liked = True
+        if inserted:
+            likes_count = increment_post_counter(db, post_id, Post.likes_count, 1)
+        else:
+            # Missing post, or a concurrent request liked it first
+            likes_count = db.query(Post.likes_count).filter(Post.id == post_id).scalar()
 
-@router.post("/{post_id}/comments", response_model=CommentResponse)
-def create_comment(
-    post_id: int,
-    comment: CommentCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
+    if likes_count is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Post not found")
+    schedule_rescore(db, post_id)
+    db.commit()
+    return {"message": "Post liked" if liked else "Post unliked", "liked": liked, "likes_count": likes_count}
+
+def _create_comment(db: Session, post_id: int, comment: CommentCreate, current_user: UserResponse):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         raise HTTPException(status_code=404, detail="Post not found")
@@ -122,18 +187,240 @@ def create_comment(
         user_id=current_user.id
     )
     db.add(db_comment)
+    comments_count = increment_post_counter(db, post_id, Post.comments_count, 1)
+    schedule_rescore(db, post_id)
     db.commit()
     db.refresh(db_comment)
-    
-    return db_comment
+    return CommentResponse.model_validate(db_comment), comments_count
+
+def _list_comments(db: Session, post_id: int, limit: int, skip: int, cursor: Optional[str]):
+    # Authors come in with the page through a join instead of one lazy load per comment
+    query = db.query(Comment).options(joinedload(Comment.user)).filter(Comment.post_id == post_id)
+    comments, next_cursor = paginate_oldest_first(query, Comment, limit, skip, cursor)
+    return [CommentResponse.model_validate(c) for c in comments], next_cursor
+
+@router.get("/", response_model=List[PostResponse])
+async def get_posts(
+    request: Request,
+    response: Response,
+    skip: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """Get the feed, newest first.
+
+    Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one;
+    skip/limit paging is kept for older clients. First pages are served from
+    the feed cache, with is_liked overlaid for the current user. Pages carry
+    an ETag; If-None-Match is answered with 304 from the cached page or from
+    a version-only query, before the page is loaded.
+    """
+    if skip or cursor:
+        if request.headers.get("if-none-match"):
+            validators = await run_db(db, _feed_validators, limit, skip, cursor, current_user)
+            if is_not_modified(request, validators.etag):
+                return not_modified(validators)
+        items, next_cursor, _, validators = await run_db(db, _list_posts, limit, skip, cursor, current_user)
+        set_validators(response, for_user(validators, [item["id"] for item in items if item["is_liked"]]))
+        if next_cursor:
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return PostListResponse(items, response)
+
+    cache_key = f"feed:{clamp_limit(limit)}"
+    page = feed_cache.get(cache_key)
+    if page is None:
+        items, next_cursor, tags, validators = await run_db(db, _list_posts, limit)
+        page = {"items": items, "next_cursor": next_cursor, "validators": list(validators)}
+        feed_cache.set(cache_key, page, tags=tags)
+    liked_post_ids = set()
+    if current_user is not None:
+        liked_post_ids = await run_db(db, get_liked_post_ids, current_user, [item["id"] for item in page["items"]])
+    validators = for_user(Validators(*page["validators"]), liked_post_ids)
+    if is_not_modified(request, validators.etag):
+        return not_modified(validators)
+    set_validators(response, validators)
+    if page["next_cursor"]:
+        response.headers[NEXT_CURSOR_HEADER] = page["next_cursor"]
+    if current_user is None:
+        return PostListResponse(page["items"], response)
+    return PostListResponse(overlay_is_liked(page["items"], liked_post_ids), response)
+
+@router.post("/", response_model=PostResponse)
+async def create_post(
+    post: PostCreate,
+    current_user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+):
+    created = await run_db(db, _create_post, post, current_user)
+    feed_cache.invalidate_tags(FEED_TAG)
+    event_broker.publish(FEED_TOPIC, {"latest_post_id": created.id})
+    return created
+
+@router.get("/search", response_model=List[PostResponse])
+async def search_posts(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """Full-text search over post titles and contents, best matches first (X-Next-Cursor paging)"""
+    items, next_cursor = await run_db(db, _search_posts, q, limit, cursor, current_user)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return PostListResponse(items, response)
+
+@router.get("/timeline", response_model=List[PostResponse])
+async def get_timeline(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: UserResponse = Depends(get_current_user)
+):
+    """Home timeline: posts of the current user and the users they follow, newest first (X-Next-Cursor paging)"""
+    items, next_cursor = await run_db(db, _home_timeline, limit, cursor, current_user)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return PostListResponse(items, response)
+
+@router.get("/trending", response_model=List[PostResponse])
+async def get_trending(
+    response: Response,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """Recently liked and commented posts, hottest first (X-Next-Cursor paging)"""
+    items, next_cursor = await run_db(db, _trending_posts, limit, cursor, current_user)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return PostListResponse(items, response)
+
+@router.get("/batch", response_model=PostBatchResponse)
+async def get_posts_batch(
+    ids: str = Query(..., description="Comma separated post ids, at most 100"),
+    db: DBSession = Depends(get_read_session),
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """Several posts in one request, in the order of ids (duplicates once); missing ids are null and listed in missing"""
+    post_ids = parse_id_list(ids, MAX_PAGE_SIZE)
+    return ORJSONResponse(await run_db(db, _batch_posts, post_ids, current_user))
+
+@router.get("/stream")
+async def stream_posts(post_ids: str = "", feed: bool = False):
+    """Server-sent events with live updates instead of polling.
+
+    `post` events carry the new likes_count and/or comments_count (plus
+    last_comment_id) of the posts in post_ids (comma separated); with
+    feed=true, `feed` events carry the id of the latest new post. Updates
+    that arrive faster than the client reads are merged into one event.
+    """
+    topics = [post_topic(post_id) for post_id in parse_id_list(post_ids, MAX_PAGE_SIZE)]
+    if feed:
+        topics.append(FEED_TOPIC)
+    if not topics:
+        raise HTTPException(status_code=400, detail="Pass post_ids and/or feed=true")
+    return StreamingResponse(
+        event_stream(topics),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/{post_id}", response_model=PostResponse)
+async def get_post(
+    post_id: int,
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_session),
+    current_user: Optional[UserResponse] = Depends(get_current_user_optional)
+):
+    """Get a post (with an ETag; If-None-Match is answered with 304 before the post is loaded)"""
+    cache_key = f"post:{post_id}"
+    entry = feed_cache.get(cache_key)
+    if entry is None and request.headers.get("if-none-match"):
+        validators = await run_db(db, _post_validators, post_id, current_user)
+        if is_not_modified(request, validators.etag):
+            return not_modified(validators)
+    if entry is None:
+        item, tags, validators = await run_db(db, _load_post, post_id)
+        entry = {"item": item, "validators": list(validators)}
+        feed_cache.set(cache_key, entry, tags=tags)
+
+    liked_post_ids = set()
+    if current_user is not None:
+        liked_post_ids = await run_db(db, get_liked_post_ids, current_user, [post_id])
+    validators = for_user(Validators(*entry["validators"]), liked_post_ids)
+    if is_not_modified(request, validators.etag):
+        return not_modified(validators)
+    set_validators(response, validators)
+    if current_user is None:
+        return entry["item"]
+    return overlay_is_liked([entry["item"]], liked_post_ids)[0]
+
+@router.post("/{post_id}/like")
+async def toggle_like(
+    post_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+):
+    result = await run_db(db, _toggle_like, post_id, current_user)
+    feed_cache.invalidate_tags(post_tag(post_id))
+    event_broker.publish(post_topic(post_id), {"post_id": post_id, "likes_count": result["likes_count"]})
+    return result
+
+@router.post("/{post_id}/comments", response_model=CommentResponse)
+async def create_comment(
+    post_id: int,
+    comment: CommentCreate,
+    current_user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+):
+    created, comments_count = await run_db(db, _create_comment, post_id, comment, current_user)
+    feed_cache.invalidate_tags(post_tag(post_id))
+    event_broker.publish(
+        post_topic(post_id), {"post_id": post_id, "comments_count": comments_count, "last_comment_id": created.id}
+    )
+    return created
 
 @router.get("/{post_id}/comments", response_model=List[CommentResponse])
-def get_comments(post_id: int, db: Session = Depends(get_db)):
-    comments = db.query(Comment).filter(Comment.post_id == post_id).all()
+async def get_comments(
+    post_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session)
+):
+    """Get comments of a post, oldest first, paged like the feed (X-Next-Cursor)"""
+    comments, next_cursor = await run_db(db, _list_comments, post_id, limit, skip, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return comments
 
+async def _spool_upload(file: UploadFile) -> str:
+    """Copy an upload to a temp file in chunks, enforcing MAX_UPLOAD_BYTES"""
+    with tempfile.NamedTemporaryFile(prefix="upload_", delete=False) as tmp:
+        try:
+            written = 0
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                written += len(chunk)
+                if written > MAX_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="File too large")
+                await run_in_threadpool(tmp.write, chunk)
+        except BaseException:
+            tmp.close()
+            os.unlink(tmp.name)
+            raise
+    return tmp.name
+
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...)):
+    """Upload an image; returns the main 1080px JPEG plus a map of smaller and WebP renditions"""
     if not file.filename:
         raise HTTPException(status_code=400, detail="No file provided")
     
@@ -141,46 +428,33 @@ async def upload_file(file: UploadFile = File(...)):
     if not file.content_type or not file.content_type.startswith('image/'):
         raise HTTPException(status_code=400, detail="Only image files are allowed")
     
-    # Generate unique filename with safe characters only
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    file_extension = os.path.splitext(file.filename)[1] if '.' in file.filename else '.jpg'
-    safe_filename = f"{timestamp}_upload{file_extension}"
-    file_path = os.path.join(UPLOAD_DIR, safe_filename)
-    
+    tmp_path = await _spool_upload(file)
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Process image with PIL
-        image = Image.open(io.BytesIO(file_content))
-        
-        # Convert to RGB if necessary (for JPEG)
-        if image.mode in ('RGBA', 'LA', 'P'):
-            image = image.convert('RGB')
-        
-        # Instagram-like square crop (1:1 aspect ratio)
-        width, height = image.size
-        
-        # Determine the size for square crop
-        size = min(width, height)
-        
-        # Calculate crop coordinates for center crop
-        left = (width - size) // 2
-        top = (height - size) // 2
-        right = left + size
-        bottom = top + size
-        
-        # Crop to square
-        cropped_image = image.crop((left, top, right, bottom))
-        
-        # Resize to standard Instagram size (1080x1080 for high quality)
-        final_size = 1080
-        resized_image = cropped_image.resize((final_size, final_size), Image.Resampling.LANCZOS)
-        
-        # Save processed image
-        resized_image.save(file_path, 'JPEG', quality=85, optimize=True)
-        
-        return {"filename": safe_filename, "url": f"/uploads/{safe_filename}"}
-        
+        # Decode once, crop to a square and encode every rendition, in a worker process;
+        # files are named by content hash, so re-uploads of the same image are deduplicated
+        filenames, deduplicated = await image_pool.run(process_upload, tmp_path, os.path.abspath(UPLOAD_DIR), MAX_IMAGE_PIXELS)
+    except PoolSaturated:
+        raise HTTPException(status_code=503, detail="Too many uploads in progress, try again shortly", headers={"Retry-After": "2"})
+    except ImageTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except Image.DecompressionBombError:
+        # Pillow's own pixel guard, should an image slip past the ImageTooLarge check
+        raise HTTPException(status_code=413, detail="Image has too many pixels to decode")
+    except UnidentifiedImageError:
+        raise HTTPException(status_code=400, detail="Unsupported or invalid image")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+    finally:
+        os.unlink(tmp_path)
+    
+    main_filename = filenames[MAIN_SIZE]["jpeg"]
+    renditions = {
+        str(size): {name: f"/uploads/{filename}" for name, filename in formats.items()}
+        for size, formats in filenames.items()
+    }
+    return {
+        "filename": main_filename,
+        "url": f"/uploads/{main_filename}",
+        "renditions": renditions,
+        "deduplicated": deduplicated
+    }
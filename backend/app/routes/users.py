@@ -1,37 +1,107 @@
-from sqlalchemy.orm import Session
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from sqlalchemy.orm import Session, joinedload
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import ORJSONResponse
+from typing import List, Optional
 
 from app.models import User, Post
-from app.schemas import UserResponse, PostResponse
-from app.database import get_db
+from app.schemas import UserBatchResponse, UserResponse, PostResponse
+from app.database import DBSession, get_read_session, get_session, run_db
 from app.routes.auth import get_current_user
+from app.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, NEXT_CURSOR_HEADER, paginate_newest_first
+from app.utils import get_posts_with_details, parse_id_list
+from app.serialization import PostListResponse, serialize_posts, serialize_users
+from app.timeline import follow, unfollow
+from app.conditional import Validators, http_date, is_not_modified, make_etag, not_modified, set_validators
 
 router = APIRouter()
 
-@router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
-    """Get current user information"""
-    return current_user
-
-@router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    """Get user by ID"""
+def _load_user(db: Session, user_id: int, request: Request):
+    """The user and its validators; the user is None (not validated) when If-None-Match already matches"""
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
+    validators = Validators(make_etag(user.id, user.updated_at), http_date(user.updated_at or user.created_at))
+    if is_not_modified(request, validators.etag):
+        return None, validators
+    return UserResponse.model_validate(user), validators
 
-@router.get("/{user_id}/posts", response_model=List[PostResponse])
-def get_user_posts(user_id: int, db: Session = Depends(get_db)):
-    """Get posts by user ID"""
+def _batch_users(db: Session, user_ids: List[int]):
+    users = db.query(User).filter(User.id.in_(user_ids)).all() if user_ids else []
+    items = {item["id"]: item for item in serialize_users(users)}
+    return {"users": [items.get(user_id) for user_id in user_ids], "missing": [i for i in user_ids if i not in items]}
+
+def _follow(db: Session, user_id: int, current_user: UserResponse):
+    followers_count = follow(db, current_user.id, user_id)
+    return {"message": "User followed", "following": True, "followers_count": followers_count}
+
+def _unfollow(db: Session, user_id: int, current_user: UserResponse):
+    followers_count = unfollow(db, current_user.id, user_id)
+    return {"message": "User unfollowed", "following": False, "followers_count": followers_count}
+
+def _list_user_posts(db: Session, user_id: int, limit: int, skip: int, cursor: Optional[str]):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    posts = db.query(Post).filter(Post.author_id == user_id).order_by(Post.created_at.desc()).all()
+    query = db.query(Post).options(joinedload(Post.author)).filter(Post.author_id == user_id)
+    posts, next_cursor = paginate_newest_first(query, Post, limit, skip, cursor)
     
     # Use the utility function to enrich posts with details
-    from app.utils import get_posts_with_details
     posts_with_details = get_posts_with_details(posts, db, None)
-    return [PostResponse(**p) for p in posts_with_details]
+    return serialize_posts(posts_with_details), next_cursor
+
+@router.get("/me", response_model=UserResponse)
+async def get_current_user_info(current_user: UserResponse = Depends(get_current_user)):
+    """Get current user information"""
+    return current_user
+
+@router.get("/batch", response_model=UserBatchResponse)
+async def get_users_batch(
+    ids: str = Query(..., description="Comma separated user ids, at most 100"),
+    db: DBSession = Depends(get_read_session)
+):
+    """Several users in one request, in the order of ids (duplicates once); missing ids are null and listed in missing"""
+    user_ids = parse_id_list(ids, MAX_PAGE_SIZE)
+    return ORJSONResponse(await run_db(db, _batch_users, user_ids))
+
+@router.get("/{user_id}", response_model=UserResponse)
+async def get_user(user_id: int, request: Request, response: Response, db: DBSession = Depends(get_read_session)):
+    """Get user by ID (with an ETag; If-None-Match is answered with 304)"""
+    user, validators = await run_db(db, _load_user, user_id, request)
+    if user is None:
+        return not_modified(validators)
+    set_validators(response, validators)
+    return user
+
+@router.get("/{user_id}/posts", response_model=List[PostResponse])
+async def get_user_posts(
+    user_id: int,
+    response: Response,
+    skip: int = 0,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session)
+):
+    """Get posts by user ID, newest first (same paging as the feed)"""
+    posts, next_cursor = await run_db(db, _list_user_posts, user_id, limit, skip, cursor)
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
+    return PostListResponse(posts, response)
+
+@router.post("/{user_id}/follow")
+async def follow_user(
+    user_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+):
+    """Follow a user; their recent posts are added to the home timeline"""
+    return await run_db(db, _follow, user_id, current_user)
+
+@router.delete("/{user_id}/follow")
+async def unfollow_user(
+    user_id: int,
+    current_user: UserResponse = Depends(get_current_user),
+    db: DBSession = Depends(get_session)
+):
+    """Unfollow a user; their posts are removed from the home timeline"""
+    return await run_db(db, _unfollow, user_id, current_user)
@@ -53,6 +53,11 @@ class PostResponse(PostBase):
     class Config:
         from_attributes = True
 
+class PostBatchResponse(BaseModel):
+    # In request order, null where the id does not exist
+    posts: List[Optional[PostResponse]]
+    missing: List[int]
+
 class CommentBase(BaseModel):
     content: str
 
@@ -75,3 +80,8 @@ class Token(BaseModel):
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+
+class UserBatchResponse(BaseModel):
+    # In request order, null where the id does not exist
+    users: List[Optional[UserResponse]]
+    missing: List[int]
@@ -0,0 +1,81 @@
+"""Full-text search over post titles and contents.
+
+The index is not part of the Post model, see migration 0004: a generated
+tsvector column with a GIN index on Postgres, an FTS5 table kept in sync by
+triggers on SQLite. Both are maintained by the database, so every way of
+writing posts (routes, seeding, plain SQL) keeps the index up to date.
+
+Results are ordered by an ascending score (best match first), then id, and
+paged with a keyset cursor over (score, id).
+"""
+import re
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.pagination import clamp_limit, decode_score_cursor, encode_score_cursor
+
+# Index objects created by migration 0004 that autogenerate must not touch
+SEARCH_SCHEMA_NAMES = ("search_vector", "ix_posts_search_vector")
+SEARCH_TABLE_PREFIX = "posts_fts"
+
+def include_name(name, type_, parent_names) -> bool:
+    """Alembic include_name hook that leaves the search index out of comparisons"""
+    if name is None:
+        return True
+    if type_ == "table" and name.startswith(SEARCH_TABLE_PREFIX):
+        return False
+    return name not in SEARCH_SCHEMA_NAMES
+
+# bm25 is lower-is-better; weights favour the title (same ratio as tsvector weights A/B)
+_SQLITE_SCORE = "bm25(posts_fts, 2.5, 1.0)"
+_SQLITE_SEARCH = (
+    f"SELECT rowid AS id, {_SQLITE_SCORE} AS score FROM posts_fts "
+    "WHERE posts_fts MATCH :query {after} ORDER BY score, id LIMIT :limit"
+)
+
+# ts_rank_cd is higher-is-better, negated so both dialects sort ascending
+_POSTGRES_SCORE = "-ts_rank_cd(search_vector, query)"
+_POSTGRES_SEARCH = (
+    f"SELECT id, {_POSTGRES_SCORE} AS score FROM posts, websearch_to_tsquery('simple', :query) AS query "
+    "WHERE search_vector @@ query {after} ORDER BY score, id LIMIT :limit"
+)
+
+_WORD_RE = re.compile(r"\w+")
+
+def fts5_query(q: str) -> Optional[str]:
+    """Every word of q as a quoted FTS5 string, so all must match and none is read as syntax"""
+    words = _WORD_RE.findall(q)
+    return " ".join(f'"{word}"' for word in words) or None
+
+def search_post_ids(db: Session, q: str, limit: int, cursor: Optional[str] = None) -> Tuple[List[int], Optional[str]]:
+    """Ids of the posts matching q, best first, and the cursor for the next page"""
+    limit = clamp_limit(limit)
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        sql, score, id_column = _SQLITE_SEARCH, _SQLITE_SCORE, "rowid"
+        query = fts5_query(q)
+        if query is None:
+            return [], None
+    elif dialect == "postgresql":
+        sql, score, id_column = _POSTGRES_SEARCH, _POSTGRES_SCORE, "id"
+        query = q
+    else:
+        raise HTTPException(status_code=501, detail="Search is not supported on this database")
+
+    params = {"query": query, "limit": limit + 1}
+    after = ""
+    if cursor:
+        params["after_score"], params["after_id"] = decode_score_cursor(cursor)
+        after = (
+            f"AND ({score} > :after_score OR ({score} = :after_score AND {id_column} > :after_id))"
+        )
+
+    rows = db.execute(text(sql.format(after=after)), params).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_score_cursor(rows[-1].score, rows[-1].id)
+    return [row.id for row in rows], next_cursor
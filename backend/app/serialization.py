@@ -0,0 +1,72 @@
+"""Single-pass serialization of post listings.
+
+The listing routes keep response_model=List[PostResponse] for the OpenAPI
+schema but return a PostListResponse, so FastAPI skips its own validation
+and jsonable_encoder pass:
+- serialize_posts validates the get_posts_with_details dicts once and dumps
+  them to JSON-ready dicts, the form the feed cache stores
+- PostListResponse encodes them with orjson
+
+Authors are the expensive part (EmailStr validation), so validated authors
+are kept in a small LRU keyed by (id, updated_at): a profile change moves
+updated_at, so an entry is never stale, it just stops being used.
+"""
+import os
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+from fastapi import Response
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+
+from app.schemas import PostResponse, UserResponse
+
+_post_list = TypeAdapter(List[PostResponse])
+
+AUTHOR_CACHE_SIZE = int(os.getenv("AUTHOR_CACHE_SIZE", "10000"))
+_authors: "OrderedDict[tuple, UserResponse]" = OrderedDict()
+_authors_lock = threading.Lock()
+
+def _validated_author(author) -> UserResponse:
+    if isinstance(author, UserResponse):
+        return author
+    if author.updated_at is None:
+        return UserResponse.model_validate(author)
+    key = (author.id, author.updated_at)
+    with _authors_lock:
+        validated = _authors.get(key)
+        if validated is not None:
+            _authors.move_to_end(key)
+            return validated
+    validated = UserResponse.model_validate(author)
+    with _authors_lock:
+        _authors[key] = validated
+        while len(_authors) > AUTHOR_CACHE_SIZE:
+            _authors.popitem(last=False)
+    return validated
+
+def clear_author_cache():
+    with _authors_lock:
+        _authors.clear()
+
+def serialize_posts(posts_with_details: List[dict]) -> List[dict]:
+    """Validate enriched post dicts once and dump them as JSON-ready dicts"""
+    # Model instances are not revalidated, so the authors are not checked again here
+    validated = _post_list.validate_python(
+        [dict(post, author=_validated_author(post["author"])) for post in posts_with_details]
+    )
+    return _post_list.dump_python(validated, mode="json")
+
+def serialize_users(users: list) -> List[dict]:
+    """JSON-ready UserResponse dicts for ORM users, validated through the author cache"""
+    return [_validated_author(user).model_dump(mode="json") for user in users]
+
+class PostListResponse(ORJSONResponse):
+    """orjson-encoded list of serialize_posts items"""
+
+    def __init__(self, items: List[dict], response: Optional[Response] = None, **kwargs):
+        super().__init__(items, **kwargs)
+        # Headers the route set on its injected Response (ETag, X-Next-Cursor, ...)
+        if response is not None:
+            self.raw_headers.extend(response.raw_headers)
@@ -0,0 +1,212 @@
+"""Follow graph and materialized home timelines.
+
+A user's home timeline is kept as rows in timeline_entries (post id plus a
+copy of its created_at), so a page is one index range scan instead of a
+join of follows and posts:
+- fan-out on write: a new post goes to its author's timeline in the
+  transaction creating it, and into the timelines of the author's followers
+  with one INSERT ... SELECT in a background job (app/jobs.py)
+- fan-out on read: authors with TIMELINE_FANOUT_MAX_FOLLOWERS followers or
+  more are skipped on write (one post would write that many rows); their
+  posts are merged in when a page is read
+- a timeline keeps at most TIMELINE_MAX_ENTRIES entries; older ones are
+  trimmed by a periodic job (timeline.trim, run by the workers), so reading
+  a timeline never writes
+
+Following someone backfills their recent posts, unfollowing removes them.
+"""
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import DateTime, Integer, and_, delete, func, literal, or_, select, text, union_all, update
+from sqlalchemy.orm import Session
+
+from app.jobs import job_handler
+from app.models import Follow, Post, TimelineEntry, User
+from app.pagination import clamp_limit, decode_cursor, encode_cursor
+from app.utils import dialect_insert
+
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", "800"))
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(os.getenv("TIMELINE_FANOUT_MAX_FOLLOWERS", "10000"))
+TIMELINE_TRIM_SECONDS = float(os.getenv("TIMELINE_TRIM_SECONDS", "3600"))
+
+_ENTRY_COLUMNS = ["user_id", "post_id", "author_id", "created_at"]
+
+def _followers_count_of(author_id: int):
+    return select(User.followers_count).where(User.id == author_id).scalar_subquery()
+
+def fan_out_post(db: Session, post_id: int, author_id: int, created_at: datetime, followers: bool = True):
+    """Add a new post to its author's timeline and, unless the author has too
+    many followers or followers is False, to every follower's (inside the
+    caller's transaction)"""
+    entry = (literal(post_id, Integer), literal(author_id, Integer), literal(created_at, DateTime))
+    rows = select(literal(author_id, Integer), *entry)
+    if followers:
+        to_followers = select(Follow.follower_id, *entry).where(
+            Follow.followee_id == author_id,
+            _followers_count_of(author_id) < TIMELINE_FANOUT_MAX_FOLLOWERS,
+        )
+        rows = union_all(to_followers, rows)
+    db.execute(
+        dialect_insert(db)(TimelineEntry)
+        .from_select(_ENTRY_COLUMNS, rows)
+        .on_conflict_do_nothing()
+    )
+
+@job_handler("timeline.fan_out")
+def fan_out_job(db: Session, post_id: int):
+    post = db.execute(select(Post.author_id, Post.created_at).where(Post.id == post_id)).first()
+    if post is not None:
+        fan_out_post(db, post_id, post.author_id, post.created_at)
+
+def _adjust_follow_counters(db: Session, follower_id: int, followee_id: int, delta: int) -> int:
+    # updated_at is kept: follows are not edits of the profile
+    db.execute(
+        update(User)
+        .where(User.id == follower_id)
+        .values(following_count=User.following_count + delta, updated_at=User.updated_at)
+    )
+    return db.execute(
+        update(User)
+        .where(User.id == followee_id)
+        .values(followers_count=User.followers_count + delta, updated_at=User.updated_at)
+        .returning(User.followers_count)
+    ).scalar()
+
+def _check_followee(db: Session, follower_id: int, followee_id: int):
+    if follower_id == followee_id:
+        raise HTTPException(status_code=400, detail="You cannot follow yourself")
+    if db.get(User, followee_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+
+def follow(db: Session, follower_id: int, followee_id: int) -> int:
+    """Follow followee (idempotent) and backfill their recent posts; returns their follower count"""
+    _check_followee(db, follower_id, followee_id)
+    created = db.execute(
+        dialect_insert(db)(Follow)
+        .values(follower_id=follower_id, followee_id=followee_id, created_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=[Follow.follower_id, Follow.followee_id])
+        .returning(Follow.id)
+    ).first()
+    if not created:
+        followers_count = db.query(User.followers_count).filter(User.id == followee_id).scalar()
+        db.commit()
+        return followers_count
+
+    followers_count = _adjust_follow_counters(db, follower_id, followee_id, 1)
+    if followers_count < TIMELINE_FANOUT_MAX_FOLLOWERS:
+        recent = (
+            select(literal(follower_id, Integer), Post.id, Post.author_id, Post.created_at)
+            .where(Post.author_id == followee_id)
+            .order_by(Post.created_at.desc(), Post.id.desc())
+            .limit(TIMELINE_MAX_ENTRIES)
+        )
+        db.execute(dialect_insert(db)(TimelineEntry).from_select(_ENTRY_COLUMNS, recent).on_conflict_do_nothing())
+    db.commit()
+    return followers_count
+
+def unfollow(db: Session, follower_id: int, followee_id: int) -> int:
+    """Stop following followee (idempotent) and drop their posts from the timeline"""
+    _check_followee(db, follower_id, followee_id)
+    deleted = db.execute(
+        delete(Follow)
+        .where(Follow.follower_id == follower_id, Follow.followee_id == followee_id)
+        .returning(Follow.id)
+    ).first()
+    if not deleted:
+        followers_count = db.query(User.followers_count).filter(User.id == followee_id).scalar()
+        db.commit()
+        return followers_count
+
+    followers_count = _adjust_follow_counters(db, follower_id, followee_id, -1)
+    db.execute(delete(TimelineEntry).where(TimelineEntry.user_id == follower_id, TimelineEntry.author_id == followee_id))
+    db.commit()
+    return followers_count
+
+def trim_timeline(db: Session, user_id: int):
+    """Drop entries beyond the newest TIMELINE_MAX_ENTRIES (inside the caller's transaction)"""
+    boundary = db.execute(
+        select(TimelineEntry.created_at, TimelineEntry.post_id)
+        .where(TimelineEntry.user_id == user_id)
+        .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc())
+        .offset(TIMELINE_MAX_ENTRIES)
+        .limit(1)
+    ).first()
+    if boundary is None:
+        return
+    db.execute(
+        delete(TimelineEntry).where(
+            TimelineEntry.user_id == user_id,
+            or_(
+                TimelineEntry.created_at < boundary.created_at,
+                and_(TimelineEntry.created_at == boundary.created_at, TimelineEntry.post_id <= boundary.post_id),
+            ),
+        )
+    )
+
+@job_handler("timeline.trim")
+def trim_timelines(db: Session) -> int:
+    """Trim every timeline above TIMELINE_MAX_ENTRIES (inside the caller's transaction); returns how many"""
+    oversized = db.execute(
+        select(TimelineEntry.user_id)
+        .group_by(TimelineEntry.user_id)
+        .having(func.count() > TIMELINE_MAX_ENTRIES)
+    ).scalars().all()
+    for user_id in oversized:
+        trim_timeline(db, user_id)
+    return len(oversized)
+
+def _newest_first(query, created_at, item_id, limit: int, cursor: Optional[Tuple[datetime, int]]):
+    if cursor:
+        query = query.where(or_(created_at < cursor[0], and_(created_at == cursor[0], item_id < cursor[1])))
+    return query.order_by(created_at.desc(), item_id.desc()).limit(limit)
+
+def timeline_page(db: Session, user_id: int, limit: int, cursor: Optional[str] = None) -> Tuple[List[int], Optional[str]]:
+    """Post ids of a home timeline page, newest first, and the cursor for the next page"""
+    limit = clamp_limit(limit)
+    after = decode_cursor(cursor) if cursor else None
+    materialized = _newest_first(
+        select(TimelineEntry.post_id, TimelineEntry.created_at).where(TimelineEntry.user_id == user_id),
+        TimelineEntry.created_at, TimelineEntry.post_id, limit + 1, after,
+    )
+    # Posts of followed authors that were not fanned out on write
+    pulled = _newest_first(
+        select(Post.id, Post.created_at)
+        .join(Follow, Follow.followee_id == Post.author_id)
+        .join(User, User.id == Post.author_id)
+        .where(Follow.follower_id == user_id, User.followers_count >= TIMELINE_FANOUT_MAX_FOLLOWERS),
+        Post.created_at, Post.id, limit + 1, after,
+    )
+
+    merged = {post_id: created_at for post_id, created_at in db.execute(materialized)}
+    merged.update({post_id: created_at for post_id, created_at in db.execute(pulled)})
+    page = sorted(merged.items(), key=lambda item: (item[1], item[0]), reverse=True)[:limit + 1]
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1][1], page[-1][0])
+    return [post_id for post_id, _ in page], next_cursor
+
+def rebuild_timelines(db: Session) -> int:
+    """Recompute every materialized timeline from follows and posts (bulk loads, repairs)"""
+    db.execute(delete(TimelineEntry))
+    result = db.execute(
+        text(
+            "INSERT INTO timeline_entries (user_id, post_id, author_id, created_at) "
+            "SELECT user_id, post_id, author_id, created_at FROM ("
+            "  SELECT sources.user_id, posts.id AS post_id, posts.author_id, posts.created_at,"
+            "         ROW_NUMBER() OVER (PARTITION BY sources.user_id ORDER BY posts.created_at DESC, posts.id DESC) AS position"
+            "  FROM ("
+            "    SELECT follows.follower_id AS user_id, follows.followee_id AS author_id FROM follows"
+            "    JOIN users ON users.id = follows.followee_id WHERE users.followers_count < :max_followers"
+            "    UNION ALL SELECT users.id, users.id FROM users"
+            "  ) AS sources JOIN posts ON posts.author_id = sources.author_id"
+            ") AS ranked WHERE position <= :max_entries"
+        ),
+        {"max_followers": TIMELINE_FANOUT_MAX_FOLLOWERS, "max_entries": TIMELINE_MAX_ENTRIES},
+    )
+    db.commit()
+    return result.rowcount
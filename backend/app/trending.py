@@ -0,0 +1,137 @@
+"""Trending posts, ranked by a hotness score kept in trending_scores.
+
+The score is the Reddit "hot" formula:
+
+    log10(max(engagement, 1)) + seconds since TRENDING_EPOCH / TRENDING_DECAY_SECONDS
+
+where engagement is likes + TRENDING_COMMENT_WEIGHT * comments. Time decay is
+applied lazily: instead of lowering every score as posts age, newer posts
+start higher (by one point per TRENDING_DECAY_SECONDS, i.e. 10x the
+engagement), so a score only changes when its post is liked, unliked or
+commented on, and is then updated by a background job (app/jobs.py); the
+interactions with a post within TRENDING_RESCORE_SECONDS share one job.
+
+Posts enter the table with their first like or comment. compact_trending
+(run periodically by the workers, or with compact_trending.py) drops cold
+posts, those that score below a post with a single like that is
+TRENDING_WINDOW_SECONDS old, and keeps at most TRENDING_MAX_ENTRIES, so a
+trending page stays one range scan of the (score, post_id) index however
+large posts and likes grow.
+"""
+import math
+import os
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import and_, delete, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.jobs import enqueue_debounced, job_handler
+from app.models import Post, TrendingScore
+from app.pagination import clamp_limit, decode_score_cursor, encode_score_cursor
+from app.utils import dialect_insert
+
+TRENDING_EPOCH = datetime(2024, 1, 1)
+TRENDING_DECAY_SECONDS = float(os.getenv("TRENDING_DECAY_SECONDS", "45000"))
+TRENDING_COMMENT_WEIGHT = int(os.getenv("TRENDING_COMMENT_WEIGHT", "2"))
+TRENDING_WINDOW_SECONDS = float(os.getenv("TRENDING_WINDOW_SECONDS", str(3 * 24 * 3600)))
+TRENDING_MAX_ENTRIES = int(os.getenv("TRENDING_MAX_ENTRIES", "10000"))
+TRENDING_COMPACT_SECONDS = float(os.getenv("TRENDING_COMPACT_SECONDS", "3600"))
+TRENDING_RESCORE_SECONDS = float(os.getenv("TRENDING_RESCORE_SECONDS", "10"))
+
+def hotness(likes_count: int, comments_count: int, created_at: datetime) -> float:
+    engagement = likes_count + TRENDING_COMMENT_WEIGHT * comments_count
+    age = (created_at - TRENDING_EPOCH).total_seconds()
+    return math.log10(max(engagement, 1)) + age / TRENDING_DECAY_SECONDS
+
+def cold_score(now: Optional[datetime] = None) -> float:
+    """Scores below this are not trending any more: a single like, TRENDING_WINDOW_SECONDS ago"""
+    age = ((now or datetime.utcnow()) - TRENDING_EPOCH).total_seconds() - TRENDING_WINDOW_SECONDS
+    return age / TRENDING_DECAY_SECONDS
+
+@job_handler("trending.rescore")
+def record_engagement(db: Session, post_id: int):
+    """Rescore a post after a like, unlike or comment (inside the caller's transaction)"""
+    post = db.execute(
+        select(Post.likes_count, Post.comments_count, Post.created_at).where(Post.id == post_id)
+    ).first()
+    if post is None:
+        return
+    if post.likes_count + post.comments_count == 0:
+        db.execute(delete(TrendingScore).where(TrendingScore.post_id == post_id))
+        return
+    score = hotness(post.likes_count, post.comments_count, post.created_at)
+    db.execute(
+        dialect_insert(db)(TrendingScore)
+        .values(post_id=post_id, score=score)
+        .on_conflict_do_update(index_elements=[TrendingScore.post_id], set_={"score": score})
+    )
+
+def schedule_rescore(db: Session, post_id: int):
+    """Queue record_engagement for a post that was just liked, unliked or commented on (inside the caller's transaction)"""
+    enqueue_debounced(
+        db, "trending.rescore", {"post_id": post_id}, f"trending.rescore:{post_id}", TRENDING_RESCORE_SECONDS,
+    )
+
+def trending_page(db: Session, limit: int, cursor: Optional[str] = None) -> Tuple[List[int], Optional[str]]:
+    """Post ids of a trending page, hottest first, and the cursor for the next page"""
+    limit = clamp_limit(limit)
+    query = select(TrendingScore.post_id, TrendingScore.score)
+    if cursor:
+        score, post_id = decode_score_cursor(cursor)
+        query = query.where(or_(
+            TrendingScore.score < score,
+            and_(TrendingScore.score == score, TrendingScore.post_id < post_id),
+        ))
+    rows = db.execute(
+        query.order_by(TrendingScore.score.desc(), TrendingScore.post_id.desc()).limit(limit + 1)
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_score_cursor(rows[-1].score, rows[-1].post_id)
+    return [row.post_id for row in rows], next_cursor
+
+@job_handler("trending.compact")
+def compact_trending(db: Session, now: Optional[datetime] = None) -> int:
+    """Drop cold posts and everything past the hottest TRENDING_MAX_ENTRIES (inside the caller's
+    transaction); returns the rows removed"""
+    removed = db.execute(delete(TrendingScore).where(TrendingScore.score < cold_score(now))).rowcount
+    boundary = db.execute(
+        select(TrendingScore.score, TrendingScore.post_id)
+        .order_by(TrendingScore.score.desc(), TrendingScore.post_id.desc())
+        .offset(TRENDING_MAX_ENTRIES)
+        .limit(1)
+    ).first()
+    if boundary is not None:
+        removed += db.execute(
+            delete(TrendingScore).where(or_(
+                TrendingScore.score < boundary.score,
+                and_(TrendingScore.score == boundary.score, TrendingScore.post_id <= boundary.post_id),
+            ))
+        ).rowcount
+    return removed
+
+def rebuild_trending(db: Session, batch_size: int = 10000, now: Optional[datetime] = None) -> int:
+    """Rescore every post with likes or comments from scratch (bulk loads, repairs); returns the rows kept"""
+    db.execute(delete(TrendingScore))
+    floor = cold_score(now)
+    max_id = db.query(func.max(Post.id)).scalar() or 0
+    scored = 0
+    for start in range(1, max_id + 1, batch_size):
+        rows = db.execute(
+            select(Post.id, Post.likes_count, Post.comments_count, Post.created_at)
+            .where(Post.id.between(start, start + batch_size - 1), Post.likes_count + Post.comments_count > 0)
+        ).all()
+        scores = [
+            {"post_id": row.id, "score": score}
+            for row in rows
+            if (score := hotness(row.likes_count, row.comments_count, row.created_at)) >= floor
+        ]
+        if scores:
+            db.execute(dialect_insert(db)(TrendingScore), scores)
+            scored += len(scores)
+    removed = compact_trending(db, now)
+    db.commit()
+    return scored - removed
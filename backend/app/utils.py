@@ -1,18 +1,37 @@
-from typing import List, Optional
+from typing import List, Optional, Set
+from fastapi import HTTPException
+from sqlalchemy import inspect, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session
 
-from app.models import Post, Like, Comment, User
+from app.models import Post, Like, User
 
 def get_posts_with_details(posts: List[Post], db: Session, current_user: Optional[User] = None) -> List[dict]:
-    """Helper function to enrich post data with likes, comments, etc."""
+    """Helper function to enrich post data with likes, comments, etc.
+
+    Counts come straight from the denormalized Post columns; the rest runs a
+    fixed number of queries per page regardless of its size: one is_liked
+    lookup for the current user and one batch load for authors that were
+    not eager-loaded.
+    """
+    if not posts:
+        return []
+
+    post_ids = [post.id for post in posts]
+
+    liked_post_ids = get_liked_post_ids(db, current_user, post_ids)
+
+    # Authors that were not eager-loaded come from one batch query instead of
+    # a lazy load of post.author per post.
+    missing_author_ids = {post.author_id for post in posts if "author" in inspect(post).unloaded}
+    authors = (
+        {user.id: user for user in db.query(User).filter(User.id.in_(missing_author_ids))}
+        if missing_author_ids else {}
+    )
+
     result = []
     for post in posts:
-        likes_count = db.query(Like).filter(Like.post_id == post.id).count()
-        comments_count = db.query(Comment).filter(Comment.post_id == post.id).count()
-        is_liked = False
-        if current_user:
-            is_liked = db.query(Like).filter(Like.post_id == post.id, Like.user_id == current_user.id).first() is not None
-        
         post_dict = {
             "id": post.id,
             "title": post.title,
@@ -22,10 +41,56 @@ def get_posts_with_details(posts: List[Post], db: Session, current_user: Optiona
             "author_id": post.author_id,
             "created_at": post.created_at,
             "updated_at": post.updated_at,
-            "author": post.author,
-            "likes_count": likes_count,
-            "comments_count": comments_count,
-            "is_liked": is_liked
+            "author": authors[post.author_id] if post.author_id in authors else post.author,
+            "likes_count": post.likes_count,
+            "comments_count": post.comments_count,
+            "is_liked": post.id in liked_post_ids
         }
         result.append(post_dict)
-    return result
\ No newline at end of file
+    return result
+
+def get_liked_post_ids(db: Session, current_user: Optional[User], post_ids: List[int]) -> Set[int]:
+    """Ids among post_ids liked by current_user, in a single IN-query"""
+    if not current_user or not post_ids:
+        return set()
+    return {
+        post_id for (post_id,) in db.query(Like.post_id)
+        .filter(Like.user_id == current_user.id, Like.post_id.in_(post_ids))
+        .all()
+    }
+
+def overlay_is_liked(items: List[dict], liked_post_ids: Set[int]) -> List[dict]:
+    """Copy cached anonymous post dicts with is_liked set from get_liked_post_ids"""
+    return [dict(item, is_liked=item["id"] in liked_post_ids) for item in items]
+
+def increment_post_counter(db: Session, post_id: int, counter, delta: int) -> Optional[int]:
+    """Atomically adjust a denormalized Post counter inside the caller's transaction.
+
+    updated_at is written back unchanged so that likes and comments do not
+    count as edits of the post. Returns the new value (None if there is no
+    such post).
+    """
+    return db.execute(
+        update(Post)
+        .where(Post.id == post_id)
+        .values({counter: counter + delta, Post.updated_at: Post.updated_at})
+        .returning(counter)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+
+# INSERT ... ON CONFLICT DO NOTHING lives in the dialect packages
+_INSERT_BY_DIALECT = {"postgresql": postgresql_insert, "sqlite": sqlite_insert}
+
+def dialect_insert(db: Session):
+    """insert() of the session's dialect, the one that has on_conflict_do_nothing"""
+    return _INSERT_BY_DIALECT[db.get_bind().dialect.name]
+
+def parse_id_list(raw: str, max_items: int) -> List[int]:
+    """Ids from a comma separated query parameter, in order and without duplicates (400 if malformed)"""
+    try:
+        ids = list(dict.fromkeys(int(part) for part in raw.split(",") if part.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Ids must be comma separated integers")
+    if len(ids) > max_items:
+        raise HTTPException(status_code=400, detail=f"At most {max_items} ids are allowed")
+    return ids
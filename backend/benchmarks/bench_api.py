@@ -0,0 +1,244 @@
+"""API benchmark suite.
+
+Seeds a throwaway database at the given scale, then drives the main
+endpoints in-process (httpx over ASGI, no network) and reports throughput,
+latency percentiles and SQL statements per request for each of them.
+
+Save a run with --output and compare later runs against it with
+--baseline: the script exits with status 1 when an endpoint got slower or
+chattier than the tolerance allows, so it can gate CI. Baselines are only
+comparable on the same machine, scale and settings, and short runs are
+noisy: use a few hundred requests per endpoint for a baseline.
+
+Usage (from backend/):
+    python -m benchmarks.bench_api [--users 200] [--posts 2000] [--requests 200] [--concurrency 8]
+        [--endpoints feed,post_detail,...] [--output run.json] [--baseline baseline.json] [--tolerance 0.25]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+ENDPOINTS = ("feed", "feed_cursor", "post_detail", "user_posts", "comments", "search", "like_toggle", "login", "upload")
+
+def _make_scenarios(client, scale, rng, upload_image):
+    """name -> coroutine function issuing one request"""
+    from app.routes.auth import create_access_token
+
+    from seed_data import SEED_PASSWORD, STYLES
+
+    def auth(user_id):
+        return {"Authorization": f"Bearer {create_access_token(data={'sub': f'user{user_id}@example.com'})}"}
+
+    # Seeded into an empty database: ids start at 1, users are user<id>
+    users = range(1, scale["users"] + 1)
+    headers = [auth(user_id) for user_id in users]
+    cursors = []
+
+    async def feed():
+        return await client.get("/api/posts/?limit=20", headers=rng.choice(headers))
+
+    async def feed_cursor():
+        return await client.get(f"/api/posts/?limit=20&cursor={rng.choice(cursors)}", headers=rng.choice(headers))
+
+    async def post_detail():
+        return await client.get(f"/api/posts/{rng.randint(1, scale['posts'])}", headers=rng.choice(headers))
+
+    async def user_posts():
+        return await client.get(f"/api/users/{rng.randint(1, scale['users'])}/posts?limit=20")
+
+    async def comments():
+        return await client.get(f"/api/posts/{rng.randint(1, scale['posts'])}/comments?limit=20")
+
+    async def search():
+        return await client.get("/api/posts/search", params={"q": rng.choice(STYLES), "limit": 20})
+
+    async def like_toggle():
+        return await client.post(f"/api/posts/{rng.randint(1, scale['posts'])}/like", headers=rng.choice(headers))
+
+    async def login():
+        credentials = {"email": f"user{rng.choice(users)}@example.com", "password": SEED_PASSWORD}
+        return await client.post("/api/auth/login", json=credentials)
+
+    async def upload():
+        files = {"file": ("bench.jpg", upload_image, "image/jpeg")}
+        return await client.post("/api/posts/upload", files=files, headers=rng.choice(headers))
+
+    async def prepare():
+        # Cursors of the first few feed pages, for the cursor scenario
+        url = "/api/posts/?limit=20"
+        for _ in range(10):
+            response = await client.get(url)
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                break
+            cursors.append(cursor)
+            url = f"/api/posts/?limit=20&cursor={cursor}"
+
+    scenarios = {
+        "feed": feed, "feed_cursor": feed_cursor, "post_detail": post_detail, "user_posts": user_posts,
+        "comments": comments, "search": search, "like_toggle": like_toggle, "login": login, "upload": upload,
+    }
+    return scenarios, prepare
+
+async def measure(request, requests: int, concurrency: int, warmup: int) -> dict:
+    """Run request() `requests` times from `concurrency` workers"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    for _ in range(warmup):
+        await request()
+
+    statements = 0
+
+    def count_statement(*_):
+        nonlocal statements
+        statements += 1
+
+    latencies, errors = [], 0
+    remaining = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for _ in remaining:
+            started = time.perf_counter()
+            response = await request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    event.listen(Engine, "before_cursor_execute", count_statement)
+    try:
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+    finally:
+        event.remove(Engine, "before_cursor_execute", count_statement)
+    return dict(
+        summarize(latencies, elapsed),
+        errors=errors,
+        queries_per_request=round(statements / requests, 2) if requests else 0.0,
+    )
+
+async def run(args) -> dict:
+    from app.database import engine, migrate_database
+    from app.hashing import password_pool
+    from app.images import image_pool
+    from app.main import app
+    from app.routes import posts
+    from benchmarks.bench_images import make_photo
+    import httpx
+
+    from seed_data import seed_database
+
+    migrate_database()
+    scale = seed_database(engine, args.users, args.posts, args.likes_per_post, args.comments_per_post, progress=False)
+
+    posts.UPLOAD_DIR = tempfile.mkdtemp(prefix="aiverse-bench-uploads-")
+    rng = random.Random(7)
+    upload_image = make_photo(1600, 1200, "JPEG")
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        scenarios, prepare = _make_scenarios(client, scale, rng, upload_image)
+        await prepare()
+        for name in args.endpoints:
+            # Logins and uploads are CPU-bound pool jobs: fewer of them keeps the run short
+            requests = args.requests if name not in ("login", "upload") else max(1, args.requests // 10)
+            results[name] = await measure(scenarios[name], requests, args.concurrency, args.warmup)
+            print(f"{name:12} {results[name]['throughput_rps']:>9} rps  p95 {results[name]['p95_ms']} ms", file=sys.stderr)
+
+    password_pool.shutdown()
+    image_pool.shutdown()
+    return {
+        "settings": {
+            "scale": scale,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "database_async": os.getenv("DATABASE_ASYNC", "false"),
+            "cache": not args.no_cache,
+        },
+        "endpoints": results,
+    }
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """Print a comparison table and return the regressions found"""
+    regressions = []
+    if results["settings"] != baseline.get("settings"):
+        print("warning: settings differ from the baseline, the comparison may not be meaningful", file=sys.stderr)
+    print(f"{'endpoint':12} {'p50 ms':>17} {'p95 ms':>17} {'rps':>17} {'queries/req':>13}", file=sys.stderr)
+    for name, current in results["endpoints"].items():
+        before = baseline.get("endpoints", {}).get(name)
+        if before is None:
+            print(f"{name:12} (not in baseline)", file=sys.stderr)
+            continue
+        print(
+            f"{name:12} {before['p50_ms']:>8}->{current['p50_ms']:<8} {before['p95_ms']:>8}->{current['p95_ms']:<8}"
+            f" {before['throughput_rps']:>8}->{current['throughput_rps']:<8}"
+            f" {before['queries_per_request']:>6}->{current['queries_per_request']:<6}",
+            file=sys.stderr,
+        )
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']} -> {current['p95_ms']} ms")
+        if current["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: throughput {before['throughput_rps']} -> {current['throughput_rps']} rps")
+        # Statement counts are deterministic, any growth is a regression
+        if current["queries_per_request"] > before["queries_per_request"] + 0.5:
+            regressions.append(
+                f"{name}: queries per request {before['queries_per_request']} -> {current['queries_per_request']}"
+            )
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=2000)
+    parser.add_argument("--likes-per-post", type=float, default=5, help="mean, power-law distributed")
+    parser.add_argument("--comments-per-post", type=float, default=3, help="mean, power-law distributed")
+    parser.add_argument("--requests", type=int, default=200, help="requests per endpoint (a tenth for login/upload)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured requests per endpoint")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help=f"comma separated subset of {', '.join(ENDPOINTS)}")
+    parser.add_argument("--async-db", action="store_true", help="serve requests through AsyncSession (DATABASE_ASYNC)")
+    parser.add_argument("--no-cache", action="store_true", help="disable the feed and auth caches")
+    parser.add_argument("--output", help="write the results to this JSON file (e.g. a new baseline)")
+    parser.add_argument("--baseline", help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown before failing")
+    args = parser.parse_args()
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(args.endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"unknown endpoints: {', '.join(sorted(unknown))}")
+
+    use_temp_database()
+    if args.async_db:
+        os.environ["DATABASE_ASYNC"] = "true"
+    if args.no_cache:
+        os.environ["FEED_CACHE_TTL"] = "0"
+        os.environ["AUTH_CACHE_TTL"] = "0"
+
+    results = asyncio.run(run(args))
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("Regressions:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            sys.exit(1)
+        print("No regressions against the baseline", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
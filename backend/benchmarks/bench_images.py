@@ -0,0 +1,73 @@
+"""Upload image pipeline benchmark.
+
+Runs app.images.process_image on synthetic phone-sized photos and reports
+images processed per second per core, with and without Image.draft.
+
+Usage (from backend/):
+    python -m benchmarks.bench_images [--images 20] [--width 4032] [--height 3024] [--processes 1]
+"""
+import argparse
+import io
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageFilter
+
+from app.images import process_image
+
+def make_photo(width: int, height: int, fmt: str) -> bytes:
+    """Noisy gradient, compresses roughly like a real photo"""
+    noise = Image.effect_noise((width // 4, height // 4), 64).resize((width, height))
+    gradient = Image.linear_gradient("L").resize((width, height))
+    image = Image.merge("RGB", (noise, gradient, noise.filter(ImageFilter.BLUR)))
+    buffer = io.BytesIO()
+    options = {"quality": 92} if fmt == "JPEG" else {}
+    image.save(buffer, fmt, **options)
+    return buffer.getvalue()
+
+def _process_batch(data: bytes, count: int, use_draft: bool) -> float:
+    started = time.perf_counter()
+    for _ in range(count):
+        process_image(data, use_draft=use_draft)
+    return time.perf_counter() - started
+
+def measure(data: bytes, images: int, processes: int, use_draft: bool) -> dict:
+    per_process = max(1, images // processes)
+    started = time.perf_counter()
+    if processes == 1:
+        _process_batch(data, per_process, use_draft)
+    else:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            list(pool.map(_process_batch, [data] * processes, [per_process] * processes, [use_draft] * processes))
+    elapsed = time.perf_counter() - started
+    total = per_process * processes
+    return {
+        "images": total,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(total / elapsed, 2),
+        "images_per_second_per_core": round(total / elapsed / processes, 2),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20)
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for fmt in ("JPEG", "PNG"):
+        data = make_photo(args.width, args.height, fmt)
+        # Warm up codecs before timing
+        process_image(data)
+        results[fmt.lower()] = {
+            "input_bytes": len(data),
+            "draft": measure(data, args.images, args.processes, use_draft=True),
+            "full_decode": measure(data, args.images, args.processes, use_draft=False),
+        }
+    print(json.dumps({"size": f"{args.width}x{args.height}", "processes": args.processes, **results}, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Login storm benchmark.
+
+Fires concurrent logins at the app while a probe keeps requesting an
+unrelated route, then reports login throughput and the probe's latency
+percentiles. Compare --workers 0 (hashing in the threadpool) with the
+process pool.
+
+Usage (from backend/):
+    python -m benchmarks.bench_login_storm [--logins 200] [--concurrency 32] [--workers 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+async def run(args):
+    from app.database import SessionLocal, migrate_database
+    from app.hashing import get_password_hash, password_pool
+    from app.main import app
+    from app.models import User
+    import httpx
+
+    migrate_database()
+    db = SessionLocal()
+    db.add(User(username="storm", email="storm@example.com", hashed_password=get_password_hash("secret123")))
+    db.commit()
+    db.close()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        login_latencies, probe_latencies = [], []
+        remaining = iter(range(args.logins))
+        done = asyncio.Event()
+
+        async def login_worker():
+            for _ in remaining:
+                started = time.perf_counter()
+                response = await client.post("/api/auth/login", json={"email": "storm@example.com", "password": "secret123"})
+                if response.status_code == 200:
+                    login_latencies.append(time.perf_counter() - started)
+
+        async def probe():
+            while not done.is_set():
+                started = time.perf_counter()
+                await client.get(args.probe)
+                probe_latencies.append(time.perf_counter() - started)
+                await asyncio.sleep(0.005)
+
+        # Warm the worker processes before measuring
+        await client.post("/api/auth/login", json={"email": "storm@example.com", "password": "secret123"})
+
+        probe_task = asyncio.create_task(probe())
+        started = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await probe_task
+
+    password_pool.shutdown()
+    return {
+        "workers": args.workers,
+        "concurrency": args.concurrency,
+        "login": summarize(login_latencies, elapsed),
+        "probe": dict(summarize(probe_latencies, elapsed), route=args.probe),
+        "pool": password_pool.stats(),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1),
+                        help="password pool processes, 0 hashes in the threadpool")
+    parser.add_argument("--probe", default="/api/health", help="unrelated route to measure during the storm")
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ.setdefault("PASSWORD_HASH_MAX_PENDING", str(args.concurrency * 2))
+    print(json.dumps(asyncio.run(run(args)), indent=2))
+
+if __name__ == "__main__":
+    main()
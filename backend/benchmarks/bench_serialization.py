@@ -0,0 +1,104 @@
+"""Per-item serialization cost of post listings.
+
+Builds pages of enriched posts (the get_posts_with_details output, with ORM
+authors shared the way a feed page shares them) and times turning a page
+into response bytes four ways:
+- legacy: PostResponse(**p) per item, then FastAPI's response_model
+  validation and jsonable_encoder, then JSONResponse (stdlib json)
+- fast_cold: serialize_posts (one validation) and PostListResponse
+  (orjson), with an empty author cache
+- fast: the same with the authors already validated (steady state)
+- cached: PostListResponse over already serialized items (feed cache hits)
+
+No database is needed. Reports microseconds per item for each page size.
+
+Usage (from backend/):
+    python -m benchmarks.bench_serialization [--sizes 20 100 1000] [--authors 50] [--repeat 30]
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+def make_page(size: int, authors: int) -> List[dict]:
+    from app.models import User
+
+    now = datetime.utcnow()
+    users = [
+        User(id=i, username=f"user{i}", email=f"user{i}@example.com", full_name=f"User {i}", bio="AI artist",
+             avatar_url=f"/uploads/avatar{i}.webp", is_active=True, created_at=now, updated_at=now)
+        for i in range(1, authors + 1)
+    ]
+    page = []
+    for i in range(size):
+        author = users[(i * 7) % authors]
+        created_at = now - timedelta(minutes=i)
+        page.append({
+            "id": i + 1, "title": f"Neon city, oil painting {i}", "content": "Generated with AI",
+            "image_url": f"/uploads/{i}.webp", "video_url": None, "author_id": author.id,
+            "created_at": created_at, "updated_at": created_at, "author": author,
+            "likes_count": i * 3, "comments_count": i % 5, "is_liked": i % 4 == 0,
+        })
+    return page
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+def run(args):
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+
+    from app.schemas import PostResponse
+    from app.serialization import PostListResponse, clear_author_cache, serialize_posts
+
+    field = create_response_field(name="Response_Get_Posts", type_=List[PostResponse])
+    loop = asyncio.new_event_loop()
+
+    def legacy(page):
+        models = [PostResponse(**p) for p in page]
+        content = loop.run_until_complete(serialize_response(field=field, response_content=models))
+        return JSONResponse(content).body
+
+    def fast(page):
+        return PostListResponse(serialize_posts(page)).body
+
+    def fast_cold(page):
+        clear_author_cache()
+        return fast(page)
+
+    results = []
+    for size in args.sizes:
+        page = make_page(size, args.authors)
+        cached = serialize_posts(page)
+        assert json.loads(legacy(page)) == json.loads(fast(page))
+        row = {"page_size": size}
+        for name, fn in (
+            ("legacy", lambda page=page: legacy(page)),
+            ("fast_cold", lambda page=page: fast_cold(page)),
+            ("fast", lambda page=page: fast(page)),
+            ("cached", lambda cached=cached: PostListResponse(cached).body),
+        ):
+            row[f"{name}_us_per_item"] = round(best_of(fn, args.repeat) / size * 1e6, 2)
+        row["speedup"] = round(row["legacy_us_per_item"] / row["fast_us_per_item"], 1)
+        results.append(row)
+    loop.close()
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 1000])
+    parser.add_argument("--authors", type=int, default=50, help="distinct authors per page")
+    parser.add_argument("--repeat", type=int, default=30, help="runs per measurement, the best is reported")
+    args = parser.parse_args()
+    print(json.dumps(run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
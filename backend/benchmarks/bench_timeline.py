@@ -0,0 +1,118 @@
+"""Home timeline benchmark: materialized timeline vs the join query.
+
+Seeds a throwaway database with users, follows and posts, then reads the
+first page (and one cursor page) of the home timeline of the most-following
+users both ways:
+- materialized: app.timeline.timeline_page over timeline_entries
+- join: posts of the followed authors and the user, newest first
+and reports latency percentiles for each. It also times post creation with
+the fan-out (one INSERT ... SELECT into the followers' timelines) for the
+most-followed authors, which is the price paid on the write side.
+
+Usage (from backend/):
+    python -m benchmarks.bench_timeline [--users 2000] [--posts 50000] [--follows-per-user 50] [--reads 200]
+"""
+import argparse
+import json
+import time
+
+from benchmarks.common import summarize, use_temp_database
+
+def join_page(db, user_id, limit, cursor=None):
+    """The timeline without the materialized table, for comparison"""
+    from sqlalchemy import and_, or_, select
+
+    from app.models import Follow, Post
+    from app.pagination import decode_cursor, encode_cursor
+
+    followed = select(Follow.followee_id).where(Follow.follower_id == user_id)
+    query = select(Post.id, Post.created_at).where(or_(Post.author_id.in_(followed), Post.author_id == user_id))
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        query = query.where(or_(Post.created_at < created_at, and_(Post.created_at == created_at, Post.id < post_id)))
+    rows = db.execute(query.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit + 1)).all()
+    next_cursor = encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return [row.id for row in rows[:limit]], next_cursor
+
+def time_reads(db, page, user_ids, reads, limit):
+    latencies = []
+    started = time.perf_counter()
+    for i in range(reads):
+        user_id = user_ids[i % len(user_ids)]
+        begin = time.perf_counter()
+        _, cursor = page(db, user_id, limit)
+        if cursor:
+            page(db, user_id, limit, cursor)
+        latencies.append(time.perf_counter() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+def run(args):
+    from datetime import datetime
+
+    from sqlalchemy import func
+
+    from app import timeline
+    from app.database import SessionLocal, engine, migrate_database
+    from app.models import Post, TimelineEntry, User
+    from seed_data import seed_database
+
+    migrate_database()
+    counts = seed_database(
+        engine, args.users, args.posts, likes_per_post=0, comments_per_post=0,
+        follows_per_user=args.follows_per_user, batch_size=args.batch_size,
+    )
+
+    db = SessionLocal()
+    try:
+        readers = [row.id for row in db.query(User.id).order_by(User.following_count.desc()).limit(args.readers)]
+        authors = [row.id for row in db.query(User.id).order_by(User.followers_count.desc()).limit(args.writers)]
+
+        # Same pages both ways before timing anything
+        for user_id in readers[:5]:
+            assert timeline.timeline_page(db, user_id, args.limit)[0] == join_page(db, user_id, args.limit)[0]
+
+        results = {
+            "seeded": counts,
+            "timeline_entries": db.query(func.count()).select_from(TimelineEntry).scalar(),
+            "materialized": time_reads(db, timeline.timeline_page, readers, args.reads, args.limit),
+            "join": time_reads(db, join_page, readers, args.reads, args.limit),
+        }
+
+        latencies = []
+        started = time.perf_counter()
+        for i in range(args.writes):
+            author_id = authors[i % len(authors)]
+            begin = time.perf_counter()
+            post = Post(title="Benchmark post", content="fan-out", author_id=author_id, created_at=datetime.utcnow())
+            db.add(post)
+            db.flush()
+            timeline.fan_out_post(db, post.id, author_id, post.created_at)
+            db.commit()
+            latencies.append(time.perf_counter() - begin)
+        results["create_post_with_fan_out"] = dict(
+            summarize(latencies, time.perf_counter() - started),
+            max_followers=db.query(func.max(User.followers_count)).scalar(),
+            fan_out_max_followers=timeline.TIMELINE_FANOUT_MAX_FOLLOWERS,
+        )
+        return results
+    finally:
+        db.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--posts", type=int, default=50000)
+    parser.add_argument("--follows-per-user", type=float, default=50, help="mean, power-law distributed")
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--readers", type=int, default=50, help="timelines read, the users following the most")
+    parser.add_argument("--reads", type=int, default=200, help="first page + one cursor page per read")
+    parser.add_argument("--writers", type=int, default=10, help="authors posting, the most followed")
+    parser.add_argument("--writes", type=int, default=100)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+    print(json.dumps(run(args), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import tempfile
+from typing import Dict, List
+
+def use_temp_database() -> str:
+    """Point DATABASE_URL at a throwaway SQLite file; call before importing app modules"""
+    path = os.path.join(tempfile.mkdtemp(prefix="aiverse-bench-"), "bench.db")
+    os.environ["DATABASE_URL"] = f"sqlite:///{path}"
+    return path
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def summarize(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    """Throughput and latency percentiles (ms) for a list of per-request durations in seconds"""
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+    }
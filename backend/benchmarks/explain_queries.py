@@ -0,0 +1,86 @@
+"""Query plans for the hot read paths.
+
+Seeds a throwaway database (migrated to head) with users, posts, likes and
+comments, then prints the plan of every hot query so a missing index shows
+up as a table scan. With --database-url the plans come from an existing,
+already migrated database and nothing is seeded.
+
+Usage (from backend/):
+    python -m benchmarks.explain_queries [--users 200] [--posts 5000] [--database-url URL]
+"""
+import argparse
+import os
+
+from benchmarks.common import use_temp_database
+
+def hot_queries(db):
+    """(name, statement) for the queries the feed, like and comment routes issue"""
+    from sqlalchemy import and_, or_, select
+
+    from app.models import Comment, Like, Post
+
+    page = 20
+    newest = db.query(Post).order_by(Post.created_at.desc(), Post.id.desc()).offset(page).first()
+    author_id = newest.author_id
+    post_id = db.query(Comment.post_id).first()[0]
+    post_ids = [post.id for post in db.query(Post).order_by(Post.id.desc()).limit(page)]
+
+    newest_first = (Post.created_at.desc(), Post.id.desc())
+    after_newest = or_(
+        Post.created_at < newest.created_at,
+        and_(Post.created_at == newest.created_at, Post.id < newest.id),
+    )
+    return [
+        ("feed, first page", select(Post).order_by(*newest_first).limit(page + 1)),
+        ("feed, cursor page", select(Post).where(after_newest).order_by(*newest_first).limit(page + 1)),
+        ("user posts", select(Post).where(Post.author_id == author_id).order_by(*newest_first).limit(page + 1)),
+        (
+            "comments page",
+            select(Comment).where(Comment.post_id == post_id)
+            .order_by(Comment.created_at.asc(), Comment.id.asc()).limit(page + 1),
+        ),
+        ("is_liked for a page", select(Like.post_id).where(Like.user_id == author_id, Like.post_id.in_(post_ids))),
+        ("like toggle lookup", select(Like).where(Like.user_id == author_id, Like.post_id == post_id)),
+        ("post likes", select(Like.user_id).where(Like.post_id == post_id)),
+    ]
+
+def explain(db, statement):
+    from sqlalchemy import text
+
+    dialect = db.get_bind().dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+    prefix = "EXPLAIN QUERY PLAN" if dialect.name == "sqlite" else "EXPLAIN"
+    rows = db.execute(text(f"{prefix} {sql}")).all()
+    if dialect.name == "sqlite":
+        return [row[-1] for row in rows]
+    return [row[0] for row in rows]
+
+def main():
+    parser = argparse.ArgumentParser(description="Print query plans for the hot queries")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--posts", type=int, default=5000)
+    parser.add_argument("--database-url", help="explain against an existing database instead of seeding one")
+    args = parser.parse_args()
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    else:
+        use_temp_database()
+
+    from app.database import SessionLocal, engine, migrate_database
+    from seed_data import seed_database
+
+    db = SessionLocal()
+    try:
+        if not args.database_url:
+            migrate_database()
+            seed_database(engine, args.users, args.posts, likes_per_post=5, comments_per_post=2)
+        for name, statement in hot_queries(db):
+            print(f"-- {name}")
+            for line in explain(db, statement):
+                print(f"   {line}")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""Drop cold posts from the trending table (see app/trending.py).
+
+Usage:
+    python compact_trending.py [--rebuild] [--batch-size N]
+
+Meant to run periodically (e.g. hourly from cron): likes and comments keep
+the scores of active posts current, this removes the posts that went cold.
+With --rebuild every score is recomputed from the post counters first,
+after a bulk load or to repair the table.
+"""
+import argparse
+import sys
+
+from app.database import SessionLocal
+from app.trending import compact_trending, rebuild_trending
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compact the trending scores table")
+    parser.add_argument("--rebuild", action="store_true", help="rescore every post with likes or comments first")
+    parser.add_argument("--batch-size", type=int, default=10000, help="posts per query when rebuilding")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.rebuild:
+            kept = rebuild_trending(db, args.batch_size)
+        else:
+            removed = compact_trending(db)
+            db.commit()
+    except Exception as e:
+        print(f"Error compacting trending scores: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    if args.rebuild:
+        print(f"Rebuilt trending scores, {kept} posts are trending")
+    else:
+        print(f"Removed {removed} cold posts from trending")
@@ -0,0 +1,70 @@
+"""Delete uploaded files that no post image or user avatar references any more.
+
+Usage:
+    python gc_uploads.py [--grace-hours 24] [--dry-run]
+
+Files younger than the grace period are kept: an upload is stored before
+the post or profile that uses it is saved. Renditions of a content-addressed
+upload are kept as long as its main image is referenced.
+"""
+import argparse
+import os
+import sys
+import time
+from typing import List, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.images import CONTENT_KEY_RE
+from app.models import Post, User
+from app.routes.posts import UPLOAD_DIR
+
+def referenced_uploads(db: Session) -> Tuple[Set[str], Set[str]]:
+    """File names and content keys referenced by Post.image_url / User.avatar_url"""
+    names, keys = set(), set()
+    for column in (Post.image_url, User.avatar_url):
+        for (url,) in db.query(column).filter(column.isnot(None)).yield_per(10000):
+            name = url.rsplit("/", 1)[-1]
+            names.add(name)
+            match = CONTENT_KEY_RE.match(name)
+            if match:
+                keys.add(match.group("key"))
+    return names, keys
+
+def collect_garbage(db: Session, directory: str = UPLOAD_DIR, grace_seconds: float = 24 * 3600, dry_run: bool = False) -> List[str]:
+    """Remove unreferenced upload files, returns the names removed (or that would be)"""
+    names, keys = referenced_uploads(db)
+    cutoff = time.time() - grace_seconds
+    removed = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or entry.stat().st_mtime > cutoff:
+                continue
+            match = CONTENT_KEY_RE.match(entry.name)
+            if entry.name in names or (match and match.group("key") in keys):
+                continue
+            if not dry_run:
+                os.unlink(entry.path)
+            removed.append(entry.name)
+    return removed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete unreferenced uploads")
+    parser.add_argument("--grace-hours", type=float, default=24, help="keep files younger than this")
+    parser.add_argument("--dry-run", action="store_true", help="only list files that would be deleted")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        removed = collect_garbage(db, grace_seconds=args.grace_hours * 3600, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"Error collecting uploads: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    for name in removed:
+        print(name)
+    action = "Would delete" if args.dry_run else "Deleted"
+    print(f"{action} {len(removed)} unreferenced files")
@@ -1,13 +1,61 @@
-from app.database import create_tables
+"""Migrate the database, optionally filling it with synthetic data.
+
+Usage:
+    python init_db.py
+    python init_db.py seed --users 100000 --posts 1000000 [--likes-per-post 20] [--comments-per-post 3]
+        [--follows-per-user 0] [--days 90] [--batch-size 10000] [--seed 42]
+"""
+from app.database import migrate_database
+import argparse
 import sys
+import time
 import traceback
 
+def seed(args):
+    from app.database import engine
+    from seed_data import SEED_PASSWORD, seed_database
+
+    started = time.perf_counter()
+    counts = seed_database(
+        engine, args.users, args.posts,
+        likes_per_post=args.likes_per_post, comments_per_post=args.comments_per_post,
+        follows_per_user=args.follows_per_user,
+        days=args.days, batch_size=args.batch_size, seed=args.seed,
+    )
+    elapsed = time.perf_counter() - started
+    rows = sum(counts.values())
+    print(", ".join(f"{count} {table}" for table, count in counts.items()))
+    print(f"Seeded {rows} rows in {elapsed:.1f}s ({rows / elapsed:.0f} rows/s); every user's password is {SEED_PASSWORD!r}")
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate the database, optionally seeding synthetic data")
+    commands = parser.add_subparsers(dest="command")
+    seed_parser = commands.add_parser("seed", help="migrate, then append synthetic users, follows, posts, likes and comments")
+    seed_parser.add_argument("--users", type=int, default=10000)
+    seed_parser.add_argument("--posts", type=int, default=100000)
+    seed_parser.add_argument("--likes-per-post", type=float, default=20, help="mean, power-law distributed")
+    seed_parser.add_argument("--comments-per-post", type=float, default=3, help="mean, power-law distributed")
+    seed_parser.add_argument("--follows-per-user", type=float, default=0, help="mean, power-law distributed")
+    seed_parser.add_argument("--days", type=int, default=90, help="time span of the generated activity")
+    seed_parser.add_argument("--batch-size", type=int, default=10000, help="rows per bulk insert / COPY")
+    seed_parser.add_argument("--seed", type=int, default=42, help="random seed, same seed gives the same data")
+    args = parser.parse_args()
+
     try:
-        create_tables()
-        print("Database tables created successfully!")
+        migrate_database()
+        print("Database schema is up to date!")
     except Exception as e:
-        print(f"Error creating tables: {e}")
+        print(f"Error migrating database: {e}")
         traceback.print_exc()
+        if args.command == "seed":
+            sys.exit(1)
         # Don't exit - let the app start anyway
         print("Continuing despite database error...")
+
+    if args.command == "seed":
+        try:
+            seed(args)
+        except Exception as e:
+            print(f"Error seeding database: {e}")
+            traceback.print_exc()
+            sys.exit(1)
@@ -0,0 +1,40 @@
+"""Denormalized like/comment counters on posts
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:10:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with create_all after the counters were added already have them
+    existing = {column["name"] for column in sa.inspect(op.get_bind()).get_columns("posts")}
+    with op.batch_alter_table("posts") as batch_op:
+        if "likes_count" not in existing:
+            batch_op.add_column(sa.Column("likes_count", sa.Integer(), server_default="0", nullable=False))
+        if "comments_count" not in existing:
+            batch_op.add_column(sa.Column("comments_count", sa.Integer(), server_default="0", nullable=False))
+
+    op.execute(
+        "UPDATE posts SET "
+        "likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id), "
+        "comments_count = (SELECT COUNT(*) FROM comments WHERE comments.post_id = posts.id)"
+    )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("posts") as batch_op:
+        batch_op.drop_column("comments_count")
+        batch_op.drop_column("likes_count")
@@ -0,0 +1,60 @@
+"""Indexes for the feed, like and comment access paths; one like per user and post
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:20:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# name, table, columns, unique
+INDEXES = [
+    # Feed keyset pagination: ORDER BY created_at DESC, id DESC
+    ("ix_posts_created_at_id", "posts", ["created_at", "id"], False),
+    # User profile listing
+    ("ix_posts_author_id_created_at_id", "posts", ["author_id", "created_at", "id"], False),
+    # Comment pages of a post
+    ("ix_comments_post_id_created_at_id", "comments", ["post_id", "created_at", "id"], False),
+    # Per-post like scans (counter reconciliation, post deletion)
+    ("ix_likes_post_id", "likes", ["post_id"], False),
+    # is_liked lookups and the like toggle; also forbids duplicate likes
+    ("uq_likes_user_id_post_id", "likes", ["user_id", "post_id"], True),
+]
+
+
+def _on_postgres() -> bool:
+    return op.get_bind().dialect.name == "postgresql"
+
+
+def upgrade() -> None:
+    # Drop duplicate likes left by concurrent double taps before enforcing uniqueness
+    op.execute(
+        "DELETE FROM likes WHERE id NOT IN "
+        "(SELECT MIN(id) FROM likes GROUP BY user_id, post_id)"
+    )
+    op.execute(
+        "UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id) "
+        "WHERE likes_count <> (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)"
+    )
+
+    for name, table, columns, unique in INDEXES:
+        if _on_postgres():
+            # Build without blocking writes on live tables
+            with op.get_context().autocommit_block():
+                op.create_index(name, table, columns, unique=unique, if_not_exists=True, postgresql_concurrently=True)
+        else:
+            op.create_index(name, table, columns, unique=unique, if_not_exists=True)
+
+
+def downgrade() -> None:
+    for name, table, _, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
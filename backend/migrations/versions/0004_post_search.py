@@ -0,0 +1,81 @@
+"""Full-text search over post titles and contents
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 11:40:00
+
+Postgres: a generated tsvector column (title weighted above content) with a
+GIN index. SQLite: an external-content FTS5 table kept in sync by triggers.
+Neither is mapped on the Post model; migrations/env.py leaves them out of
+autogenerate. Note that batch_alter_table on posts recreates the table on
+SQLite and drops the triggers with it: a later migration doing that has to
+create them again.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# 'simple': no stemming or stop words, the posts are not all in one language
+POSTGRES_SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(content, '')), 'B')"
+)
+
+SQLITE_TRIGGERS = {
+    "posts_fts_insert": (
+        "AFTER INSERT ON posts BEGIN "
+        "INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END"
+    ),
+    "posts_fts_delete": (
+        "AFTER DELETE ON posts BEGIN "
+        "INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); END"
+    ),
+    # Counter updates do not touch title/content and leave the index alone
+    "posts_fts_update": (
+        "AFTER UPDATE OF title, content ON posts BEGIN "
+        "INSERT INTO posts_fts (posts_fts, rowid, title, content) VALUES ('delete', old.id, old.title, old.content); "
+        "INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content); END"
+    ),
+}
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute(
+            "ALTER TABLE posts ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            f"GENERATED ALWAYS AS ({POSTGRES_SEARCH_VECTOR}) STORED"
+        )
+        with op.get_context().autocommit_block():
+            op.execute(
+                "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_posts_search_vector "
+                "ON posts USING gin (search_vector)"
+            )
+    elif dialect == "sqlite":
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5("
+            "title, content, content='posts', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+        )
+        for name, body in SQLITE_TRIGGERS.items():
+            op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {body}")
+        # Index the posts that already exist
+        op.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_posts_search_vector")
+        op.execute("ALTER TABLE posts DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
@@ -0,0 +1,61 @@
+"""Follow graph and materialized home timelines
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 13:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.add_column(sa.Column("followers_count", sa.Integer(), server_default="0", nullable=False))
+        batch_op.add_column(sa.Column("following_count", sa.Integer(), server_default="0", nullable=False))
+
+    op.create_table(
+        "follows",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("followee_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["follower_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["followee_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_follows_id", "follows", ["id"])
+    op.create_index("uq_follows_follower_id_followee_id", "follows", ["follower_id", "followee_id"], unique=True)
+    op.create_index("ix_follows_followee_id", "follows", ["followee_id"])
+
+    op.create_table(
+        "timeline_entries",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"]),
+        sa.ForeignKeyConstraint(["author_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("user_id", "post_id"),
+    )
+    op.create_index(
+        "ix_timeline_entries_user_id_created_at_post_id", "timeline_entries", ["user_id", "created_at", "post_id"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("timeline_entries")
+    op.drop_table("follows")
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("following_count")
+        batch_op.drop_column("followers_count")
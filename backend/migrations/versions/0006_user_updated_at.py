@@ -0,0 +1,28 @@
+"""users.updated_at, for conditional GETs of users and their posts
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 14:30:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("users", sa.Column("updated_at", sa.DateTime(), nullable=True))
+    op.execute("UPDATE users SET updated_at = created_at")
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("updated_at")
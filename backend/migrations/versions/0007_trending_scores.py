@@ -0,0 +1,33 @@
+"""Trending scores
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 16:00:00
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "trending_scores",
+        sa.Column("post_id", sa.Integer(), nullable=False),
+        sa.Column("score", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["post_id"], ["posts.id"]),
+        sa.PrimaryKeyConstraint("post_id"),
+    )
+    op.create_index("ix_trending_scores_score_post_id", "trending_scores", ["score", "post_id"])
+
+
+def downgrade() -> None:
+    op.drop_table("trending_scores")
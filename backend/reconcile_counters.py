@@ -0,0 +1,59 @@
+"""Recompute the denormalized Post.likes_count / Post.comments_count columns.
+
+Usage:
+    python reconcile_counters.py [--batch-size N] [--dry-run]
+
+Only rows whose stored counters drifted from the real COUNT(*) are touched.
+Posts are processed in id ranges so each transaction stays short.
+"""
+import argparse
+import sys
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal
+from app.models import Post, Like, Comment
+
+def reconcile_post_counters(db: Session, batch_size: int = 10000, dry_run: bool = False) -> int:
+    """Repair drifted post counters, returns the number of posts that were off"""
+    likes_count = select(func.count(Like.id)).where(Like.post_id == Post.id).scalar_subquery()
+    comments_count = select(func.count(Comment.id)).where(Comment.post_id == Post.id).scalar_subquery()
+    drifted = or_(Post.likes_count != likes_count, Post.comments_count != comments_count)
+
+    max_id = db.query(func.max(Post.id)).scalar() or 0
+    fixed = 0
+    for start in range(1, max_id + 1, batch_size):
+        in_batch = Post.id.between(start, start + batch_size - 1)
+        if dry_run:
+            fixed += db.query(func.count(Post.id)).filter(in_batch, drifted).scalar()
+            continue
+        result = db.execute(
+            update(Post)
+            .where(in_batch, drifted)
+            .values(likes_count=likes_count, comments_count=comments_count, updated_at=Post.updated_at)
+            .execution_options(synchronize_session=False)
+        )
+        db.commit()
+        fixed += result.rowcount
+    return fixed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recompute denormalized post counters")
+    parser.add_argument("--batch-size", type=int, default=10000, help="posts per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="only report drifted posts")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        fixed = reconcile_post_counters(db, args.batch_size, args.dry_run)
+    except Exception as e:
+        print(f"Error reconciling counters: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    if args.dry_run:
+        print(f"{fixed} posts have drifted counters")
+    else:
+        print(f"Repaired counters on {fixed} posts")
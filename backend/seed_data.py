@@ -0,0 +1,228 @@
+"""Synthetic data for load tests: users, posts, likes and comments at scale.
+
+The generated data is skewed the way a social feed is:
+- a few users write most of the posts (activity falls off as a power law)
+- likes and comments per post follow a Pareto distribution, so most posts
+  get a handful and a few get thousands
+- posts arrive in bursts (a two-state process switching between busy and
+  quiet periods), likes and comments mostly shortly after the post
+- follows go to the same prolific authors, so a few accounts get most
+  followers
+
+Rows are generated lazily and loaded in batches (COPY on Postgres,
+executemany elsewhere), one transaction per batch, so memory stays bounded
+whatever the scale. Every seeded user gets the same password, hashed once.
+The post counters are written along with the posts; if a run is interrupted,
+repair them with reconcile_counters.py. Follow counters and the materialized
+home timelines are recomputed at the end.
+
+Run through init_db.py:
+    python init_db.py seed --users 100000 --posts 1000000 [--likes-per-post 20] [--comments-per-post 3]
+        [--follows-per-user 0]
+"""
+import csv
+import io
+import random
+import sys
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import func, select, text, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+from app.hashing import get_password_hash
+from app.models import Comment, Follow, Like, Post, User
+from app.timeline import rebuild_timelines
+from app.trending import rebuild_trending
+
+SEED_PASSWORD = "password123"
+
+# Pareto shape for likes/comments per post: lower means a heavier tail
+POPULARITY_ALPHA = 1.5
+# Authors are picked as users * random() ** AUTHOR_SKEW (1 would be uniform)
+AUTHOR_SKEW = 3
+# Busy/quiet periods: chance to switch per post, and gap length relative to the mean
+BURST_SWITCH_PROBABILITY = 0.02
+BUSY_GAP_FACTOR, QUIET_GAP_FACTOR = 0.2, 1.8
+# Mean delay of likes and comments after the post
+LIKE_DELAY_SECONDS = 6 * 3600
+COMMENT_DELAY_SECONDS = 12 * 3600
+
+USER_COLUMNS = ("id", "username", "email", "hashed_password", "is_active", "created_at", "updated_at")
+POST_COLUMNS = ("id", "title", "content", "author_id", "likes_count", "comments_count", "created_at", "updated_at")
+LIKE_COLUMNS = ("user_id", "post_id", "created_at")
+COMMENT_COLUMNS = ("user_id", "post_id", "content", "created_at")
+FOLLOW_COLUMNS = ("follower_id", "followee_id", "created_at")
+
+SUBJECTS = ("neon city", "forest spirit", "robot portrait", "ocean dream", "desert temple", "cyberpunk cat")
+STYLES = ("oil painting", "pixel art", "watercolor", "photorealistic", "anime", "low poly")
+COMMENTS = ("Wow!", "Love the colors", "What prompt did you use?", "Amazing detail", "So good", "Which model is this?")
+
+def _pareto_count(rng: random.Random, mean: float, cap: int) -> int:
+    """Integer sample with the given mean and a power-law tail"""
+    if mean <= 0:
+        return 0
+    return min(cap, int((rng.paretovariate(POPULARITY_ALPHA) - 1) * mean * (POPULARITY_ALPHA - 1)))
+
+def bursty_timestamps(count: int, start: datetime, end: datetime, rng: random.Random) -> Iterator[datetime]:
+    """count ascending timestamps between start and end, arriving in bursts"""
+    span = (end - start).total_seconds()
+    mean_gap = span / max(count, 1)
+    offset, busy = 0.0, False
+    for _ in range(count):
+        if rng.random() < BURST_SWITCH_PROBABILITY:
+            busy = not busy
+        offset += rng.expovariate(1 / (mean_gap * (BUSY_GAP_FACTOR if busy else QUIET_GAP_FACTOR)))
+        yield start + timedelta(seconds=min(offset, span))
+
+class BatchLoader:
+    """Buffers rows per table and loads them in batches of batch_size.
+
+    Posts are always flushed before likes and comments, so child rows never
+    reach the database ahead of the post they reference.
+    """
+
+    def __init__(self, connection: Connection, batch_size: int):
+        self.connection = connection
+        self.batch_size = batch_size
+        self.use_copy = connection.dialect.name == "postgresql"
+        self.columns = {
+            User: USER_COLUMNS, Post: POST_COLUMNS, Like: LIKE_COLUMNS, Comment: COMMENT_COLUMNS, Follow: FOLLOW_COLUMNS,
+        }
+        self.buffers: Dict[type, List[tuple]] = {model: [] for model in self.columns}
+        self.loaded: Dict[type, int] = {model: 0 for model in self.columns}
+
+    def add(self, model, row: tuple):
+        buffer = self.buffers[model]
+        buffer.append(row)
+        if len(buffer) >= self.batch_size:
+            self.flush(model)
+
+    def flush(self, model=None):
+        models = [model] if model is not None else list(self.columns)
+        if Like in models or Comment in models:
+            models.insert(0, Post)
+        for target in dict.fromkeys(models):
+            rows = self.buffers[target]
+            if not rows:
+                continue
+            if self.use_copy:
+                self._copy(target, rows)
+            else:
+                columns = self.columns[target]
+                self.connection.execute(target.__table__.insert(), [dict(zip(columns, row)) for row in rows])
+            self.connection.commit()
+            self.loaded[target] += len(rows)
+            rows.clear()
+
+    def _copy(self, model, rows: List[tuple]):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            writer.writerow(value.isoformat(sep=" ") if isinstance(value, datetime) else value for value in row)
+        buffer.seek(0)
+        columns = ", ".join(self.columns[model])
+        cursor = self.connection.connection.dbapi_connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {model.__tablename__} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+def _next_id(connection: Connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def seed_database(
+    bind: Engine,
+    users: int,
+    posts: int,
+    likes_per_post: float = 20,
+    comments_per_post: float = 3,
+    follows_per_user: float = 0,
+    days: int = 90,
+    batch_size: int = 10000,
+    seed: int = 42,
+    password: str = SEED_PASSWORD,
+    progress: Optional[bool] = None,
+) -> Dict[str, int]:
+    """Append synthetic rows to a migrated database, returns the counts per table.
+
+    Users are named user<id> (email user<id>@example.com). Existing rows are
+    kept; new ids continue after the current maximum.
+    """
+    rng = random.Random(seed)
+    hashed_password = get_password_hash(password)
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    progress = sys.stderr.isatty() if progress is None else progress
+
+    with bind.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            connection.exec_driver_sql("PRAGMA synchronous = OFF")
+        elif connection.dialect.name == "postgresql":
+            connection.exec_driver_sql("SET synchronous_commit = off")
+        loader = BatchLoader(connection, batch_size)
+
+        first_user_id = _next_id(connection, User)
+        user_step = (end - start) / max(users, 1)
+        for i in range(users):
+            user_id = first_user_id + i
+            joined_at = start + user_step * i
+            loader.add(User, (
+                user_id, f"user{user_id}", f"user{user_id}@example.com", hashed_password, True, joined_at, joined_at,
+            ))
+        loader.flush(User)
+        user_ids = range(first_user_id, first_user_id + users)
+
+        for i, follower_id in enumerate(user_ids):
+            followed_at = start + user_step * i
+            follows = _pareto_count(rng, follows_per_user, users)
+            followees = {user_ids[int(users * rng.random() ** AUTHOR_SKEW)] for _ in range(follows)}
+            followees.discard(follower_id)
+            for followee_id in followees:
+                loader.add(Follow, (follower_id, followee_id, followed_at))
+        loader.flush(Follow)
+
+        first_post_id = _next_id(connection, Post)
+        for i, created_at in enumerate(bursty_timestamps(posts, start, end, rng)):
+            post_id = first_post_id + i
+            author_id = user_ids[int(users * rng.random() ** AUTHOR_SKEW)]
+            likes = _pareto_count(rng, likes_per_post, users)
+            comments = _pareto_count(rng, comments_per_post, 10 * users)
+            loader.add(Post, (
+                post_id, f"{rng.choice(SUBJECTS).capitalize()}, {rng.choice(STYLES)}", "Generated with AI",
+                author_id, likes, comments, created_at, created_at,
+            ))
+            for user_id in rng.sample(user_ids, likes):
+                liked_at = min(end, created_at + timedelta(seconds=rng.expovariate(1 / LIKE_DELAY_SECONDS)))
+                loader.add(Like, (user_id, post_id, liked_at))
+            for _ in range(comments):
+                commented_at = min(end, created_at + timedelta(seconds=rng.expovariate(1 / COMMENT_DELAY_SECONDS)))
+                loader.add(Comment, (rng.choice(user_ids), post_id, rng.choice(COMMENTS), commented_at))
+            if progress and (i + 1) % (batch_size * 10) == 0:
+                print(f"  {i + 1}/{posts} posts", file=sys.stderr)
+        loader.flush()
+
+        if loader.use_copy:
+            # COPY with explicit ids leaves the serial sequences behind
+            for model in (User, Post):
+                connection.execute(text(
+                    f"SELECT setval(pg_get_serial_sequence('{model.__tablename__}', 'id'), "
+                    f"(SELECT COALESCE(MAX(id), 1) FROM {model.__tablename__}))"
+                ))
+            connection.commit()
+
+        connection.execute(update(User).values(
+            followers_count=select(func.count(Follow.id)).where(Follow.followee_id == User.id).scalar_subquery(),
+            following_count=select(func.count(Follow.id)).where(Follow.follower_id == User.id).scalar_subquery(),
+            updated_at=User.updated_at,
+        ))
+        connection.commit()
+        with Session(bind=connection) as db:
+            timeline_entries = rebuild_timelines(db)
+            trending_scores = rebuild_trending(db)
+
+    counts = {model.__tablename__: count for model, count in loader.loaded.items()}
+    counts["timeline_entries"] = timeline_entries
+    counts["trending_scores"] = trending_scores
+    return counts
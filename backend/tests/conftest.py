@@ -0,0 +1,127 @@
+import asyncio
+import shutil
+import pytest
+from alembic import command
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.cache import feed_cache, user_cache
+from app.database import get_read_session, get_session, to_async_url
+from app.jobs import run_pending
+from app.main import app
+from tests.utils import alembic_config
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    feed_cache.clear()
+    user_cache.clear()
+    yield
+    feed_cache.clear()
+    user_cache.clear()
+
+
+@pytest.fixture(scope="session")
+def migrated_database(tmp_path_factory):
+    """SQLite file migrated to head once per run; every test works on a copy"""
+    path = tmp_path_factory.mktemp("template") / "migrated.db"
+    command.upgrade(alembic_config(f"sqlite:///{path}"), "head")
+    return path
+
+
+@pytest.fixture
+def engine(tmp_path, migrated_database):
+    path = tmp_path / "test.db"
+    shutil.copy(migrated_database, path)
+    engine = create_engine(
+        f"sqlite:///{path}",
+        connect_args={"check_same_thread": False},
+    )
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def run_jobs(engine):
+    """Run the background jobs enqueued so far, the way worker.py would; returns how many ran"""
+    def run():
+        with sessionmaker(bind=engine)() as session:
+            return run_pending(session)
+    return run
+
+
+@pytest.fixture
+def read_engine(engine):
+    """Engine behind get_read_session: the primary, unless a test module stands up a replica"""
+    return engine
+
+
+def _session_override(engine, flavour, async_engines):
+    if flavour == "async":
+        # NullPool: aiosqlite connections must not outlive the TestClient event loop
+        async_engine = create_async_engine(to_async_url(str(engine.url)), poolclass=NullPool)
+        async_engines.append(async_engine)
+        TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+        async def override():
+            async with TestingAsyncSessionLocal() as session:
+                yield session
+    else:
+        TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override():
+            session = TestingSessionLocal()
+            try:
+                yield session
+            finally:
+                session.close()
+    return override
+
+
+@pytest.fixture(params=["sync", "async"])
+def client(request, engine, read_engine):
+    """TestClient on the test database, once per session flavour (threadpool and AsyncSession)"""
+    async_engines = []
+    app.dependency_overrides[get_session] = _session_override(engine, request.param, async_engines)
+    app.dependency_overrides[get_read_session] = _session_override(read_engine, request.param, async_engines)
+    try:
+        with TestClient(app) as test_client:
+            yield test_client
+    finally:
+        app.dependency_overrides.clear()
+        for async_engine in async_engines:
+            asyncio.run(async_engine.dispose())
+
+
+@pytest.fixture
+def count_queries():
+    """Context manager yielding a list that collects the SQL statements executed inside it."""
+    @contextmanager
+    def counter():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        # Listen on the Engine class so both the sync and the async test engines are counted
+        event.listen(Engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(Engine, "before_cursor_execute", before_cursor_execute)
+
+    return counter
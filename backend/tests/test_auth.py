@@ -0,0 +1,49 @@
+from app.cache import user_cache
+from app.models import User
+from tests.utils import make_user, auth_headers
+
+
+def test_authenticated_read_is_served_from_user_cache(client, db, count_queries):
+    user = make_user(db, "alice")
+    headers = auth_headers(user)
+    assert client.get("/api/auth/me", headers=headers).json()["username"] == "alice"
+
+    with count_queries() as statements:
+        response = client.get("/api/auth/me", headers=headers)
+
+    assert response.json()["username"] == "alice"
+    assert statements == []
+
+
+def test_profile_update_invalidates_cached_user(client, db):
+    user = make_user(db, "alice")
+    headers = auth_headers(user)
+    client.get("/api/auth/me", headers=headers)
+
+    response = client.patch("/api/auth/me", json={"full_name": "Alice A."}, headers=headers)
+
+    assert response.json()["full_name"] == "Alice A."
+    assert client.get("/api/auth/me", headers=headers).json()["full_name"] == "Alice A."
+
+
+def test_deactivation_invalidates_cached_user(client, db):
+    user = make_user(db, "alice")
+    headers = auth_headers(user)
+    client.get("/api/auth/me", headers=headers)
+    assert user_cache.get(user.email) is not None
+
+    user.is_active = False
+    db.commit()
+
+    assert user_cache.get(user.email) is None
+    assert client.get("/api/auth/me", headers=headers).json()["is_active"] is False
+
+
+def test_email_change_drops_old_cache_entry(db):
+    user = make_user(db, "alice")
+    user_cache.set("alice@example.com", {"stale": True})
+
+    db.get(User, user.id).email = "alice@new.example.com"
+    db.commit()
+
+    assert user_cache.get("alice@example.com") is None
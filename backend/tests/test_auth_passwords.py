@@ -0,0 +1,41 @@
+from passlib.hash import pbkdf2_sha256
+
+from app.hashing import password_pool, verify_password
+from app.models import User
+
+
+def test_register_and_login(client):
+    payload = {"username": "alice", "email": "alice@example.com", "password": "secret123"}
+    assert client.post("/api/auth/register", json=payload).status_code == 200
+
+    ok = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "secret123"})
+    bad = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "nope"})
+
+    assert ok.status_code == 200 and ok.json()["token_type"] == "bearer"
+    assert bad.status_code == 401
+    assert password_pool.stats()["completed"] >= 3
+
+
+def test_login_rehashes_outdated_password_hash(client, db):
+    weak_hash = pbkdf2_sha256.using(rounds=1000).hash("secret123")
+    db.add(User(username="alice", email="alice@example.com", hashed_password=weak_hash))
+    db.commit()
+
+    response = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "secret123"})
+
+    assert response.status_code == 200
+    new_hash = db.query(User.hashed_password).filter(User.email == "alice@example.com").scalar()
+    assert new_hash != weak_hash
+    assert pbkdf2_sha256.from_string(new_hash).rounds == 29000
+    assert verify_password("secret123", new_hash)
+
+
+def test_login_is_shed_when_password_pool_is_full(client, db, monkeypatch):
+    db.add(User(username="alice", email="alice@example.com", hashed_password=pbkdf2_sha256.hash("x")))
+    db.commit()
+    monkeypatch.setattr(password_pool, "_pending", password_pool.max_pending)
+
+    response = client.post("/api/auth/login", json={"email": "alice@example.com", "password": "x"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
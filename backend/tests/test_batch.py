@@ -0,0 +1,53 @@
+from app.models import Like
+from tests.utils import make_user, make_posts, auth_headers
+
+
+def test_posts_batch_keeps_request_order_and_marks_missing(client, db):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    first, second = make_posts(db, alice, 2)
+    third = make_posts(db, bob, 1)[0]
+    db.add(Like(user_id=bob.id, post_id=second.id))
+    db.commit()
+
+    response = client.get(f"/api/posts/batch?ids={third.id},999,{first.id},{second.id},{third.id}", headers=auth_headers(bob))
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [p and p["id"] for p in body["posts"]] == [third.id, None, first.id, second.id]
+    assert body["missing"] == [999]
+    assert body["posts"][0]["author"]["username"] == "bob"
+    assert [p["is_liked"] for p in body["posts"] if p] == [False, False, True]
+
+
+def test_posts_batch_query_count_is_constant(client, db, count_queries):
+    author = make_user(db, "author")
+    ids = [post.id for post in make_posts(db, author, 40)]
+
+    with count_queries() as small:
+        client.get("/api/posts/batch?ids=" + ",".join(map(str, ids[:3])))
+    with count_queries() as large:
+        client.get("/api/posts/batch?ids=" + ",".join(map(str, ids)))
+
+    assert len(small) == len(large) == 1
+
+
+def test_users_batch_keeps_request_order_and_marks_missing(client, db, count_queries):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    url = f"/api/users/batch?ids={bob.id},0,{alice.id}"
+
+    with count_queries() as statements:
+        response = client.get(url)
+
+    assert response.status_code == 200
+    assert [u and u["username"] for u in response.json()["users"]] == ["bob", None, "alice"]
+    assert response.json()["missing"] == [0]
+    assert len(statements) == 1
+
+
+def test_batch_rejects_malformed_ids(client):
+    assert client.get("/api/posts/batch").status_code == 422
+    assert client.get("/api/posts/batch?ids=1,two").status_code == 400
+    assert client.get("/api/users/batch?ids=" + ",".join(map(str, range(101)))).status_code == 400
+    assert client.get("/api/users/batch?ids=").json() == {"users": [], "missing": []}
@@ -0,0 +1,85 @@
+import time
+
+from app.cache import LocalCache, feed_cache
+from tests.utils import make_user, make_posts, auth_headers
+
+
+def test_local_cache_evicts_least_recently_used():
+    cache = LocalCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_local_cache_expires_entries():
+    cache = LocalCache(default_ttl=60)
+    cache.set("short", 1, ttl=0.01)
+    cache.set("long", 2)
+    time.sleep(0.02)
+
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    assert cache.stats()["expirations"] == 1
+
+
+def test_local_cache_invalidates_by_tag():
+    cache = LocalCache()
+    cache.set("feed:20", [1, 2], tags=["feed", "post:1", "post:2"])
+    cache.set("post:1", {"id": 1}, tags=["post:1"])
+    cache.set("post:3", {"id": 3}, tags=["post:3"])
+
+    cache.invalidate_tags("post:1")
+
+    assert cache.get("feed:20") is None
+    assert cache.get("post:1") is None
+    assert cache.get("post:3") == {"id": 3}
+
+
+def test_feed_first_page_is_served_from_cache(client, db, count_queries):
+    author = make_user(db, "author")
+    make_posts(db, author, 3)
+
+    first = client.get("/api/posts/")
+    hits = feed_cache.stats()["hits"]
+    with count_queries() as statements:
+        second = client.get("/api/posts/")
+
+    assert second.json() == first.json()
+    assert statements == []
+    assert feed_cache.stats()["hits"] == hits + 1
+
+
+def test_cached_feed_overlays_is_liked_per_user(client, db):
+    author = make_user(db, "author")
+    fan = make_user(db, "fan")
+    post = make_posts(db, author, 1)[0]
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(fan))
+
+    hits = feed_cache.stats()["hits"]
+    anonymous = client.get("/api/posts/").json()
+    as_fan = client.get("/api/posts/", headers=auth_headers(fan)).json()
+    as_author = client.get("/api/posts/", headers=auth_headers(author)).json()
+
+    assert [p["is_liked"] for p in (anonymous[0], as_fan[0], as_author[0])] == [False, True, False]
+    assert feed_cache.stats()["hits"] == hits + 2
+
+
+def test_writes_invalidate_cached_views(client, db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    assert client.get(f"/api/posts/{post.id}").json()["likes_count"] == 0
+    assert len(client.get("/api/posts/").json()) == 1
+
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+    client.post(f"/api/posts/{post.id}/comments", json={"content": "hi"}, headers=auth_headers(author))
+    client.post("/api/posts/", json={"title": "New"}, headers=auth_headers(author))
+
+    detail = client.get(f"/api/posts/{post.id}").json()
+    assert (detail["likes_count"], detail["comments_count"]) == (1, 1)
+    assert len(client.get("/api/posts/").json()) == 2
@@ -0,0 +1,40 @@
+from datetime import datetime
+
+from tests.utils import make_user, make_posts, make_comments
+
+
+def test_comments_are_paged_oldest_first(client, db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    comments = make_comments(db, post, [author], 7)
+    for comment in comments:
+        comment.created_at = datetime(2024, 1, 1)
+    db.commit()
+
+    seen = []
+    response = client.get(f"/api/posts/{post.id}/comments?limit=3")
+    while True:
+        seen.extend(c["id"] for c in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = client.get(f"/api/posts/{post.id}/comments?limit=3&cursor={cursor}")
+
+    assert seen == [c.id for c in comments]
+
+
+def test_comments_query_count_is_constant(client, db, count_queries):
+    users = [make_user(db, f"user{i}") for i in range(10)]
+    post = make_posts(db, users[0], 1)[0]
+    make_comments(db, post, users, 60)
+    url = f"/api/posts/{post.id}/comments"
+    usernames = {u.username for u in users}
+
+    with count_queries() as small_page:
+        small = client.get(f"{url}?limit=5").json()
+    with count_queries() as large_page:
+        large = client.get(f"{url}?limit=60").json()
+
+    assert len(small) == 5 and len(large) == 60
+    assert {c["user"]["username"] for c in large} == usernames
+    assert len(small_page) == len(large_page) == 1
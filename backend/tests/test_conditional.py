@@ -0,0 +1,121 @@
+from app.cache import feed_cache
+from app.routes import users
+from tests.utils import make_user, make_posts, auth_headers
+
+
+def _revalidate(client, url, response, headers=None):
+    return client.get(url, headers=dict(headers or {}, **{"If-None-Match": response.headers["ETag"]}))
+
+
+def test_post_is_revalidated_until_it_changes(client, db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    url = f"/api/posts/{post.id}"
+
+    first = client.get(url)
+    assert first.status_code == 200
+    assert first.headers["ETag"].startswith('"')
+    assert first.headers["Last-Modified"].endswith("GMT")
+
+    unchanged = _revalidate(client, url, first)
+    assert unchanged.status_code == 304
+    assert unchanged.content == b""
+    assert unchanged.headers["ETag"] == first.headers["ETag"]
+
+    client.post(f"{url}/comments", json={"content": "nice"}, headers=auth_headers(author))
+    changed = _revalidate(client, url, first)
+    assert changed.status_code == 200
+    assert changed.json()["comments_count"] == 1
+    assert changed.headers["ETag"] != first.headers["ETag"]
+
+
+def test_post_etag_covers_is_liked_and_the_author(client, db):
+    author = make_user(db, "author")
+    fan = make_user(db, "fan")
+    post = make_posts(db, author, 1)[0]
+    url = f"/api/posts/{post.id}"
+    client.post(f"{url}/like", headers=auth_headers(fan))
+
+    anonymous = client.get(url)
+    as_fan = client.get(url, headers=auth_headers(fan))
+    assert as_fan.json()["is_liked"] is True
+    assert as_fan.headers["ETag"] != anonymous.headers["ETag"]
+    assert _revalidate(client, url, anonymous, auth_headers(fan)).status_code == 200
+    assert _revalidate(client, url, as_fan, auth_headers(fan)).status_code == 304
+    assert _revalidate(client, url, anonymous, auth_headers(author)).status_code == 304
+
+    client.patch("/api/auth/me", json={"full_name": "The Author"}, headers=auth_headers(author))
+    assert _revalidate(client, url, anonymous).status_code == 200
+
+
+def test_uncached_post_is_revalidated_with_one_query(client, db, count_queries):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    url = f"/api/posts/{post.id}"
+    first = client.get(url)
+    feed_cache.clear()
+
+    with count_queries() as statements:
+        assert _revalidate(client, url, first).status_code == 304
+
+    assert len(statements) == 1
+    assert client.get("/api/posts/999", headers={"If-None-Match": first.headers["ETag"]}).status_code == 404
+
+
+def test_cached_feed_is_revalidated_without_queries(client, db, count_queries):
+    author = make_user(db, "author")
+    make_posts(db, author, 3)
+    first = client.get("/api/posts/")
+
+    with count_queries() as statements:
+        assert _revalidate(client, "/api/posts/", first).status_code == 304
+    assert statements == []
+
+    client.post("/api/posts/", json={"title": "New"}, headers=auth_headers(author))
+    assert _revalidate(client, "/api/posts/", first).status_code == 200
+
+
+def test_cursor_page_is_revalidated_from_versions(client, db, count_queries):
+    author = make_user(db, "author")
+    posts = make_posts(db, author, 5)
+    cursor = client.get("/api/posts/?limit=2").headers["X-Next-Cursor"]
+    url = f"/api/posts/?limit=2&cursor={cursor}"
+    first = client.get(url)
+
+    with count_queries() as statements:
+        assert _revalidate(client, url, first).status_code == 304
+    # The version query only; no author, like or enrichment queries
+    assert len(statements) == 1
+
+    client.post(f"/api/posts/{posts[0].id}/like", headers=auth_headers(author))
+    client.post(f"/api/posts/{posts[2].id}/like", headers=auth_headers(author))
+    assert _revalidate(client, url, first).status_code == 200
+
+
+def test_user_is_revalidated_until_the_profile_changes(client, db):
+    user = make_user(db, "alice")
+    url = f"/api/users/{user.id}"
+    first = client.get(url)
+
+    assert _revalidate(client, url, first).status_code == 304
+    assert client.get(url, headers={"If-None-Match": "*"}).status_code == 304
+
+    client.post(f"/api/users/{user.id}/follow", headers=auth_headers(make_user(db, "bob")))
+    assert _revalidate(client, url, first).status_code == 304
+
+    client.patch("/api/auth/me", json={"bio": "Hello"}, headers=auth_headers(user))
+    changed = _revalidate(client, url, first)
+    assert changed.status_code == 200
+    assert changed.json()["bio"] == "Hello"
+
+
+def test_user_is_not_serialized_when_the_etag_matches(client, db, monkeypatch):
+    user = make_user(db, "alice")
+    url = f"/api/users/{user.id}"
+    first = client.get(url)
+
+    def fail(*args, **kwargs):
+        raise AssertionError("validated a user for a 304")
+
+    monkeypatch.setattr(users.UserResponse, "model_validate", fail)
+    assert _revalidate(client, url, first).status_code == 304
@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app import database
+from app.database import engine_options
+from app.models import Base, Post
+from tests.utils import make_user, make_posts, auth_headers
+
+
+@pytest.fixture
+def read_engine(tmp_path):
+    """A second SQLite file standing in for a read replica that has not caught up"""
+    replica = create_engine(
+        f"sqlite:///{tmp_path / 'replica.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=replica)
+    yield replica
+    replica.dispose()
+
+
+@pytest.fixture
+def replica_db(read_engine):
+    session = sessionmaker(autoflush=False, bind=read_engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+def test_reads_go_to_replica_and_writes_to_primary(client, db, replica_db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    replica_author = make_user(replica_db, "replica")
+    make_posts(replica_db, replica_author, 2)
+
+    feed = client.get("/api/posts/").json()
+    assert {item["author"]["username"] for item in feed} == {"replica"}
+    assert len(client.get(f"/api/users/{replica_author.id}/posts").json()) == 2
+    assert client.get(f"/api/posts/{post.id}/comments").json() == []
+
+    created = client.post("/api/posts/", json={"title": "new", "content": "AI art"}, headers=auth_headers(author))
+    assert created.status_code == 200
+    db.expire_all()
+    replica_db.expire_all()
+    assert db.query(Post).count() == 2
+    assert replica_db.query(Post).count() == 2
+
+
+def test_engine_options_follow_pool_settings(monkeypatch):
+    postgres_url = "postgresql://user:secret@db/aiverse"
+    monkeypatch.setattr(database, "DATABASE_POOL_SIZE", 20)
+    monkeypatch.setattr(database, "DATABASE_POOL_PRE_PING", True)
+
+    options = engine_options(postgres_url)
+    assert (options["pool_size"], options["pool_pre_ping"]) == (20, True)
+    assert engine_options("sqlite:///aiverse.db") == {}
+
+    monkeypatch.setattr(database, "DATABASE_PGBOUNCER", True)
+    assert engine_options(postgres_url) == {"poolclass": NullPool}
+    async_options = engine_options("postgresql+asyncpg://user:secret@db/aiverse", is_async=True)
+    assert async_options["connect_args"]["statement_cache_size"] == 0
+
+
+def test_reads_use_primary_without_replica():
+    assert database.DATABASE_REPLICA_URL is None
+    assert database.replica_engine is database.engine
@@ -0,0 +1,114 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app import events
+from app.events import FEED_TOPIC, LocalBroker, SlowConsumer, event_broker, post_topic
+from tests.utils import make_user, make_posts, auth_headers
+
+
+def _next(subscription, timeout=0):
+    return asyncio.run(subscription.next_events(timeout))
+
+
+def test_pending_events_are_coalesced_per_topic():
+    broker = LocalBroker()
+    subscription = broker.subscribe([post_topic(1), post_topic(2)])
+
+    broker.publish(post_topic(1), {"post_id": 1, "likes_count": 1})
+    broker.publish(post_topic(1), {"post_id": 1, "likes_count": 2})
+    broker.publish(post_topic(1), {"post_id": 1, "comments_count": 5})
+    broker.publish(post_topic(3), {"post_id": 3, "likes_count": 1})
+
+    assert _next(subscription) == [(post_topic(1), {"post_id": 1, "likes_count": 2, "comments_count": 5})]
+    assert _next(subscription, timeout=0.01) == []
+    assert broker.stats()["coalesced"] == 2
+    assert broker.stats()["delivered"] == 1
+
+
+def test_waiting_subscriber_is_woken_from_another_thread():
+    broker = LocalBroker()
+    subscription = broker.subscribe([FEED_TOPIC])
+    threading.Timer(0.05, broker.publish, (FEED_TOPIC, {"latest_post_id": 7})).start()
+
+    started = time.monotonic()
+    assert _next(subscription, timeout=5) == [(FEED_TOPIC, {"latest_post_id": 7})]
+    assert time.monotonic() - started < 1
+
+
+def test_subscriber_too_many_topics_behind_is_dropped():
+    broker = LocalBroker(max_pending=2)
+    subscription = broker.subscribe([post_topic(i) for i in range(3)])
+    for i in range(3):
+        broker.publish(post_topic(i), {"post_id": i})
+
+    with pytest.raises(SlowConsumer):
+        _next(subscription)
+    assert broker.stats()["dropped"] == 1
+    assert broker.stats()["subscribers"] == 0
+
+
+def test_subscriber_not_reading_is_dropped_after_max_lag():
+    broker = LocalBroker(max_lag=0.01)
+    subscription = broker.subscribe([post_topic(1)])
+    idle = broker.subscribe([post_topic(1)])
+    _next(idle, timeout=0.02)
+
+    broker.publish(post_topic(1), {"likes_count": 1})
+    assert _next(idle) == [(post_topic(1), {"likes_count": 1})]
+    time.sleep(0.02)
+    broker.publish(post_topic(1), {"likes_count": 2})
+
+    with pytest.raises(SlowConsumer):
+        _next(subscription)
+    assert _next(idle) == [(post_topic(1), {"likes_count": 2})]
+
+
+def test_writes_publish_post_and_feed_events(client, db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    subscription = event_broker.subscribe([post_topic(post.id), FEED_TOPIC])
+    try:
+        client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+        comment = client.post(f"/api/posts/{post.id}/comments", json={"content": "hi"}, headers=auth_headers(author))
+        created = client.post("/api/posts/", json={"title": "New"}, headers=auth_headers(author))
+
+        assert dict(_next(subscription)) == {
+            post_topic(post.id): {
+                "post_id": post.id, "likes_count": 1, "comments_count": 1, "last_comment_id": comment.json()["id"],
+            },
+            FEED_TOPIC: {"latest_post_id": created.json()["id"]},
+        }
+    finally:
+        subscription.close()
+
+
+def test_stream_sends_events_and_heartbeats(client, monkeypatch):
+    monkeypatch.setattr(events, "SSE_HEARTBEAT_SECONDS", 0.05)
+    monkeypatch.setattr(events, "SSE_MAX_STREAM_SECONDS", 0.5)
+    subscribers = event_broker.stats()["subscribers"]
+
+    def publish_once_subscribed():
+        deadline = time.monotonic() + 5
+        while event_broker.stats()["subscribers"] == subscribers and time.monotonic() < deadline:
+            time.sleep(0.01)
+        event_broker.publish(post_topic(42), {"post_id": 42, "likes_count": 3})
+
+    publisher = threading.Thread(target=publish_once_subscribed)
+    publisher.start()
+    response = client.get("/api/posts/stream?post_ids=42,43")
+    publisher.join()
+
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text.startswith("retry: ")
+    assert 'event: post\ndata: {"post_id":42,"likes_count":3}\n\n' in response.text
+    assert ": ping\n\n" in response.text
+    assert event_broker.stats()["subscribers"] == subscribers
+
+
+def test_stream_rejects_bad_subscriptions(client):
+    assert client.get("/api/posts/stream").status_code == 400
+    assert client.get("/api/posts/stream?post_ids=1,x").status_code == 400
+    assert client.get("/api/posts/stream?post_ids=" + ",".join(map(str, range(101)))).status_code == 400
@@ -0,0 +1,179 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import jobs
+from app.jobs import (
+    DONE, FAILED, QUEUED, claim_job, enqueue, enqueue_debounced, job_handler, prune_jobs, queue_stats, run_pending,
+    schedule_periodic,
+)
+from app.models import Job
+from tests.utils import make_user, auth_headers
+
+calls = []
+failures = {"remaining": 0}
+
+
+@job_handler("test.record")
+def record(db, value):
+    calls.append(value)
+
+
+@job_handler("test.flaky")
+def flaky(db):
+    if failures["remaining"]:
+        failures["remaining"] -= 1
+        raise ValueError("not yet")
+    calls.append("flaky")
+
+
+@job_handler("test.half_done")
+def half_done(db):
+    enqueue(db, "test.record", {"value": "side effect"})
+    raise ValueError("crashed midway")
+
+
+@pytest.fixture(autouse=True)
+def reset_handlers():
+    calls.clear()
+    failures["remaining"] = 0
+
+
+def _job(db, job_id):
+    db.expire_all()
+    return db.get(Job, job_id)
+
+
+def test_jobs_run_once_per_idempotency_key(db):
+    first = enqueue(db, "test.record", {"value": 1}, idempotency_key="once")
+    assert enqueue(db, "test.record", {"value": 2}, idempotency_key="once") is None
+    enqueue(db, "test.record", {"value": 3})
+    db.commit()
+
+    assert run_pending(db) == 2
+    assert calls == [1, 3]
+    assert _job(db, first).status == DONE
+    assert run_pending(db) == 0
+
+
+def test_failing_jobs_are_retried_with_backoff_then_failed(db, monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_RETRY_BASE_SECONDS", 60)
+    failures["remaining"] = 2
+    retried = enqueue(db, "test.flaky")
+    last_attempt = enqueue(db, "test.flaky", max_attempts=1)
+    db.commit()
+
+    assert run_pending(db) == 2
+    job = _job(db, retried)
+    assert (job.status, job.attempts, job.last_error) == (QUEUED, 1, "ValueError: not yet")
+    assert job.run_after > datetime.utcnow() + timedelta(seconds=50)
+    assert run_pending(db) == 0
+    assert _job(db, last_attempt).status == FAILED
+
+    job.run_after = datetime.utcnow()
+    db.commit()
+    assert run_pending(db) == 1
+    assert _job(db, retried).status == DONE
+    assert calls == ["flaky"]
+
+
+def test_failed_handler_effects_are_rolled_back(db):
+    job_id = enqueue(db, "test.half_done", max_attempts=1)
+    db.commit()
+
+    run_pending(db)
+
+    assert [(job.id, job.status) for job in db.query(Job)] == [(job_id, FAILED)]
+
+
+def test_debounced_jobs_share_one_run_after_the_window(db):
+    now = datetime(2026, 10, 18, 12, 0, 3)
+    first = enqueue_debounced(db, "test.record", {"value": 1}, "post:1", 10, now)
+    assert enqueue_debounced(db, "test.record", {"value": 2}, "post:1", 10, now + timedelta(seconds=6)) is None
+    other = enqueue_debounced(db, "test.record", {"value": 3}, "post:2", 10, now)
+    later = enqueue_debounced(db, "test.record", {"value": 4}, "post:1", 10, now + timedelta(seconds=7))
+    db.commit()
+
+    assert len({first, other, later}) == 3
+    assert _job(db, first).run_after == _job(db, other).run_after == datetime(2026, 10, 18, 12, 0, 10)
+    assert _job(db, later).run_after == datetime(2026, 10, 18, 12, 0, 20)
+
+
+def test_jobs_of_unknown_kind_fail_without_retries(db):
+    job_id = enqueue(db, "test.unknown")
+    db.commit()
+
+    run_pending(db)
+
+    job = _job(db, job_id)
+    assert (job.status, job.attempts) == (FAILED, 1)
+    assert "no handler" in job.last_error
+
+
+def test_expired_lease_is_claimed_again(db):
+    job_id = enqueue(db, "test.record", {"value": 1})
+    db.commit()
+    assert claim_job(db).id == job_id
+    assert claim_job(db) is None
+
+    db.query(Job).update({Job.locked_until: datetime.utcnow() - timedelta(seconds=1)})
+    db.commit()
+
+    assert run_pending(db) == 1
+    assert (_job(db, job_id).attempts, calls) == (2, [1])
+
+
+def test_periodic_jobs_are_enqueued_once_per_period(db):
+    now = datetime(2026, 10, 18, 12, 0)
+    assert schedule_periodic(db, {"test.record": 3600}, now) == 1
+    assert schedule_periodic(db, {"test.record": 3600}, now + timedelta(minutes=30)) == 0
+    assert schedule_periodic(db, {"test.record": 3600}, now + timedelta(hours=1)) == 1
+
+
+def test_prune_removes_old_finished_jobs(db):
+    for value in range(2):
+        enqueue(db, "test.record", {"value": value})
+    db.commit()
+    run_pending(db)
+    db.query(Job).filter(Job.id == 1).update({Job.finished_at: datetime.utcnow() - timedelta(days=2)})
+    db.commit()
+
+    assert prune_jobs(db) == 1
+    assert [job.id for job in db.query(Job)] == [2]
+
+
+def test_latency_is_measured_from_when_a_job_was_due(db):
+    job_id = enqueue(db, "test.record", {"value": 1})
+    # Enqueued an hour ago but debounced until now: the wait for the window is not latency
+    _job(db, job_id).created_at = datetime.utcnow() - timedelta(hours=1)
+    db.commit()
+
+    run_pending(db)
+
+    assert queue_stats(db)["test.record"]["latency_seconds"][0.99] < 60
+
+
+def test_writes_enqueue_side_effects_and_metrics_report_the_queue(client, db, run_jobs):
+    author = make_user(db, "author")
+    created = client.post("/api/posts/", json={"title": "Queued"}, headers=auth_headers(author)).json()
+    for _ in range(3):
+        client.post(f"/api/posts/{created['id']}/like", headers=auth_headers(author))
+
+    stats = queue_stats(db)
+    assert stats["timeline.fan_out"]["jobs"][QUEUED] == 1
+    # One rescore, due once the debounce window of the likes closes
+    assert stats["trending.rescore"]["jobs"][QUEUED] == 1
+    text = client.get("/api/metrics").text
+    assert 'aiverse_jobs{kind="trending.rescore",status="queued"} 1' in text
+    assert 'aiverse_jobs_oldest_due_seconds{kind="timeline.fan_out"}' in text
+
+    assert run_jobs() == 1
+    stats = queue_stats(db)
+    assert stats["timeline.fan_out"]["jobs"] == {"queued": 0, "running": 0, "done": 1, "failed": 0}
+    assert set(stats["timeline.fan_out"]["latency_seconds"]) == {0.5, 0.95, 0.99}
+    assert stats["timeline.fan_out"]["latency_count"] == 1
+    text = client.get("/api/metrics").text
+    assert "# TYPE aiverse_job_latency_seconds summary" in text
+    assert 'aiverse_job_latency_seconds{kind="timeline.fan_out",quantile="0.99"}' in text
+    assert 'aiverse_job_latency_seconds_sum{kind="timeline.fan_out"}' in text
+    assert 'aiverse_job_latency_seconds_count{kind="timeline.fan_out"} 1' in text
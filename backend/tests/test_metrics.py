@@ -0,0 +1,58 @@
+import logging
+
+import pytest
+from sqlalchemy.engine import Engine
+
+from app import metrics
+from app.metrics import instrument_engine, uninstrument_engine
+from tests.utils import make_user, make_posts
+
+
+@pytest.fixture(autouse=True)
+def instrumented():
+    """Count statements on the test engines too (the app only instruments its own)"""
+    for histogram in (metrics.request_latency, metrics.request_sql_statements, metrics.request_sql_seconds):
+        histogram.clear()
+    instrument_engine(Engine)
+    yield
+    uninstrument_engine(Engine)
+
+
+def _sample(text, name, **labels):
+    rendered = ",".join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = f"{name}{{{rendered}}} "
+    return next(float(line[len(prefix):]) for line in text.splitlines() if line.startswith(prefix))
+
+
+def test_metrics_record_latency_and_sql_per_route(client, db):
+    author = make_user(db, "author")
+    posts = make_posts(db, author, 3)
+    for post in posts:
+        client.get(f"/api/posts/{post.id}")
+    client.get("/api/posts/does-not-exist")
+
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+
+    route = {"method": "GET", "route": "/api/posts/{post_id}"}
+    assert _sample(text, "aiverse_http_request_duration_seconds_count", **route, status="200") == 3
+    assert _sample(text, "aiverse_http_request_duration_seconds_count", **route, status="422") == 1
+    assert _sample(text, "aiverse_http_request_sql_statements_count", **route) == 4
+    # Each post is loaded from the database once, invalid ids never reach it
+    assert _sample(text, "aiverse_http_request_sql_statements_sum", **route) >= 3
+    assert 'aiverse_cache_hits_total{cache="feed"}' in text
+    assert 'aiverse_worker_pool_in_flight{pool="password_hashing"}' in text
+
+
+def test_slow_request_log_lists_statements(client, db, monkeypatch, caplog):
+    make_posts(db, make_user(db, "author"), 2)
+    monkeypatch.setattr(metrics, "SLOW_REQUEST_MS", 0.000001)
+
+    with caplog.at_level(logging.WARNING, logger="app.metrics"):
+        client.get("/api/posts/?skip=1")
+
+    message = next(record.getMessage() for record in caplog.records if "Slow request" in record.getMessage())
+    assert "GET /api/posts/ (/api/posts/) -> 200" in message
+    assert "FROM posts" in message
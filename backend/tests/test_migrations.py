@@ -0,0 +1,41 @@
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from app.models import Base
+from app.search import include_name
+from tests.utils import alembic_config
+
+
+def test_migrations_match_models(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    command.upgrade(alembic_config(url), "head")
+
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        context = MigrationContext.configure(connection, opts={"include_name": include_name})
+        diff = compare_metadata(context, Base.metadata)
+    engine.dispose()
+    assert diff == []
+
+
+def test_upgrade_dedupes_likes_before_unique_index(tmp_path):
+    url = f"sqlite:///{tmp_path / 'legacy.db'}"
+    config = alembic_config(url)
+    command.upgrade(config, "0001")
+
+    engine = create_engine(url)
+    with engine.begin() as connection:
+        connection.execute(text("INSERT INTO users (id, username, email, hashed_password) VALUES (1, 'a', 'a@example.com', 'x')"))
+        connection.execute(text("INSERT INTO posts (id, title, content, author_id) VALUES (1, 't', 'c', 1)"))
+        connection.execute(text("INSERT INTO likes (user_id, post_id) VALUES (1, 1), (1, 1)"))
+
+    command.upgrade(config, "head")
+
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT COUNT(*) FROM likes")).scalar() == 1
+        assert connection.execute(text("SELECT likes_count FROM posts")).scalar() == 1
+    index_names = {index["name"] for index in inspect(engine).get_indexes("likes")}
+    engine.dispose()
+    assert "uq_likes_user_id_post_id" in index_names
@@ -0,0 +1,202 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.orm import sessionmaker
+
+from app.models import User, Post, Like, Comment
+from app.pagination import MAX_PAGE_SIZE
+from app.routes.posts import _toggle_like
+from app.schemas import UserResponse
+from app.utils import get_posts_with_details
+from reconcile_counters import reconcile_post_counters
+from tests.utils import make_user, make_posts, auth_headers
+
+
+def test_get_posts_with_details_counts(db):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    first, second = make_posts(db, alice, 2)
+    db.add_all([
+        Like(user_id=alice.id, post_id=first.id),
+        Like(user_id=bob.id, post_id=first.id),
+        Comment(content="nice", user_id=bob.id, post_id=second.id),
+    ])
+    db.commit()
+    reconcile_post_counters(db)
+    db.expire_all()
+
+    details = {p["id"]: p for p in get_posts_with_details([first, second], db, bob)}
+
+    assert details[first.id]["likes_count"] == 2
+    assert details[first.id]["comments_count"] == 0
+    assert details[first.id]["is_liked"] is True
+    assert details[second.id]["likes_count"] == 0
+    assert details[second.id]["comments_count"] == 1
+    assert details[second.id]["is_liked"] is False
+    assert details[second.id]["author"].username == "alice"
+
+
+def test_get_posts_with_details_query_count_is_constant(engine, db, count_queries):
+    viewer_id = make_user(db, "viewer").id
+    authors = [make_user(db, f"author{i}") for i in range(5)]
+    for author in authors:
+        make_posts(db, author, 10)
+
+    def enrich(page_size):
+        db.expunge_all()
+        current_user = db.get(User, viewer_id)
+        posts = db.query(Post).order_by(Post.id).limit(page_size).all()
+        with count_queries() as statements:
+            get_posts_with_details(posts, db, current_user)
+        return len(statements)
+
+    assert enrich(5) == enrich(50) == 2
+
+
+def test_feed_query_count_is_constant(client, db, count_queries):
+    author = make_user(db, "author")
+    make_posts(db, author, 40)
+
+    with count_queries() as small_page:
+        assert len(client.get("/api/posts/?limit=5").json()) == 5
+    with count_queries() as large_page:
+        assert len(client.get("/api/posts/?limit=40").json()) == 40
+
+    assert len(small_page) == len(large_page)
+
+
+def _walk_feed(client, url, limit):
+    seen = []
+    response = client.get(f"{url}?limit={limit}")
+    while True:
+        assert response.status_code == 200
+        seen.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return seen
+        response = client.get(f"{url}?limit={limit}&cursor={cursor}")
+
+
+def test_feed_cursor_pagination_walks_every_post_once(client, db):
+    author = make_user(db, "author")
+    posts = make_posts(db, author, 7)
+    # Identical timestamps must be ordered by the id tiebreaker
+    same_time = datetime(2024, 1, 1)
+    for post in posts:
+        post.created_at = same_time
+    db.commit()
+
+    seen = _walk_feed(client, "/api/posts/", 3)
+
+    assert seen == sorted((p.id for p in posts), reverse=True)
+
+
+def test_feed_cursor_is_stable_under_inserts(client, db):
+    author = make_user(db, "author")
+    make_posts(db, author, 4)
+
+    first_page = client.get("/api/posts/?limit=2")
+    make_posts(db, author, 3)
+    second_page = client.get(f"/api/posts/?limit=2&cursor={first_page.headers['X-Next-Cursor']}")
+
+    first_ids = [p["id"] for p in first_page.json()]
+    second_ids = [p["id"] for p in second_page.json()]
+    assert second_ids == [first_ids[-1] - 1, first_ids[-1] - 2]
+
+
+def test_feed_page_size_is_capped(client, db):
+    author = make_user(db, "author")
+    make_posts(db, author, MAX_PAGE_SIZE + 5)
+
+    response = client.get("/api/posts/?limit=1000")
+
+    assert len(response.json()) == MAX_PAGE_SIZE
+    assert "X-Next-Cursor" in response.headers
+
+
+def test_feed_rejects_malformed_cursor(client):
+    assert client.get("/api/posts/?cursor=not-a-cursor").status_code == 400
+
+
+def test_user_posts_are_paginated(client, db):
+    author = make_user(db, "author")
+    other = make_user(db, "other")
+    posts = make_posts(db, author, 5)
+    make_posts(db, other, 3)
+
+    seen = _walk_feed(client, f"/api/users/{author.id}/posts", 2)
+
+    assert seen == sorted((p.id for p in posts), reverse=True)
+
+
+def test_like_and_comment_maintain_post_counters(client, db):
+    author = make_user(db, "author")
+    fan = make_user(db, "fan")
+    post = make_posts(db, author, 1)[0]
+    updated_at = post.updated_at
+
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(fan))
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+    client.post(f"/api/posts/{post.id}/comments", json={"content": "wow"}, headers=auth_headers(fan))
+
+    db.refresh(post)
+    assert (post.likes_count, post.comments_count) == (1, 1)
+    assert post.updated_at == updated_at
+
+
+def test_like_toggle_returns_state_and_count(client, db):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+    url = f"/api/posts/{post.id}/like"
+
+    liked = client.post(url, headers=auth_headers(author)).json()
+    unliked = client.post(url, headers=auth_headers(author)).json()
+    missing = client.post("/api/posts/999/like", headers=auth_headers(author))
+
+    assert (liked["liked"], liked["likes_count"]) == (True, 1)
+    assert (unliked["liked"], unliked["likes_count"]) == (False, 0)
+    assert missing.status_code == 404
+    assert db.query(Like).count() == 0
+
+
+def test_concurrent_like_toggles_never_duplicate(engine, db):
+    users = [make_user(db, f"fan{i}") for i in range(4)]
+    post = make_posts(db, users[0], 1)[0]
+    post_id = post.id
+    snapshots = [UserResponse.model_validate(user) for user in users]
+    Session = sessionmaker(autoflush=False, bind=engine)
+
+    def toggle(user):
+        session = Session()
+        try:
+            return _toggle_like(session, post_id, user)
+        finally:
+            session.close()
+
+    # Three toggles per user, all in flight at once: an odd count, so every user ends up liking the post
+    with ThreadPoolExecutor(max_workers=12) as pool:
+        list(pool.map(toggle, snapshots * 3))
+
+    rows = db.query(Like.user_id, func.count(Like.id)).filter(Like.post_id == post_id).group_by(Like.user_id).all()
+    db.refresh(post)
+    assert sorted(rows) == sorted((user.id, 1) for user in snapshots)
+    assert post.likes_count == len(users)
+
+
+def test_reconcile_post_counters_repairs_drift(db):
+    author = make_user(db, "author")
+    drifted, accurate = make_posts(db, author, 2)
+    db.add(Like(user_id=author.id, post_id=drifted.id))
+    drifted.comments_count = 5
+    db.commit()
+
+    assert reconcile_post_counters(db, dry_run=True) == 1
+    assert reconcile_post_counters(db, batch_size=1) == 1
+    assert reconcile_post_counters(db) == 0
+
+    db.refresh(drifted)
+    db.refresh(accurate)
+    assert (drifted.likes_count, drifted.comments_count) == (1, 0)
+    assert (accurate.likes_count, accurate.comments_count) == (0, 0)
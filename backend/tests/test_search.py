@@ -0,0 +1,82 @@
+from app.models import Post, Like
+from tests.utils import make_user, auth_headers
+
+
+def make_post(db, author, title, content="AI art"):
+    post = Post(title=title, content=content, author_id=author.id)
+    db.add(post)
+    db.commit()
+    return post
+
+
+def _search(client, q, **params):
+    return client.get("/api/posts/search", params=dict(q=q, **params))
+
+
+def test_search_ranks_title_matches_first(client, db):
+    author = make_user(db, "author")
+    in_content = make_post(db, author, "Evening", "a neon city at night")
+    in_title = make_post(db, author, "Neon city", "rainy streets")
+    make_post(db, author, "Forest spirit", "moss and light")
+    db.add(Like(user_id=author.id, post_id=in_title.id))
+    db.commit()
+
+    response = client.get("/api/posts/search?q=neon%20city", headers=auth_headers(author))
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [p["id"] for p in results] == [in_title.id, in_content.id]
+    assert results[0]["author"]["username"] == "author"
+    assert results[0]["is_liked"] is True
+
+
+def test_search_requires_every_word_and_ignores_syntax(client, db):
+    author = make_user(db, "author")
+    make_post(db, author, "Neon city")
+    make_post(db, author, "Neon forest")
+
+    assert [p["title"] for p in _search(client, "neon city").json()] == ["Neon city"]
+    assert [p["title"] for p in _search(client, 'NEON" (city*').json()] == ["Neon city"]
+    assert _search(client, "?!").json() == []
+    assert _search(client, "").status_code == 422
+
+
+def test_search_finds_posts_created_through_the_api(client, db):
+    author = make_user(db, "author")
+    created = client.post(
+        "/api/posts/", json={"title": "Кибер кот", "content": "неоновый город"}, headers=auth_headers(author)
+    ).json()
+
+    assert [p["id"] for p in _search(client, "кибер").json()] == [created["id"]]
+    assert [p["id"] for p in _search(client, "Неоновый").json()] == [created["id"]]
+
+
+def test_search_cursor_walks_every_match_once(client, db):
+    author = make_user(db, "author")
+    expected = {make_post(db, author, f"Robot portrait {i}", "robot " * (i % 4)).id for i in range(23)}
+    make_post(db, author, "Unrelated")
+
+    seen = []
+    response = _search(client, "robot", limit=5)
+    while True:
+        seen.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = _search(client, "robot", limit=5, cursor=cursor)
+
+    assert len(seen) == len(set(seen)) == 23
+    assert set(seen) == expected
+
+
+def test_search_query_count_is_constant(client, db, count_queries):
+    author = make_user(db, "author")
+    for i in range(30):
+        make_post(db, author, f"Ocean dream {i}")
+
+    with count_queries() as small_page:
+        assert len(_search(client, "ocean", limit=3).json()) == 3
+    with count_queries() as large_page:
+        assert len(_search(client, "ocean", limit=30).json()) == 30
+
+    assert len(small_page) == len(large_page)
@@ -0,0 +1,51 @@
+from sqlalchemy import func
+
+from app.hashing import verify_password
+from app.models import User, Post, Like, Comment, Follow, TimelineEntry, TrendingScore
+from seed_data import SEED_PASSWORD, seed_database
+
+
+def test_seed_database_loads_consistent_rows_in_batches(engine, db):
+    counts = seed_database(engine, users=30, posts=200, likes_per_post=4, comments_per_post=2, batch_size=50)
+
+    assert counts["users"] == db.query(User).count() == 30
+    assert counts["posts"] == db.query(Post).count() == 200
+    assert counts["likes"] == db.query(Like).count()
+    assert counts["comments"] == db.query(Comment).count()
+    assert db.query(func.sum(Post.likes_count)).scalar() == counts["likes"]
+    assert db.query(func.sum(Post.comments_count)).scalar() == counts["comments"]
+    duplicate_likes = db.query(Like.user_id, Like.post_id).group_by(Like.user_id, Like.post_id).having(func.count() > 1)
+    assert duplicate_likes.count() == 0
+
+    user = db.query(User).filter(User.email == "user1@example.com").one()
+    assert verify_password(SEED_PASSWORD, user.hashed_password)
+    # One hash shared by every seeded user
+    assert db.query(func.count(func.distinct(User.hashed_password))).scalar() == 1
+
+
+def test_seed_database_appends_after_existing_rows(engine, db):
+    seed_database(engine, users=5, posts=10)
+    seed_database(engine, users=5, posts=10)
+
+    assert db.query(User).count() == 10
+    assert db.query(Post).count() == 20
+    assert db.query(User.username).order_by(User.id.desc()).first()[0] == "user10"
+
+
+def test_seed_database_follows_and_timelines(engine, db):
+    counts = seed_database(engine, users=40, posts=150, likes_per_post=0, comments_per_post=0, follows_per_user=5)
+
+    assert counts["follows"] == db.query(Follow).count() > 0
+    assert db.query(func.sum(User.followers_count)).scalar() == counts["follows"]
+    assert db.query(func.sum(User.following_count)).scalar() == counts["follows"]
+    assert db.query(Follow).filter(Follow.follower_id == Follow.followee_id).count() == 0
+    # Every post is on its author's timeline and on each follower's
+    expected = db.query(Post).count() + db.query(Post).join(Follow, Follow.followee_id == Post.author_id).count()
+    assert counts["timeline_entries"] == db.query(TimelineEntry).count() == expected
+
+
+def test_seed_database_scores_recent_posts_for_trending(engine, db):
+    counts = seed_database(engine, users=20, posts=100, likes_per_post=4, comments_per_post=2, days=1)
+
+    engaged = db.query(Post).filter(Post.likes_count + Post.comments_count > 0).count()
+    assert counts["trending_scores"] == db.query(TrendingScore).count() == engaged > 0
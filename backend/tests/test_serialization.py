@@ -0,0 +1,47 @@
+from app.main import app
+from app.schemas import PostResponse
+from app.serialization import serialize_posts
+from app.utils import get_posts_with_details
+from tests.utils import make_user, make_posts, auth_headers
+
+LISTINGS = ["/api/posts/", "/api/posts/search", "/api/posts/timeline", "/api/posts/trending", "/api/users/{user_id}/posts"]
+
+
+def test_listings_keep_their_openapi_schema():
+    paths = app.openapi()["paths"]
+    for path in LISTINGS:
+        schema = paths[path]["get"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert schema["type"] == "array"
+        assert schema["items"] == {"$ref": "#/components/schemas/PostResponse"}
+
+
+def test_serialize_posts_matches_the_response_model(db):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    posts = make_posts(db, alice, 2) + make_posts(db, bob, 1)
+    details = get_posts_with_details(posts, db, bob)
+
+    assert serialize_posts(details) == [PostResponse(**p).model_dump(mode="json") for p in details]
+
+
+def test_listing_response_keeps_route_headers(client, db):
+    author = make_user(db, "author")
+    make_posts(db, author, 3)
+
+    response = client.get(f"/api/users/{author.id}/posts?limit=2")
+
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["X-Next-Cursor"]
+    assert len(response.json()) == 2
+    feed = client.get("/api/posts/?limit=2")
+    assert feed.headers["X-Next-Cursor"] and feed.headers["ETag"]
+
+
+def test_profile_changes_reach_serialized_authors(client, db):
+    author = make_user(db, "author")
+    make_posts(db, author, 1)
+    assert client.get("/api/posts/search?q=post").json()[0]["author"]["full_name"] is None
+
+    client.patch("/api/auth/me", json={"full_name": "The Author"}, headers=auth_headers(author))
+
+    assert client.get("/api/posts/search?q=post").json()[0]["author"]["full_name"] == "The Author"
@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta
+
+from app import timeline
+from app.models import Follow, Post, TimelineEntry, User
+from tests.utils import make_user, auth_headers
+
+
+def _timeline(client, user, **params):
+    return client.get("/api/posts/timeline", params=params, headers=auth_headers(user))
+
+
+def _create_post(client, author, title):
+    return client.post("/api/posts/", json={"title": title}, headers=auth_headers(author)).json()
+
+
+def _counts(db, user):
+    db.expire_all()
+    user = db.get(User, user.id)
+    return user.followers_count, user.following_count
+
+
+def test_follow_and_unfollow_are_idempotent(client, db):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+
+    for _ in range(2):
+        response = client.post(f"/api/users/{bob.id}/follow", headers=auth_headers(alice))
+        assert response.status_code == 200
+        assert response.json()["following"] is True
+        assert response.json()["followers_count"] == 1
+    assert db.query(Follow).count() == 1
+    assert _counts(db, alice) == (0, 1)
+    assert _counts(db, bob) == (1, 0)
+
+    for _ in range(2):
+        response = client.delete(f"/api/users/{bob.id}/follow", headers=auth_headers(alice))
+        assert response.status_code == 200
+        assert response.json() == {"message": "User unfollowed", "following": False, "followers_count": 0}
+    assert db.query(Follow).count() == 0
+    assert _counts(db, alice) == (0, 0)
+    assert _counts(db, bob) == (0, 0)
+
+
+def test_follow_rejects_self_and_missing_users(client, db):
+    alice = make_user(db, "alice")
+
+    assert client.post(f"/api/users/{alice.id}/follow", headers=auth_headers(alice)).status_code == 400
+    assert client.post("/api/users/999/follow", headers=auth_headers(alice)).status_code == 404
+
+
+def test_timeline_shows_own_and_followed_posts(client, db, run_jobs):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    carol = make_user(db, "carol")
+    client.post(f"/api/users/{bob.id}/follow", headers=auth_headers(alice))
+
+    first = _create_post(client, bob, "Bob 1")
+    own = _create_post(client, alice, "Alice 1")
+    _create_post(client, carol, "Carol 1")
+    second = _create_post(client, bob, "Bob 2")
+    # Authors see their posts right away, followers once the fan-out jobs ran
+    assert [p["id"] for p in _timeline(client, alice).json()] == [own["id"]]
+    assert run_jobs() == 4
+
+    response = _timeline(client, alice)
+
+    assert response.status_code == 200
+    assert [p["id"] for p in response.json()] == [second["id"], own["id"], first["id"]]
+    assert response.json()[0]["author"]["username"] == "bob"
+    assert _timeline(client, carol).json()[0]["title"] == "Carol 1"
+
+
+def test_follow_backfills_and_unfollow_removes_posts(client, db):
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    older = _create_post(client, bob, "Before the follow")
+
+    client.post(f"/api/users/{bob.id}/follow", headers=auth_headers(alice))
+    assert [p["id"] for p in _timeline(client, alice).json()] == [older["id"]]
+
+    client.delete(f"/api/users/{bob.id}/follow", headers=auth_headers(alice))
+    assert _timeline(client, alice).json() == []
+
+
+def test_high_follower_posts_are_merged_on_read(client, db, monkeypatch, run_jobs):
+    monkeypatch.setattr(timeline, "TIMELINE_FANOUT_MAX_FOLLOWERS", 2)
+    star = make_user(db, "star")
+    fans = [make_user(db, f"fan{i}") for i in range(3)]
+    for fan in fans:
+        client.post(f"/api/users/{star.id}/follow", headers=auth_headers(fan))
+    regular = make_user(db, "regular")
+    client.post(f"/api/users/{regular.id}/follow", headers=auth_headers(fans[0]))
+
+    star_post = _create_post(client, star, "Star post")
+    regular_post = _create_post(client, regular, "Regular post")
+    run_jobs()
+
+    # Only the author's own copy is written for a star post
+    assert db.query(TimelineEntry).filter(TimelineEntry.post_id == star_post["id"]).count() == 1
+    assert [p["id"] for p in _timeline(client, fans[0]).json()] == [regular_post["id"], star_post["id"]]
+    assert [p["id"] for p in _timeline(client, fans[2]).json()] == [star_post["id"]]
+
+
+def test_oversized_timelines_are_trimmed_by_a_job_not_by_reads(client, db, monkeypatch, count_queries):
+    monkeypatch.setattr(timeline, "TIMELINE_MAX_ENTRIES", 5)
+    alice = make_user(db, "alice")
+    bob = make_user(db, "bob")
+    start = datetime(2026, 1, 1)
+    posts = [Post(title=f"Post {i}", author_id=alice.id, created_at=start + timedelta(minutes=i)) for i in range(8)]
+    db.add_all(posts)
+    db.flush()
+    db.add_all(TimelineEntry(user_id=alice.id, post_id=p.id, author_id=alice.id, created_at=p.created_at) for p in posts)
+    db.add_all(TimelineEntry(user_id=bob.id, post_id=p.id, author_id=alice.id, created_at=p.created_at) for p in posts[:5])
+    db.commit()
+    headers = auth_headers(alice)
+
+    with count_queries() as statements:
+        response = client.get("/api/posts/timeline", params={"limit": 3}, headers=headers)
+
+    assert [p["title"] for p in response.json()] == ["Post 7", "Post 6", "Post 5"]
+    assert not any(s.lstrip().upper().startswith(("DELETE", "INSERT", "UPDATE")) for s in statements)
+    assert db.query(TimelineEntry).count() == 13
+
+    assert timeline.trim_timelines(db) == 1
+    db.commit()
+    assert db.query(TimelineEntry).filter(TimelineEntry.user_id == alice.id).count() == 5
+    assert db.query(TimelineEntry).filter(TimelineEntry.user_id == bob.id).count() == 5
+
+
+def test_timeline_cursor_walks_every_entry_once(client, db, monkeypatch):
+    monkeypatch.setattr(timeline, "TIMELINE_FANOUT_MAX_FOLLOWERS", 1)
+    alice = make_user(db, "alice")
+    star = make_user(db, "star")
+    client.post(f"/api/users/{star.id}/follow", headers=auth_headers(alice))
+    created_at = datetime(2026, 1, 1)
+    # Identical timestamps across both sources exercise the id tie-break
+    posts = [Post(title=f"Post {i}", author_id=(alice, star)[i % 2].id, created_at=created_at) for i in range(17)]
+    db.add_all(posts)
+    db.flush()
+    db.add_all(
+        TimelineEntry(user_id=alice.id, post_id=p.id, author_id=alice.id, created_at=p.created_at)
+        for p in posts if p.author_id == alice.id
+    )
+    db.commit()
+
+    seen = []
+    response = _timeline(client, alice, limit=4)
+    while True:
+        seen.extend(p["id"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        response = _timeline(client, alice, limit=4, cursor=cursor)
+
+    assert seen == sorted((p.id for p in posts), reverse=True)
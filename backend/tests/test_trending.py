@@ -0,0 +1,136 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import trending
+from app.models import Like, TrendingScore
+from app.trending import compact_trending, hotness, rebuild_trending
+from tests.utils import make_user, make_posts, auth_headers
+
+
+@pytest.fixture(autouse=True)
+def rescore_right_away(monkeypatch):
+    """Rescore jobs are due at once instead of when their debounce window closes"""
+    monkeypatch.setattr(trending, "TRENDING_RESCORE_SECONDS", 0)
+
+
+def _scores(db):
+    db.expire_all()
+    return {row.post_id: row.score for row in db.query(TrendingScore)}
+
+
+def _trending_ids(client, **params):
+    response = client.get("/api/posts/trending", params=params)
+    assert response.status_code == 200
+    return [p["id"] for p in response.json()], response.headers.get("X-Next-Cursor")
+
+
+def test_likes_and_comments_update_scores(client, db, run_jobs):
+    author = make_user(db, "author")
+    fan = make_user(db, "fan")
+    post = make_posts(db, author, 1)[0]
+    created_at = post.created_at
+
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(fan))
+    assert _scores(db) == {}
+    assert run_jobs() == 1
+    assert _scores(db) == {post.id: pytest.approx(hotness(1, 0, created_at))}
+    client.post(f"/api/posts/{post.id}/comments", json={"content": "wow"}, headers=auth_headers(fan))
+    run_jobs()
+    assert _scores(db) == {post.id: pytest.approx(hotness(1, 1, created_at))}
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(fan))
+    run_jobs()
+    assert _scores(db) == {post.id: pytest.approx(hotness(0, 1, created_at))}
+
+
+def test_unliked_post_without_comments_leaves_trending(client, db, run_jobs):
+    author = make_user(db, "author")
+    post = make_posts(db, author, 1)[0]
+
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+    run_jobs()
+    assert set(_scores(db)) == {post.id}
+    client.post(f"/api/posts/{post.id}/like", headers=auth_headers(author))
+    run_jobs()
+
+    assert _scores(db) == {}
+    assert _trending_ids(client) == ([], None)
+
+
+def test_trending_ranks_engagement_against_age(client, db, run_jobs):
+    author = make_user(db, "author")
+    fans = [make_user(db, f"fan{i}") for i in range(10)]
+    now = datetime.utcnow()
+    fresh, old_popular, old_quiet = make_posts(db, author, 3)
+    old_popular.created_at = old_quiet.created_at = now - timedelta(seconds=trending.TRENDING_DECAY_SECONDS * 1.1)
+    fresh.created_at = now
+    db.commit()
+
+    client.post(f"/api/posts/{old_quiet.id}/like", headers=auth_headers(fans[0]))
+    client.post(f"/api/posts/{fresh.id}/like", headers=auth_headers(fans[0]))
+    for fan in fans:
+        client.post(f"/api/posts/{old_popular.id}/like", headers=auth_headers(fan))
+
+    run_jobs()
+    # 10x the likes buys one decay period, not the 1.1 between them
+    assert _trending_ids(client)[0] == [fresh.id, old_popular.id, old_quiet.id]
+    client.post(f"/api/posts/{old_popular.id}/comments", json={"content": "!"}, headers=auth_headers(fans[0]))
+    client.post(f"/api/posts/{old_popular.id}/comments", json={"content": "!"}, headers=auth_headers(fans[1]))
+    client.post(f"/api/posts/{old_popular.id}/comments", json={"content": "!"}, headers=auth_headers(fans[2]))
+    run_jobs()
+    assert _trending_ids(client)[0] == [old_popular.id, fresh.id, old_quiet.id]
+
+
+def test_trending_pages_are_one_range_read(client, db, count_queries):
+    author = make_user(db, "author")
+    posts = make_posts(db, author, 5)
+    for post in posts:
+        db.add(Like(user_id=author.id, post_id=post.id))
+        post.likes_count = 1
+    db.commit()
+    rebuild_trending(db)
+
+    seen, cursor = [], None
+    while True:
+        with count_queries() as statements:
+            page, cursor = _trending_ids(client, limit=2, **({"cursor": cursor} if cursor else {}))
+        # Scores, then the posts of the page
+        assert len(statements) == 2
+        seen += page
+        if cursor is None:
+            break
+    assert seen == sorted(post.id for post in posts)[::-1]
+    assert client.get("/api/posts/trending?cursor=garbage").status_code == 400
+
+
+def test_compaction_drops_cold_posts_and_caps_the_table(db, monkeypatch):
+    author = make_user(db, "author")
+    now = datetime.utcnow()
+    cold, warm, hot = make_posts(db, author, 3)
+    cold.created_at = now - timedelta(seconds=trending.TRENDING_WINDOW_SECONDS + 60)
+    warm.created_at = now - timedelta(hours=1)
+    for post, likes in ((cold, 1), (warm, 1), (hot, 5)):
+        post.likes_count = likes
+    db.commit()
+    db.add_all(TrendingScore(post_id=p.id, score=hotness(p.likes_count, 0, p.created_at)) for p in (cold, warm, hot))
+    db.commit()
+
+    assert compact_trending(db, now) == 1
+    assert set(_scores(db)) == {warm.id, hot.id}
+
+    monkeypatch.setattr(trending, "TRENDING_MAX_ENTRIES", 1)
+    assert compact_trending(db, now) == 1
+    assert set(_scores(db)) == {hot.id}
+
+
+def test_rebuild_matches_incremental_scores(client, db, run_jobs):
+    author = make_user(db, "author")
+    fan = make_user(db, "fan")
+    first, second, _ = make_posts(db, author, 3)
+    client.post(f"/api/posts/{first.id}/like", headers=auth_headers(fan))
+    client.post(f"/api/posts/{second.id}/comments", json={"content": "nice"}, headers=auth_headers(fan))
+    run_jobs()
+    incremental = _scores(db)
+
+    assert rebuild_trending(db, batch_size=1) == 2
+    assert _scores(db) == pytest.approx(incremental)
@@ -0,0 +1,201 @@
+import io
+import os
+
+import pytest
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from app.images import CONTENT_KEY_RE, RENDITION_SIZES, process_image
+from app.main import UploadStaticFiles
+from app.middleware import BodySizeLimitMiddleware
+from app.models import Post
+from app.routes import posts
+from gc_uploads import collect_garbage
+from tests.utils import make_user
+
+
+def make_image(size, fmt="JPEG", mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, size, "purple").save(buffer, fmt)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def upload_dir(tmp_path, monkeypatch):
+    directory = tmp_path / "uploads"
+    directory.mkdir()
+    monkeypatch.setattr(posts, "UPLOAD_DIR", str(directory))
+    return directory
+
+
+def test_process_image_produces_square_renditions():
+    renditions = process_image(make_image((3000, 2000)))
+
+    assert sorted(renditions) == sorted(RENDITION_SIZES)
+    for size, encoded in renditions.items():
+        for name, pil_format in (("jpeg", "JPEG"), ("webp", "WEBP")):
+            image = Image.open(io.BytesIO(encoded[name]))
+            assert image.format == pil_format
+            assert image.size == (size, size)
+
+
+def test_process_image_handles_transparent_png():
+    renditions = process_image(make_image((500, 800), "PNG", "RGBA"))
+
+    assert Image.open(io.BytesIO(renditions[320]["jpeg"])).size == (320, 320)
+
+
+def test_upload_returns_rendition_map(client, upload_dir):
+    response = client.post("/api/posts/upload", files={"file": ("art.png", make_image((1200, 900), "PNG"), "image/png")})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["url"] == f"/uploads/{body['filename']}"
+    assert body["renditions"]["1080"]["jpeg"] == body["url"]
+    assert set(body["renditions"]) == {"1080", "640", "320"}
+    for formats in body["renditions"].values():
+        for url in formats.values():
+            assert (upload_dir / url.rsplit("/", 1)[1]).exists()
+
+
+def test_reupload_of_same_image_is_deduplicated(client, upload_dir):
+    data = make_image((800, 800), "PNG")
+
+    first = client.post("/api/posts/upload", files={"file": ("a.png", data, "image/png")}).json()
+    file_count = len(list(upload_dir.iterdir()))
+    second = client.post("/api/posts/upload", files={"file": ("b.png", data, "image/png")}).json()
+
+    assert second["url"] == first["url"]
+    assert CONTENT_KEY_RE.match(first["filename"])
+    assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+    assert len(list(upload_dir.iterdir())) == file_count == 6
+
+
+def test_reupload_restarts_the_gc_grace_period(client, db, upload_dir):
+    data = make_image((800, 800), "PNG")
+    client.post("/api/posts/upload", files={"file": ("a.png", data, "image/png")})
+    for path in upload_dir.iterdir():
+        os.utime(path, (0, 0))
+
+    second = client.post("/api/posts/upload", files={"file": ("b.png", data, "image/png")}).json()
+
+    assert second["deduplicated"] is True
+    assert collect_garbage(db, str(upload_dir)) == []
+    assert len(list(upload_dir.iterdir())) == 6
+
+
+def test_content_addressed_uploads_are_served_immutable(tmp_path):
+    (tmp_path / f"{'a' * 32}.jpg").write_bytes(b"jpeg")
+    (tmp_path / "20240101_120000_upload.jpg").write_bytes(b"jpeg")
+    static_app = FastAPI()
+    static_app.mount("/uploads", UploadStaticFiles(directory=str(tmp_path)))
+    static_client = TestClient(static_app)
+
+    hashed = static_client.get(f"/uploads/{'a' * 32}.jpg")
+    legacy = static_client.get("/uploads/20240101_120000_upload.jpg")
+
+    assert "immutable" in hashed.headers["Cache-Control"]
+    assert "Cache-Control" not in legacy.headers
+
+
+def test_gc_removes_only_unreferenced_old_files(db, upload_dir):
+    author = make_user(db, "author")
+    author.avatar_url = "/uploads/avatar.jpg"
+    kept_key, dropped_key = "a" * 32, "b" * 32
+    db.add(Post(title="Art", image_url=f"/uploads/{kept_key}.jpg", author_id=author.id))
+    db.commit()
+    for name in (f"{kept_key}.jpg", f"{kept_key}_320.webp", f"{dropped_key}.jpg", f"{dropped_key}_640.jpg",
+                 "avatar.jpg", "fresh.jpg"):
+        (upload_dir / name).write_bytes(b"x")
+        if name != "fresh.jpg":
+            os.utime(upload_dir / name, (0, 0))
+
+    assert sorted(collect_garbage(db, str(upload_dir), dry_run=True)) == [f"{dropped_key}.jpg", f"{dropped_key}_640.jpg"]
+    collect_garbage(db, str(upload_dir))
+
+    assert sorted(p.name for p in upload_dir.iterdir()) == sorted(
+        [f"{kept_key}.jpg", f"{kept_key}_320.webp", "avatar.jpg", "fresh.jpg"]
+    )
+
+
+def test_upload_rejects_non_images(client, upload_dir):
+    response = client.post("/api/posts/upload", files={"file": ("notes.txt", b"hello", "text/plain")})
+
+    assert response.status_code == 400
+
+
+def test_upload_over_byte_limit_is_rejected(client, upload_dir, monkeypatch):
+    monkeypatch.setattr(posts, "MAX_UPLOAD_BYTES", 1024)
+    data = make_image((600, 600), "PNG") + b"\0" * 2048
+
+    response = client.post("/api/posts/upload", files={"file": ("big.png", data, "image/png")})
+
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_over_pixel_limit_is_rejected(client, upload_dir, monkeypatch):
+    monkeypatch.setattr(posts, "MAX_IMAGE_PIXELS", 100 * 100)
+
+    response = client.post("/api/posts/upload", files={"file": ("bomb.png", make_image((101, 100), "PNG"), "image/png")})
+
+    assert response.status_code == 413
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_tripping_pillows_decompression_bomb_guard_is_rejected(client, upload_dir, monkeypatch):
+    class InlinePool:
+        async def run(self, fn, *args):
+            return fn(*args)
+
+    # Our own pixel check off, so only Pillow's guard (refusing twice its limit) stands in the way
+    monkeypatch.setattr(posts, "image_pool", InlinePool())
+    monkeypatch.setattr(posts, "MAX_IMAGE_PIXELS", 0)
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 100 * 100)
+
+    response = client.post("/api/posts/upload", files={"file": ("bomb.png", make_image((201, 100), "PNG"), "image/png")})
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Image has too many pixels to decode"}
+    assert list(upload_dir.iterdir()) == []
+
+
+def test_upload_of_corrupt_image_is_a_client_error(client, upload_dir):
+    response = client.post("/api/posts/upload", files={"file": ("broken.jpg", b"not really a jpeg", "image/jpeg")})
+
+    assert response.status_code == 400
+
+
+def test_body_size_limit_middleware_rejects_by_content_length(client):
+    response = client.post(
+        "/api/posts/upload",
+        content=b"x" * 10,
+        headers={"Content-Type": "multipart/form-data; boundary=x", "Content-Length": str(10 ** 9)},
+    )
+
+    assert response.status_code == 413
+
+
+def test_body_size_limit_middleware_rejects_chunked_bodies():
+    app = FastAPI()
+    handled = []
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        handled.append(file.filename)
+        return {}
+
+    app.add_middleware(BodySizeLimitMiddleware, max_body_size=1024, paths=["/upload"])
+    body = b"--x\r\nContent-Disposition: form-data; name=\"file\"; filename=\"big.png\"\r\n\r\n" + b"\0" * 4096
+
+    # An iterator is sent chunked, without a Content-Length header
+    response = TestClient(app).post(
+        "/upload",
+        content=iter([body[i:i + 512] for i in range(0, len(body), 512)]),
+        headers={"Content-Type": "multipart/form-data; boundary=x"},
+    )
+
+    assert response.status_code == 413
+    assert response.json() == {"detail": "Request body too large"}
+    assert handled == []
@@ -0,0 +1,46 @@
+import os
+
+from alembic.config import Config
+
+from app.models import User, Post, Comment
+from app.routes.auth import create_access_token
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config(url):
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BACKEND_DIR, "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def make_user(db, username="alice"):
+    user = User(username=username, email=f"{username}@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    return user
+
+
+def make_posts(db, author, count):
+    posts = [Post(title=f"Post {i}", content="AI art", author_id=author.id) for i in range(count)]
+    db.add_all(posts)
+    db.commit()
+    return posts
+
+
+def auth_headers(user):
+    token = create_access_token(data={"sub": user.email})
+    return {"Authorization": f"Bearer {token}"}
+
+
+def make_comments(db, post, users, count):
+    comments = [
+        Comment(content=f"Comment {i}", post_id=post.id, user_id=users[i % len(users)].id)
+        for i in range(count)
+    ]
+    db.add_all(comments)
+    db.commit()
+    return comments
@@ -0,0 +1,76 @@
+"""Run background jobs (see app/jobs.py).
+
+Usage:
+    python worker.py [--once] [--poll-interval SECONDS] [--batch N]
+
+Claims due jobs until the queue is empty, then polls every --poll-interval
+seconds. Run as many workers as needed; they share the jobs table. Each
+worker also enqueues the periodic maintenance jobs (timeline trimming,
+trending compaction, pruning of finished jobs), which run once per period
+whichever worker gets them. While the database is unreachable (or not
+migrated yet) the worker retries with backoff. With --once the queue is
+drained once and the worker exits.
+"""
+import argparse
+import logging
+import sys
+import time
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from app.database import SessionLocal
+from app.jobs import run_pending, schedule_periodic
+from app.timeline import TIMELINE_TRIM_SECONDS
+from app.trending import TRENDING_COMPACT_SECONDS
+
+logger = logging.getLogger("worker")
+
+# Ceiling of the retry delay while the database is unreachable
+MAX_BACKOFF_SECONDS = 60
+
+PERIODIC_JOBS = {
+    "timeline.trim": TIMELINE_TRIM_SECONDS,
+    "trending.compact": TRENDING_COMPACT_SECONDS,
+    "jobs.prune": 3600,
+}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--once", action="store_true", help="drain the queue once and exit")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between polls of an empty queue")
+    parser.add_argument("--batch", type=int, default=100, help="jobs run between checks for periodic jobs")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    db = SessionLocal()
+    ran = 0
+    backoff = args.poll_interval
+    try:
+        while True:
+            try:
+                schedule_periodic(db, PERIODIC_JOBS)
+                batch = run_pending(db, args.batch)
+            except SQLAlchemyError as e:
+                # Database down or not migrated yet: wait for it instead of exiting
+                if args.once:
+                    raise
+                db.rollback()
+                logger.warning("Database unavailable, retrying in %.0f s: %s", backoff, e)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, MAX_BACKOFF_SECONDS)
+                continue
+            backoff = args.poll_interval
+            ran += batch
+            if args.once and batch < args.batch:
+                break
+            if batch == 0:
+                time.sleep(args.poll_interval)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"Worker stopped: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(f"Ran {ran} jobs")
@@ -42,3 +42,9 @@ api.interceptors.response.use(
     return Promise.reject(error)
   }
 )
+
+// One page of a cursor-paginated listing; nextCursor is undefined on the last page
+export const fetchPage = async (url, cursor) => {
+  const { data, headers } = await api.get(url, { params: cursor ? { cursor } : undefined })
+  return { items: data, nextCursor: headers['x-next-cursor'] }
+}
@@ -1,23 +1,20 @@
 import React, { useState } from 'react';
-import { useQuery, useMutation, useQueryClient } from 'react-query';
-import { api } from '../api/api';
+import { useInfiniteQuery, useMutation, useQueryClient } from 'react-query';
+import { api, fetchPage } from '../api/api';
 import toast from 'react-hot-toast';
 import { Send } from 'lucide-react';
 import Comment from './Comment';
 
-const fetchComments = async (postId) => {
-  const { data } = await api.get(`/posts/${postId}/comments`);
-  return data;
-};
-
 const CommentSection = ({ postId }) => {
   const [commentText, setCommentText] = useState('');
   const queryClient = useQueryClient();
 
-  const { data: comments, isLoading } = useQuery(
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery(
     ['comments', postId],
-    () => fetchComments(postId)
+    ({ pageParam }) => fetchPage(`/posts/${postId}/comments`, pageParam),
+    { getNextPageParam: (lastPage) => lastPage.nextCursor }
   );
+  const comments = data?.pages.flatMap((page) => page.items);
 
   const addCommentMutation = useMutation(
     (newComment) => api.post(`/posts/${postId}/comments`, { content: newComment }),
@@ -71,6 +68,15 @@ const CommentSection = ({ postId }) => {
         {isLoading && <p className="text-gray-500">Loading comments...</p>}
         {comments && comments.map((comment) => <Comment key={comment.id} comment={comment} />)}
         {comments?.length === 0 && <p className="text-gray-500 text-sm text-center">No comments yet. Be the first!</p>}
+        {hasNextPage && (
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="w-full text-sm text-blue-600 hover:text-blue-800 disabled:text-gray-400 transition"
+          >
+            {isFetchingNextPage ? 'Loading...' : 'Load more comments'}
+          </button>
+        )}
       </div>
     </div>
   );
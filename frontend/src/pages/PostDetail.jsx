@@ -1,7 +1,7 @@
 import React, { useState } from 'react'
 import { useParams, useNavigate } from 'react-router-dom'
-import { useQuery, useMutation, useQueryClient } from 'react-query'
-import { api } from '../api/api'
+import { useQuery, useInfiniteQuery, useMutation, useQueryClient } from 'react-query'
+import { api, fetchPage } from '../api/api'
 import { Heart, MessageCircle, User, Calendar, Send } from 'lucide-react'
 import toast from 'react-hot-toast'
 
@@ -19,13 +19,21 @@ const PostDetail = () => {
     }
   )
 
-  const { data: comments, isLoading: commentsLoading } = useQuery(
+  const {
+    data: commentPages,
+    isLoading: commentsLoading,
+    hasNextPage,
+    fetchNextPage,
+    isFetchingNextPage
+  } = useInfiniteQuery(
     ['comments', id],
-    () => api.get(`/posts/${id}/comments`).then(res => res.data),
+    ({ pageParam }) => fetchPage(`/posts/${id}/comments`, pageParam),
     {
-      enabled: !!id
+      enabled: !!id,
+      getNextPageParam: (lastPage) => lastPage.nextCursor
     }
   )
+  const comments = commentPages?.pages.flatMap(page => page.items)
 
   const likeMutation = useMutation(
     () => api.post(`/posts/${id}/like`),
@@ -221,6 +229,15 @@ const PostDetail = () => {
                 </div>
               </div>
             ))}
+            {hasNextPage && (
+              <button
+                onClick={() => fetchNextPage()}
+                disabled={isFetchingNextPage}
+                className="w-full py-2 text-sm font-medium text-blue-600 hover:text-blue-800 disabled:text-gray-400 transition-colors"
+              >
+                {isFetchingNextPage ? 'Loading...' : 'Load more comments'}
+              </button>
+            )}
           </div>
         ) : (
           <div className="text-center py-8">
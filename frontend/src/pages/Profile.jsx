@@ -1,30 +1,26 @@
 import React, { useState } from 'react';
 import { useAuth } from '../contexts/AuthContext';
-import { useQuery } from 'react-query';
-import { api } from '../api/api';
+import { useInfiniteQuery } from 'react-query';
+import { fetchPage } from '../api/api';
 import PostCard from '../components/PostCard';
 import PostSkeleton from '../components/PostSkeleton';
 import EditProfileModal from '../components/EditProfileModal';
 import { Edit, Settings, Grid, Calendar, Heart, MessageCircle, Share2, Plus, Sparkles, Users, Zap } from 'lucide-react';
 
-const fetchUserPosts = async (userId) => {
-  if (!userId) return [];
-  const { data } = await api.get(`/users/${userId}/posts`);
-  return data;
-};
-
 const Profile = () => {
   const { user } = useAuth();
   const [showPosts, setShowPosts] = useState(true);
   const [isEditModalOpen, setEditModalOpen] = useState(false);
 
-  const { data: posts, isLoading } = useQuery(
+  const { data, isLoading, hasNextPage, fetchNextPage, isFetchingNextPage } = useInfiniteQuery(
     ['userPosts', user?.id],
-    () => fetchUserPosts(user?.id),
+    ({ pageParam }) => fetchPage(`/users/${user.id}/posts`, pageParam),
     {
       enabled: !!user?.id,
+      getNextPageParam: (lastPage) => lastPage.nextCursor,
     }
   );
+  const posts = data?.pages.flatMap((page) => page.items);
 
   if (!user) {
     return (
@@ -125,6 +121,15 @@ const Profile = () => {
             </div>
           </div>
         )}
+        {hasNextPage && (
+          <button
+            onClick={() => fetchNextPage()}
+            disabled={isFetchingNextPage}
+            className="w-full mt-4 py-2 text-sm font-medium text-purple-400 hover:text-purple-300 disabled:text-gray-500 transition-colors"
+          >
+            {isFetchingNextPage ? 'Loading...' : 'Load more posts'}
+          </button>
+        )}
       </div>
 
       {/* Edit Profile Modal */}